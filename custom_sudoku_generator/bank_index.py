@@ -0,0 +1,375 @@
+"""
+Secondary index over a puzzle bank.
+
+Picking "a hard killer puzzle with at most 28 givens" from a bank should not
+mean decoding every record. The index keeps, for each key, the record numbers
+sorted by that key's value, so a range query is two binary searches and a
+random pick within a range is O(log n).
+
+Indexed keys:
+
+    clues        number of givens
+    difficulty   empty cells left after naked-single propagation with the
+                 row/column/box constraints, using the rule's own regions
+                 instead of boxes where it replaces them (higher = harder)
+    generated    generation time as a Unix timestamp
+
+The rule itself is the bank: BankCatalog maps each rule folder name to its
+``banks/<rule>.bank`` file and the index stored next to it (``<rule>.bank.idx``).
+The index records the digest of the bank it was built from, so a bank rebuilt
+with the same number of records still gets a fresh index.
+
+Usage:
+    python bank_index.py build banks/sudoku_killer_rule.bank
+    python bank_index.py query banks/sudoku_killer_rule.bank --max-clues 28 --min-difficulty 20
+"""
+import argparse
+import bisect
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+from datetime import datetime
+
+from puzzle_bank import PuzzleBank
+
+INDEX_KEYS = ("clues", "difficulty", "generated")
+INDEX_VERSION = 3
+
+
+def difficulty_score(givens, size=9, box_size=3, regions=None):
+    """
+    Estimate how hard a puzzle is from its givens.
+
+    Repeatedly fills every empty cell that has exactly one candidate under the
+    standard rules and returns the number of cells still empty afterwards. A
+    puzzle solvable by naked singles alone scores 0.
+
+    Args:
+        givens: Flat list of size*size values (0 = empty)
+        regions: Optional list of size regions, each a list of (row, col),
+                 that replace the standard boxes (e.g. jigsaw regions)
+
+    Returns:
+        int: Number of cells left unresolved
+    """
+    grid = list(givens)
+    full = (1 << (size + 1)) - 2  # bits 1..size
+    if regions:
+        box_of = [0] * (size * size)
+        for region_number, region in enumerate(regions):
+            for r, c in region:
+                box_of[r * size + c] = region_number
+    else:
+        box_of = [(index // size // box_size) * box_size + index % size // box_size
+                  for index in range(size * size)]
+
+    progress = True
+    while progress:
+        progress = False
+        rows = [0] * size
+        cols = [0] * size
+        boxes = [0] * size
+        for index, value in enumerate(grid):
+            if value:
+                r, c = divmod(index, size)
+                bit = 1 << value
+                rows[r] |= bit
+                cols[c] |= bit
+                boxes[box_of[index]] |= bit
+
+        for index, value in enumerate(grid):
+            if value:
+                continue
+            r, c = divmod(index, size)
+            box = box_of[index]
+            candidates = full & ~(rows[r] | cols[c] | boxes[box])
+            if candidates and candidates & (candidates - 1) == 0:
+                value = candidates.bit_length() - 1
+                grid[index] = value
+                bit = 1 << value
+                rows[r] |= bit
+                cols[c] |= bit
+                boxes[box] |= bit
+                progress = True
+
+    return grid.count(0)
+
+
+def regions_from_metadata(metadata):
+    """
+    Return the regions that replace the standard boxes for a record, or None.
+
+    Args:
+        metadata: A record's metadata (with the rule's metadata under "rule")
+    """
+    rule = metadata.get("rule") or {}
+    if rule.get("use_standard_boxes", True):
+        return None
+    return rule.get("jigsaw_regions") or None
+
+
+def _timestamp(value):
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class BankIndex:
+    """
+    Sorted per-key offsets into a puzzle bank.
+
+    For every key, ``_sorted[key]`` lists record numbers ordered by value,
+    ``_sorted_values[key]`` holds the matching values for binary search, and
+    ``_values[key][record]`` gives a record's value directly.
+    """
+
+    def __init__(self, count, values, bank_digest=None):
+        """
+        Args:
+            count: Number of records in the bank
+            values: Dictionary mapping each key in INDEX_KEYS to a list with
+                    one value per record
+            bank_digest: PuzzleBank.digest() of the indexed bank
+        """
+        self.count = count
+        self.bank_digest = bank_digest
+        self._values = values
+        self._sorted = {}
+        self._sorted_values = {}
+        for key in INDEX_KEYS:
+            pairs = sorted((value, record) for record, value in enumerate(values[key]))
+            self._sorted[key] = [record for _, record in pairs]
+            self._sorted_values[key] = [value for value, _ in pairs]
+
+    @classmethod
+    def build(cls, bank):
+        """Scan a PuzzleBank once and build its index."""
+        values = {key: [] for key in INDEX_KEYS}
+        for record in range(len(bank)):
+            givens = bank.givens(record)
+            metadata = bank.metadata(record).get("metadata", {})
+            box_size = metadata.get("box_size", 3)
+            values["clues"].append(sum(1 for value in givens if value))
+            values["difficulty"].append(
+                difficulty_score(givens, bank.size, box_size, regions_from_metadata(metadata)))
+            values["generated"].append(_timestamp(metadata.get("generated_at")))
+        return cls(len(bank), values, bank.digest())
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with save()."""
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version {data.get('version')}")
+        return cls(data["count"], data["values"], data.get("bank_digest"))
+
+    @classmethod
+    def for_bank(cls, bank, path=None):
+        """
+        Load the index stored next to a bank, rebuilding it if it is missing
+        or was built from a different version of the bank.
+
+        A rebuilt index is saved for next time; if it cannot be saved (e.g. a
+        read-only deploy) it is used from memory only.
+
+        Args:
+            bank: An open PuzzleBank
+            path: Index file path (default: bank path + ".idx")
+        """
+        path = path or bank.path + ".idx"
+        if os.path.exists(path):
+            try:
+                index = cls.load(path)
+                if index.count == len(bank) and index.bank_digest == bank.digest():
+                    return index
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        index = cls.build(bank)
+        try:
+            index.save(path)
+        except OSError as e:
+            print(f"Warning: Could not save bank index {path}, keeping it in memory: {e}")
+        return index
+
+    def save(self, path):
+        """Write the index atomically to a JSON file."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                        prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": INDEX_VERSION, "count": self.count,
+                           "bank_digest": self.bank_digest, "values": self._values}, f)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def value(self, key, record):
+        """Return a record's value for a key."""
+        return self._values[key][record]
+
+    def range(self, key, low=None, high=None):
+        """
+        Return the records whose value for key lies in [low, high], in key order.
+
+        Either bound may be None for an open range.
+        """
+        values = self._sorted_values[key]
+        start = 0 if low is None else bisect.bisect_left(values, low)
+        end = len(values) if high is None else bisect.bisect_right(values, high)
+        return self._sorted[key][start:end]
+
+    def count_range(self, key, low=None, high=None):
+        """Return the number of records in a range without materializing it."""
+        values = self._sorted_values[key]
+        start = 0 if low is None else bisect.bisect_left(values, low)
+        end = len(values) if high is None else bisect.bisect_right(values, high)
+        return max(0, end - start)
+
+    def select(self, rng=None, **ranges):
+        """
+        Pick one random record matching every given range.
+
+        Args:
+            rng: Optional random.Random instance
+            **ranges: key=(low, high) for keys in INDEX_KEYS; None bounds are open
+
+        Returns:
+            int: Record number, or None if nothing matches
+
+        Example:
+            index.select(clues=(None, 28), difficulty=(20, None))
+        """
+        rng = rng or random
+        ranges = {key: bounds for key, bounds in ranges.items() if bounds != (None, None)}
+        for key in ranges:
+            if key not in INDEX_KEYS:
+                raise KeyError(f"Unknown index key '{key}'")
+        if not ranges:
+            return rng.randrange(self.count) if self.count else None
+
+        # Walk the narrowest range and filter by the others
+        key = min(ranges, key=lambda k: self.count_range(k, *ranges[k]))
+        low, high = ranges[key]
+        values = self._sorted_values[key]
+        start = 0 if low is None else bisect.bisect_left(values, low)
+        end = len(values) if high is None else bisect.bisect_right(values, high)
+        if start >= end:
+            return None
+
+        others = [(k, bounds) for k, bounds in ranges.items() if k != key]
+        if not others:
+            return self._sorted[key][rng.randrange(start, end)]
+
+        # Start at a random position in the range and wrap around
+        offset = rng.randrange(start, end)
+        for position in itertools.chain(range(offset, end), range(start, offset)):
+            record = self._sorted[key][position]
+            if all(self._matches(k, record, bounds) for k, bounds in others):
+                return record
+        return None
+
+    def _matches(self, key, record, bounds):
+        low, high = bounds
+        value = self._values[key][record]
+        return (low is None or value >= low) and (high is None or value <= high)
+
+
+class BankCatalog:
+    """
+    Lazily opened banks and indexes for a directory of ``<rule>.bank`` files.
+
+    Banks are reopened when their file changes, so a long-running server picks
+    up regenerated banks without a restart. The replaced bank is not closed:
+    requests may still be reading it, and its mapping is released once the
+    last reference goes away.
+
+    Opening a bank may build its index, which takes a while for a large bank.
+    That happens under a lock for the rule alone; the catalog-wide lock only
+    guards the lookup and the publishing of the result, so other rules' banks
+    stay available meanwhile.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._open = {}
+        self._opening = {}  # rule name -> lock held while its bank is opened
+        self._lock = threading.Lock()
+
+    def path(self, rule_name):
+        return os.path.join(self.directory, rule_name + ".bank")
+
+    def get(self, rule_name):
+        """
+        Return (bank, index) for a rule, or None if the rule has no bank.
+        """
+        path = self.path(rule_name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            with self._lock:
+                self._open.pop(rule_name, None)
+            return None
+
+        with self._lock:
+            cached = self._open.get(rule_name)
+            if cached is not None and cached[0] == mtime:
+                return cached[1], cached[2]
+            opening = self._opening.setdefault(rule_name, threading.Lock())
+
+        with opening:
+            # Another thread may have opened this version while we waited
+            with self._lock:
+                cached = self._open.get(rule_name)
+                if cached is not None and cached[0] == mtime:
+                    return cached[1], cached[2]
+
+            bank = PuzzleBank(path)
+            index = BankIndex.for_bank(bank)
+            with self._lock:
+                self._open[rule_name] = (mtime, bank, index)
+            return bank, index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query a puzzle bank index.")
+    parser.add_argument("command", choices=["build", "query"])
+    parser.add_argument("bank", help="Path to the .bank file")
+    parser.add_argument("--min-clues", type=int)
+    parser.add_argument("--max-clues", type=int)
+    parser.add_argument("--min-difficulty", type=int)
+    parser.add_argument("--max-difficulty", type=int)
+    parser.add_argument("--count", type=int, default=1, help="Number of records to sample")
+    args = parser.parse_args()
+
+    with PuzzleBank(args.bank) as bank:
+        if args.command == "build":
+            index = BankIndex.build(bank)
+            index.save(args.bank + ".idx")
+            print(f"Indexed {index.count} puzzle(s) -> {args.bank}.idx")
+            sys.exit(0)
+
+        index = BankIndex.for_bank(bank)
+        ranges = {
+            "clues": (args.min_clues, args.max_clues),
+            "difficulty": (args.min_difficulty, args.max_difficulty),
+        }
+        for _ in range(args.count):
+            record = index.select(**ranges)
+            if record is None:
+                print("No matching puzzle")
+                sys.exit(1)
+            print(f"#{record}: clues={index.value('clues', record)} "
+                  f"difficulty={index.value('difficulty', record)}")
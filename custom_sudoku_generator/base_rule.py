@@ -39,6 +39,28 @@ class BaseRule:
         """
         return True
 
+    def candidate_mask(self, grid, row, col):
+        """
+        Return the digits this rule allows at (row, col) as a bitmask.
+
+        Bit ``num`` is set when ``validate(grid, row, col, num)`` would return
+        True. The default calls validate once per digit; rules can override it
+        with a faster computation of all candidates at once.
+
+        Args:
+            grid: The current state of the Sudoku grid
+            row: Row index (0-based)
+            col: Column index (0-based)
+
+        Returns:
+            int: Bitmask of allowed digits (bit 1 for digit 1, ..., bit size for digit size)
+        """
+        mask = 0
+        for num in range(1, self.size + 1):
+            if self.validate(grid, row, col, num):
+                mask |= 1 << num
+        return mask
+
     def get_metadata(self):
         """
         Return metadata about this rule for saving/documentation.
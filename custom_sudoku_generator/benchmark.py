@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmarks for all rule variants.
+
+Each rule is measured with three cases:
+
+- ``generate``: the full forward or reverse pipeline (``generate_puzzle``),
+  without saving anything to the rule folder.
+- ``count_solutions``: the uniqueness check on a fixture puzzle.
+- ``validate``: the rule's ``validate`` on every empty cell and digit of the
+  fixture puzzle, reported per call.
+
+Every case reseeds the random module with a seed derived from ``--seed`` and
+the rule name before each repetition, so every repetition does identical
+work and two runs of the same code are comparable. Rules cannot reload their
+constraints from metadata.json, so the fixture for ``count_solutions`` and
+``validate`` is generated in memory from the same seed rather than read from
+the live puzzle files, which are never touched.
+
+Forward generation for some rules takes minutes, so each case has a time
+budget (``--budget``, enforced with SIGALRM where available); a case that
+exceeds it is recorded as timed out instead of stalling the whole suite.
+
+Results (median, p95 and min per case) are written as JSON. Given a baseline
+from an earlier run, medians that got slower by more than ``--threshold`` are
+reported as regressions and the exit code is 1.
+
+Usage:
+    python benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmark.py --baseline benchmarks/baseline.json
+    python benchmark.py --rules killer thermo --repeats 10
+"""
+import argparse
+import copy
+import json
+import math
+import os
+import platform
+import random
+import signal
+import statistics
+import sys
+import time
+import zlib
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from generate_all import DEFAULT_TIMEOUT, find_rule_folders, normalize_rule_name
+from run import (SudokuGenerator, default_difficulty_attempts, generate_puzzle, generate_sudoku_forward,
+                 generate_sudoku_reverse, load_custom_rule)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+CASES = ("generate", "count_solutions", "validate")
+DEFAULT_REPEATS = 5
+DEFAULT_SEED = 1234
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_OUT = os.path.join(script_dir, "benchmarks", "latest.json")
+
+
+class CaseTimeout(Exception):
+    """Raised when a benchmark case exceeds its time budget."""
+
+
+class time_budget:
+    """
+    Context manager that raises CaseTimeout after a number of seconds.
+
+    Does nothing without SIGALRM (e.g. on Windows) or when seconds is falsy.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds if hasattr(signal, "SIGALRM") else None
+        self.previous = None
+
+    def _expired(self, signum, frame):
+        raise CaseTimeout(f"timed out after {self.seconds}s")
+
+    def __enter__(self):
+        if self.seconds:
+            self.previous = signal.signal(signal.SIGALRM, self._expired)
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.seconds:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous)
+        return False
+
+
+def case_seed(seed, rule_name, case):
+    """Stable seed for one (rule, case) pair, independent of PYTHONHASHSEED."""
+    return (seed + zlib.crc32(f"{rule_name}:{case}".encode())) % 2**32
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples):
+    """
+    Reduce repeated timings to summary statistics.
+
+    Args:
+        samples: Seconds per repetition
+
+    Returns:
+        dict: {"median", "p95", "min", "runs"}
+    """
+    return {
+        "median": statistics.median(samples),
+        "p95": percentile(samples, 0.95),
+        "min": min(samples),
+        "runs": len(samples),
+    }
+
+
+def build_fixture(rule_folder, seed):
+    """
+    Generate a puzzle in memory and keep the rule instance that produced it.
+
+    Returns:
+        tuple: (custom_rule, puzzle_grid), or (custom_rule, None) if generation failed
+    """
+    random.seed(seed)
+    custom_rule = load_custom_rule(rule_folder)
+    difficulty = default_difficulty_attempts(custom_rule)
+    if custom_rule.supports_reverse_generation():
+        puzzle, _ = generate_sudoku_reverse(custom_rule, rule_folder, difficulty, save=False)
+    else:
+        puzzle, _ = generate_sudoku_forward(custom_rule, rule_folder, difficulty, save=False)
+    return custom_rule, puzzle
+
+
+def time_generate(rule_folder, seed, repeats):
+    # Compile the rule module outside the timed region (the registry caches it)
+    load_custom_rule(rule_folder)
+    samples = []
+    for _ in range(repeats):
+        random.seed(seed)
+        start = time.perf_counter()
+        generate_puzzle(rule_folder)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def time_count_solutions(custom_rule, puzzle, repeats):
+    gen = SudokuGenerator(custom_rule=custom_rule)
+    samples = []
+    for _ in range(repeats):
+        # Time a cold search, not a transposition table lookup of the previous run
+        if gen.transposition is not None:
+            gen.transposition.clear()
+        grid = copy.deepcopy(puzzle)
+        start = time.perf_counter()
+        gen.count_solutions(grid, 0)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def time_validate(custom_rule, puzzle, repeats):
+    """Seconds per validate call, over every empty cell and digit of the puzzle."""
+    size = len(puzzle)
+    probes = [(r, c, num) for r in range(size) for c in range(size) if puzzle[r][c] == 0
+              for num in range(1, size + 1)]
+    if not probes:
+        return []
+    grid = copy.deepcopy(puzzle)
+    validate = custom_rule.validate
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for row, col, num in probes:
+            validate(grid, row, col, num)
+        samples.append((time.perf_counter() - start) / len(probes))
+    return samples
+
+
+def benchmark_rule(rule_folder, seed=DEFAULT_SEED, repeats=DEFAULT_REPEATS, cases=CASES, budget=DEFAULT_TIMEOUT):
+    """
+    Run the benchmark cases for one rule.
+
+    Args:
+        rule_folder: Path to the folder containing the rule
+        seed: Base seed; each case derives its own from it
+        repeats: Repetitions per case
+        cases: Case names to run (subset of CASES)
+        budget: Seconds allowed per case (and for building the fixture), or None
+
+    Returns:
+        dict: {case: summary} (see summarize); a case that could not run maps to {"error": ...}
+    """
+    rule_name = os.path.basename(os.path.normpath(rule_folder))
+    results = {}
+
+    # Rules print progress for every phase; keep the report readable
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        if "generate" in cases:
+            try:
+                with time_budget(budget):
+                    samples = time_generate(rule_folder, case_seed(seed, rule_name, "generate"), repeats)
+                results["generate"] = summarize(samples)
+            except CaseTimeout as e:
+                results["generate"] = {"error": str(e)}
+
+        fixture_cases = [case for case in ("count_solutions", "validate") if case in cases]
+        if fixture_cases:
+            try:
+                with time_budget(budget):
+                    custom_rule, puzzle = build_fixture(rule_folder, case_seed(seed, rule_name, "fixture"))
+            except CaseTimeout as e:
+                custom_rule, puzzle, error = None, None, f"fixture {e}"
+            else:
+                error = "fixture generation failed"
+
+            timers = {"count_solutions": time_count_solutions, "validate": time_validate}
+            for case in fixture_cases:
+                if puzzle is None:
+                    results[case] = {"error": error}
+                    continue
+                try:
+                    with time_budget(budget):
+                        samples = timers[case](custom_rule, puzzle, repeats)
+                except CaseTimeout as e:
+                    results[case] = {"error": str(e)}
+                    continue
+                results[case] = summarize(samples) if samples else {"error": "no empty cells"}
+
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Find cases whose median got slower than in a baseline.
+
+    Args:
+        results: {"rules": {rule: {case: summary}}} from this run
+        baseline: The same structure from an earlier run
+        threshold: Allowed relative slowdown (0.25 = 25%)
+
+    Returns:
+        list: (rule, case, baseline_median, median, ratio) for each regression
+    """
+    regressions = []
+    for rule, cases in results["rules"].items():
+        for case, summary in cases.items():
+            old = baseline.get("rules", {}).get(rule, {}).get(case)
+            if not old or "median" not in old or "median" not in summary or old["median"] <= 0:
+                continue
+            ratio = summary["median"] / old["median"]
+            if ratio > 1 + threshold:
+                regressions.append((rule, case, old["median"], summary["median"], ratio))
+    return regressions
+
+
+def format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e9:.0f}ns"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark puzzle generation for all rule variants.")
+    parser.add_argument("--rules", nargs="+", metavar="RULE",
+                        help="Benchmark only these rules (e.g. killer thermo)")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES),
+                        help="Cases to run (default: all)")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS,
+                        help=f"Repetitions per case (default: {DEFAULT_REPEATS})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help=f"Base random seed (default: {DEFAULT_SEED})")
+    parser.add_argument("--budget", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Seconds allowed per case, 0 for no limit (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--out", default=DEFAULT_OUT,
+                        help="Where to write the results JSON (default: benchmarks/latest.json)")
+    parser.add_argument("--baseline", help="Compare against this results file")
+    parser.add_argument("--save-baseline", metavar="PATH",
+                        help="Also write the results to PATH for later comparisons")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Relative median slowdown counted as a regression (default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args(argv)
+
+    rule_folders = find_rule_folders()
+    if args.rules:
+        wanted = {normalize_rule_name(name) for name in args.rules}
+        rule_folders = [folder for folder in rule_folders if os.path.basename(folder) in wanted]
+        missing = wanted - {os.path.basename(folder) for folder in rule_folders}
+        if missing:
+            print(f"Error: Unknown rule(s): {', '.join(sorted(missing))}")
+            return 2
+
+    results = {
+        "created_at": datetime.now().isoformat(),
+        "seed": args.seed,
+        "repeats": args.repeats,
+        "budget": args.budget,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "rules": {},
+    }
+
+    print(f"Benchmarking {len(rule_folders)} rule(s), {args.repeats} repetition(s), seed {args.seed}\n")
+    for folder in rule_folders:
+        rule_name = os.path.basename(folder)
+        cases = benchmark_rule(folder, args.seed, args.repeats, args.cases, args.budget or None)
+        results["rules"][rule_name] = cases
+        parts = []
+        for case, summary in cases.items():
+            if "error" in summary:
+                parts.append(f"{case} ✗ {summary['error']}")
+            else:
+                parts.append(f"{case} {format_seconds(summary['median'])} (p95 {format_seconds(summary['p95'])})")
+        print(f"{rule_name:32} " + "  ".join(parts))
+
+    write_json(args.out, results)
+    print(f"\nResults written to {args.out}")
+    if args.save_baseline:
+        write_json(args.save_baseline, results)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("seed") != args.seed:
+        print(f"Warning: Baseline used seed {baseline.get('seed')}, this run used {args.seed}")
+
+    regressions = compare(results, baseline, args.threshold)
+    if not regressions:
+        print(f"✓ No regressions against {args.baseline} (threshold {args.threshold:.0%})")
+        return 0
+    print(f"\n✗ {len(regressions)} regression(s) against {args.baseline}:")
+    for rule, case, old, new, ratio in regressions:
+        print(f"  {rule} {case}: {format_seconds(old)} -> {format_seconds(new)} ({ratio:.2f}x)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Bulk generation of many puzzles for a single rule.
+
+The regular flow (``run.py <rule_folder>``) produces one puzzle and overwrites
+the files in the rule folder. This module instead yields puzzles lazily from a
+generator and streams them into a puzzle bank file, one record at a time, so
+hundreds of puzzles per variant can be produced without holding them in memory.
+
+Banks ending in ``.bank`` use the binary format from puzzle_bank.py; any other
+extension is written as JSON Lines.
+
+Usage:
+    python run.py sudoku_killer_rule --count 200 --jobs 4
+    python run.py sudoku_killer_rule --count 50 --out banks/killer.jsonl --seed 1
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from contextlib import redirect_stdout
+from multiprocessing import Pool
+
+from puzzle_bank import PuzzleBankWriter
+from run import generate_puzzle
+
+DEFAULT_BANK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "banks")
+
+
+def generate_one(rule_folder, difficulty_attempts=None, seed=None, quiet=True, progress=None):
+    """
+    Generate a single puzzle record for a rule, optionally seeded.
+
+    This is a top-level function so it can be handed to worker processes.
+
+    Args:
+        rule_folder: Path to the folder containing the rule
+        difficulty_attempts: Number of attempts to remove cells (None for rule default)
+        seed: Seed for the random module (a random one is chosen if None)
+        quiet: Suppress the generator's progress output
+        progress: Optional callback receiving structured progress events
+                  (see run.report_progress) instead of printed messages
+
+    Returns:
+        The puzzle record, or None if generation failed
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+    random.seed(seed)
+
+    if quiet:
+        # The generator and rules print progress for every phase; silence it in bulk runs
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            record = generate_puzzle(rule_folder, difficulty_attempts, progress=progress)
+    else:
+        record = generate_puzzle(rule_folder, difficulty_attempts, progress=progress)
+
+    if record is None:
+        return None
+    record["rule"] = os.path.basename(os.path.normpath(rule_folder))
+    record["seed"] = seed
+    return record
+
+
+def _generate_one(task):
+    """
+    Worker entry point for iter_puzzles.
+
+    Args:
+        task: Tuple of (rule_folder, index, seed, difficulty_attempts, quiet)
+
+    Returns:
+        The puzzle record, or None if generation failed
+    """
+    rule_folder, index, seed, difficulty_attempts, quiet = task
+    record = generate_one(rule_folder, difficulty_attempts, seed, quiet)
+    if record is not None:
+        record["index"] = index
+    return record
+
+
+def iter_puzzles(rule_folder, count, difficulty_attempts=None, seed=None, jobs=1, quiet=True):
+    """
+    Lazily generate puzzles for a rule.
+
+    Puzzle i is generated with seed ``seed + i``, so a run can be reproduced
+    regardless of the number of jobs. With more than one job, records are
+    yielded in completion order rather than index order.
+
+    Args:
+        rule_folder: Path to the folder containing the rule
+        count: Number of puzzles to attempt
+        difficulty_attempts: Number of attempts to remove cells (None for rule default)
+        seed: Base seed (a random one is chosen if None)
+        jobs: Number of worker processes
+        quiet: Suppress the generator's progress output
+
+    Yields:
+        dict: Puzzle records with puzzle, solution, metadata, rule, index and seed
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+
+    tasks = ((rule_folder, i, seed + i, difficulty_attempts, quiet) for i in range(count))
+
+    if jobs <= 1:
+        for task in tasks:
+            record = _generate_one(task)
+            if record is not None:
+                yield record
+        return
+
+    with Pool(processes=jobs) as pool:
+        for record in pool.imap_unordered(_generate_one, tasks):
+            if record is not None:
+                yield record
+
+
+def write_bank(records, path):
+    """
+    Stream puzzle records into a bank file.
+
+    Existing banks are appended to. Paths ending in ``.bank`` are written in
+    the binary bank format: the new bank is built next to the old one and
+    replaces it when the run ends (also on Ctrl-C), so a crashed or killed run
+    leaves the old bank unchanged and loses the puzzles it generated. Other
+    paths are written as JSON Lines, one line per record as soon as it
+    arrives, so an interrupted run keeps every puzzle generated so far.
+
+    Args:
+        records: Iterable of puzzle records
+        path: Path to the bank file
+
+    Returns:
+        int: Number of records written
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    written = 0
+    if path.endswith(".bank"):
+        rule = os.path.splitext(os.path.basename(path))[0]
+        with PuzzleBankWriter(path, rule=rule, append=True) as writer:
+            for record in records:
+                writer.append(record)
+                written += 1
+        return written
+
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            f.flush()
+            written += 1
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="run.py",
+        description="Generate many puzzles for one rule into a puzzle bank.")
+    parser.add_argument("rule_folder", help="Path to the rule folder")
+    parser.add_argument("difficulty", nargs="?", type=int, default=None,
+                        help="Difficulty attempts (default: rule default)")
+    parser.add_argument("--count", type=int, required=True, help="Number of puzzles to generate")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes (default: 1)")
+    parser.add_argument("--out", help="Bank file to append to (default: banks/<rule>.bank)")
+    parser.add_argument("--seed", type=int, help="Base seed for reproducible runs")
+    parser.add_argument("--verbose", action="store_true", help="Show the generator's output")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.rule_folder):
+        print(f"Error: Rule folder '{args.rule_folder}' not found")
+        return 1
+    if args.count < 1 or args.jobs < 1:
+        parser.error("--count and --jobs must be positive")
+
+    rule_name = os.path.basename(os.path.normpath(args.rule_folder))
+    out_path = args.out or os.path.join(DEFAULT_BANK_DIR, rule_name + ".bank")
+
+    print(f"Generating {args.count} puzzle(s) for {rule_name} with {args.jobs} job(s)")
+    print(f"Writing to: {out_path}")
+
+    from tqdm import tqdm
+    records = iter_puzzles(args.rule_folder, args.count, args.difficulty,
+                           seed=args.seed, jobs=args.jobs, quiet=not args.verbose)
+    written = write_bank(tqdm(records, total=args.count), out_path)
+
+    print(f"Wrote {written}/{args.count} puzzle(s) to {out_path}")
+    return 0 if written == args.count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
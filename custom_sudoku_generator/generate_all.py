@@ -1,74 +1,360 @@
 #!/usr/bin/env python3
 """
-Script to generate all Sudoku variants with timeout protection.
+Script to generate all Sudoku variants in parallel with timeout protection.
+
+Every rule is generated by its own ``run.py`` subprocess, so a rule that
+exceeds its time budget can be killed without affecting the others. Up to
+``--jobs`` subprocesses run at once (one per CPU by default), which brings a
+full regeneration down to roughly the time of the slowest single rule.
+
+Each run.py appends a timing record to ``generation_log.jsonl`` (see
+``run.GenerationResult``); rules that time out or fail get a record from
+here instead.
+
+Progress is written to a checkpoint file after every rule. If a batch is
+interrupted, running the same command again skips the rules that already
+succeeded and continues with the rest; this matters most for ``--force``
+batches, which would otherwise regenerate every rule again. The checkpoint
+records the batch's ``--only``, ``--difficulty`` and ``--force`` arguments and
+is ignored by a batch with different ones; ``--no-resume`` starts a fresh batch.
+
+Usage:
+    python generate_all.py                        # generate missing puzzles
+    python generate_all.py --force                # regenerate everything
+    python generate_all.py --only killer thermo   # selected rules only
+    python generate_all.py --budget killer=300    # per-rule time budget
+    python generate_all.py --only killer --profile  # write profiles/<rule>.* reports
+    python generate_all.py --only argyle --trace    # write traces/<rule>.trace search traces
 """
+import argparse
+import json
+import os
+import platform
 import subprocess
 import sys
-import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from rule_registry import get_registry
+from run import DEFAULT_GENERATION_LOG, append_generation_log
 
 # Get the directory of this script
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
-# Get all rule folders
-rule_folders = []
-for item in os.listdir(script_dir):
-    item_path = os.path.join(script_dir, item)
-    if os.path.isdir(item_path) and os.path.exists(os.path.join(item_path, "rule.py")):
-        rule_folders.append(item_path)
+DEFAULT_TIMEOUT = 120
+DEFAULT_CHECKPOINT = os.path.join(script_dir, ".generate_all_checkpoint.json")
+# Seconds a timed-out run.py gets after SIGTERM (e.g. to write its profile) before it is killed
+TERMINATE_GRACE = 10
+
 
-rule_folders.sort()
+def find_rule_folders():
+    """Return all rule folders next to this script, sorted by name."""
+    return get_registry(script_dir).discover()
 
-print(f"Found {len(rule_folders)} rule folders")
-print("="*60)
 
-successful = []
-failed = []
-skipped = []
+def normalize_rule_name(name):
+    """
+    Map a short rule name to its folder name.
+
+    Accepts ``killer``, ``killer_rule``, ``sudoku_killer_rule`` or a path to the folder.
+    """
+    name = os.path.basename(name.rstrip("/"))
+    if not name.startswith("sudoku_"):
+        name = "sudoku_" + name
+    if not name.endswith("_rule"):
+        name = name + "_rule"
+    return name
+
+
+def parse_budgets(entries):
+    """
+    Parse ``RULE=SECONDS`` entries into a {folder_name: seconds} dict.
+
+    Raises:
+        ValueError: If an entry is malformed
+    """
+    budgets = {}
+    for entry in entries or []:
+        rule, sep, seconds = entry.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid budget '{entry}', expected RULE=SECONDS")
+        budgets[normalize_rule_name(rule)] = float(seconds)
+    return budgets
+
+
+def load_checkpoint(path):
+    """Load the checkpoint file, returning an empty checkpoint if there is none."""
+    if not os.path.exists(path):
+        return {"rules": {}}
+    try:
+        with open(path, "r") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Ignoring unreadable checkpoint {path}: {e}")
+        return {"rules": {}}
+    checkpoint.setdefault("rules", {})
+    return checkpoint
 
-for i, folder in enumerate(rule_folders, 1):
-    rule_name = os.path.basename(folder)
-    print(f"\n[{i}/{len(rule_folders)}] Generating {rule_name}...")
-    
-    # Check if already generated
+
+def batch_key(only=None, difficulty=5, force=False):
+    """
+    Describe the arguments that decide what a batch generates.
+
+    A checkpoint only applies to a batch with the same key.
+    """
+    return {
+        "only": sorted({normalize_rule_name(name) for name in only}) if only else None,
+        "difficulty": difficulty,
+        "force": bool(force),
+    }
+
+
+def save_checkpoint(path, checkpoint):
+    """Write the checkpoint atomically so an interrupt never leaves it half-written."""
+    checkpoint["updated_at"] = datetime.now().isoformat()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def generate_rule(folder, difficulty, timeout, extra_args=()):
+    """
+    Generate one rule in a separate ``run.py`` process.
+
+    Args:
+        folder: Path to the rule folder
+        difficulty: Difficulty attempts passed to run.py
+        timeout: Seconds before the subprocess is stopped
+        extra_args: Additional run.py arguments (e.g. profiling flags)
+
+    Returns:
+        tuple: (status, elapsed_seconds, message) where status is
+               'success', 'failed', 'timeout' or 'error'
+    """
     metadata_file = os.path.join(folder, "metadata.json")
-    if os.path.exists(metadata_file):
-        print(f"  ✓ Already generated, skipping")
-        skipped.append(rule_name)
-        continue
-    
+    previous_mtime = os.path.getmtime(metadata_file) if os.path.exists(metadata_file) else None
+
+    start = time.time()
     try:
-        # Run with 120 second timeout
-        result = subprocess.run(
-            [sys.executable, "run.py", folder, "5"],
+        process = subprocess.Popen(
+            [sys.executable, "run.py", folder, str(difficulty), *extra_args],
             cwd=script_dir,
-            timeout=120,
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True
         )
-        
-        if result.returncode == 0 and os.path.exists(metadata_file):
-            print(f"  ✓ Success")
-            successful.append(rule_name)
-        else:
-            print(f"  ✗ Failed: {result.stderr[:200] if result.stderr else 'Unknown error'}")
-            failed.append(rule_name)
-    except subprocess.TimeoutExpired:
-        print(f"  ✗ Timeout (rule too restrictive)")
-        failed.append(rule_name)
     except Exception as e:
-        print(f"  ✗ Error: {str(e)[:200]}")
-        failed.append(rule_name)
-
-print("\n" + "="*60)
-print(f"\nSummary:")
-print(f"  Successful: {len(successful)}")
-print(f"  Skipped (already generated): {len(skipped)}")
-print(f"  Failed: {len(failed)}")
-
-if failed:
-    print(f"\nFailed rules:")
-    for rule in failed:
-        print(f"  - {rule}")
-
-total_generated = len(successful) + len(skipped)
-print(f"\nTotal generated: {total_generated}/{len(rule_folders)}")
+        return "error", time.time() - start, str(e)[:200]
+
+    try:
+        _, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        # Ask politely first so a profiled run can still write its report
+        process.terminate()
+        try:
+            process.communicate(timeout=TERMINATE_GRACE)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+        return "timeout", time.time() - start, f"Timeout after {timeout:g}s (rule too restrictive)"
+    elapsed = time.time() - start
+
+    # run.py reports failures on stdout, so also require a freshly written metadata file
+    written = os.path.exists(metadata_file) and os.path.getmtime(metadata_file) != previous_mtime
+    if process.returncode == 0 and written:
+        return "success", elapsed, ""
+    return "failed", elapsed, stderr[-200:] if stderr else "Unknown error"
+
+
+def select_rules(rule_folders, only=None, force=False, checkpoint=None):
+    """
+    Decide which rule folders to generate.
+
+    Args:
+        rule_folders: All available rule folders
+        only: Optional list of rule names to restrict the batch to
+        force: Regenerate rules that already have metadata.json
+        checkpoint: Checkpoint dict of a previous, interrupted run of this batch;
+                    the rules it lists as succeeded are skipped, even with force
+
+    Returns:
+        tuple: (to_generate, skipped) lists of folder paths
+    """
+    if only:
+        wanted = {normalize_rule_name(name) for name in only}
+        unknown = wanted - {os.path.basename(f) for f in rule_folders}
+        if unknown:
+            raise ValueError(f"Unknown rule(s): {', '.join(sorted(unknown))}")
+        rule_folders = [f for f in rule_folders if os.path.basename(f) in wanted]
+
+    completed = {
+        name for name, entry in (checkpoint or {}).get("rules", {}).items()
+        if entry.get("status") == "success"
+    }
+
+    to_generate = []
+    skipped = []
+    for folder in rule_folders:
+        rule_name = os.path.basename(folder)
+        if rule_name in completed:
+            skipped.append(folder)
+        elif not force and os.path.exists(os.path.join(folder, "metadata.json")):
+            skipped.append(folder)
+        else:
+            to_generate.append(folder)
+    return to_generate, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate all Sudoku variants in parallel.")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of rules generated at once (default: number of CPUs)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Default time budget per rule in seconds (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--budget", action="append", metavar="RULE=SECONDS",
+                        help="Time budget for a single rule, may be given multiple times")
+    parser.add_argument("--difficulty", type=int, default=5,
+                        help="Difficulty attempts passed to run.py (default: 5)")
+    parser.add_argument("--force", action="store_true",
+                        help="Regenerate rules that already have a puzzle (resumable like any batch)")
+    parser.add_argument("--only", nargs="+", metavar="RULE",
+                        help="Only generate these rules (e.g. killer thermo)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT,
+                        help="Checkpoint file used to resume an interrupted batch")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Ignore an existing checkpoint and start a fresh batch")
+    parser.add_argument("--log-jsonl", default=DEFAULT_GENERATION_LOG,
+                        help="JSON Lines file receiving a timing record per rule "
+                             "(default: generation_log.jsonl, '' to disable)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile each rule (writes <rule>.pstats, .collapsed and .summary.txt)")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Also trace memory allocations while profiling (implies --profile)")
+    parser.add_argument("--profile-dir", default=None,
+                        help="Directory for profile reports (default: profiles/)")
+    parser.add_argument("--trace", action="store_true",
+                        help="Record a search trace of each rule's grid fill (see search_trace.py)")
+    parser.add_argument("--trace-dir", default=None,
+                        help="Directory for search traces (default: traces/)")
+    args = parser.parse_args(argv)
+
+    run_args = []
+    if args.log_jsonl:
+        args.log_jsonl = os.path.abspath(args.log_jsonl)
+        run_args += ["--log-jsonl", args.log_jsonl]
+    if args.profile or args.profile_memory or args.profile_dir:
+        from profiling import DEFAULT_PROFILE_DIR
+        args.profile_dir = os.path.abspath(args.profile_dir or DEFAULT_PROFILE_DIR)
+        run_args += ["--profile-dir", args.profile_dir]
+        if args.profile_memory:
+            run_args.append("--profile-memory")
+    if args.trace or args.trace_dir:
+        from search_trace import DEFAULT_TRACE_DIR
+        args.trace_dir = os.path.abspath(args.trace_dir or DEFAULT_TRACE_DIR)
+        run_args += ["--trace-dir", args.trace_dir]
+
+    try:
+        budgets = parse_budgets(args.budget)
+    except ValueError as e:
+        parser.error(str(e))
+
+    rule_folders = find_rule_folders()
+    print(f"Found {len(rule_folders)} rule folders")
+
+    if args.no_resume and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    checkpoint = load_checkpoint(args.checkpoint)
+    batch = batch_key(args.only, args.difficulty, args.force)
+    if checkpoint["rules"] and checkpoint.get("batch") != batch:
+        print(f"Ignoring checkpoint {args.checkpoint} from a batch with different arguments")
+        checkpoint = {"rules": {}}
+    if checkpoint["rules"]:
+        print(f"Resuming from checkpoint {args.checkpoint}")
+    checkpoint["batch"] = batch
+    checkpoint.setdefault("started_at", datetime.now().isoformat())
+
+    try:
+        to_generate, skipped = select_rules(rule_folders, args.only, args.force, checkpoint)
+    except ValueError as e:
+        parser.error(str(e))
+
+    jobs = max(1, min(args.jobs, len(to_generate) or 1))
+    print(f"Generating {len(to_generate)} rule(s) with {jobs} parallel job(s), "
+          f"skipping {len(skipped)}")
+    print("="*60)
+
+    successful = []
+    failed = []
+
+    # Each worker thread only waits on its run.py subprocess, so the real
+    # parallelism comes from the subprocesses themselves.
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for folder in to_generate:
+            rule_name = os.path.basename(folder)
+            timeout = budgets.get(rule_name, args.timeout)
+            futures[executor.submit(generate_rule, folder, args.difficulty, timeout, run_args)] = rule_name
+
+        for done, future in enumerate(as_completed(futures), 1):
+            rule_name = futures[future]
+            status, elapsed, message = future.result()
+
+            if status == "success":
+                print(f"[{done}/{len(futures)}] ✓ {rule_name} ({elapsed:.1f}s)")
+                successful.append(rule_name)
+            else:
+                print(f"[{done}/{len(futures)}] ✗ {rule_name} ({elapsed:.1f}s): {message}")
+                failed.append(rule_name)
+                if args.log_jsonl and status in ("timeout", "error"):
+                    # run.py logs the runs that finish, including failed ones
+                    append_generation_log(args.log_jsonl, {
+                        "rule": rule_name,
+                        "success": False,
+                        "status": status,
+                        "message": message,
+                        "difficulty_attempts": args.difficulty,
+                        "timings": {"total": round(elapsed, 6)},
+                        "started_at": datetime.fromtimestamp(time.time() - elapsed).isoformat(),
+                        "host": platform.node(),
+                        "python": platform.python_version(),
+                    })
+            if args.profile_dir:
+                summary_path = os.path.join(args.profile_dir, rule_name + ".summary.txt")
+                if os.path.exists(summary_path):
+                    print(f"    profile: {summary_path}")
+            if args.trace_dir:
+                trace_path = os.path.join(args.trace_dir, rule_name + ".trace")
+                if os.path.exists(trace_path):
+                    print(f"    trace: {trace_path}")
+
+            checkpoint["rules"][rule_name] = {
+                "status": status,
+                "elapsed": round(elapsed, 3),
+                "finished_at": datetime.now().isoformat()
+            }
+            save_checkpoint(args.checkpoint, checkpoint)
+
+    print("\n" + "="*60)
+    print(f"\nSummary:")
+    print(f"  Successful: {len(successful)}")
+    print(f"  Skipped (already generated): {len(skipped)}")
+    print(f"  Failed: {len(failed)}")
+
+    if failed:
+        print(f"\nFailed rules:")
+        for rule in sorted(failed):
+            print(f"  - {rule}")
+        print(f"\nRe-run the same command to retry the failed rules.")
+    elif os.path.exists(args.checkpoint):
+        # The batch is complete, so the next run starts fresh
+        os.remove(args.checkpoint)
+
+    total_generated = len(successful) + len(skipped)
+    print(f"\nTotal generated: {total_generated}/{len(to_generate) + len(skipped)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
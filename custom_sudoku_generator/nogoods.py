@@ -0,0 +1,193 @@
+"""
+Nogood database for the grid fill.
+
+A nogood is a small set of placements (row, col, digit) that cannot all be
+part of a solution: with them on the grid some other cell has no digit left.
+``SudokuGenerator._fill_grid_learning`` records one whenever a cell runs out
+of digits, and afterwards refuses any placement that would complete a
+recorded nogood, instead of rediscovering the same dead end deeper in the
+tree.
+
+Nogoods are indexed by each of their placements, so checking a candidate
+placement is one dict lookup, and the database is bounded: long nogoods are
+not recorded (they rarely match again), and once ``capacity`` nogoods are
+stored the least recently used one is evicted.
+
+A nogood is only valid for the constraints and pre-filled cells it was
+learned with; the generator clears the database before each fill.
+
+When a rule's validate rejects a digit, the placements responsible are found
+by running validate once more on a grid view that records which cells it
+reads (``cells_read``): validate is a function of the cells it reads, so the
+filled ones among them explain the rejection.
+"""
+from collections import OrderedDict
+
+# Nogoods kept per generator
+DEFAULT_NOGOOD_CAPACITY = 10000
+# Longest nogood worth keeping (in placements)
+DEFAULT_MAX_NOGOOD_SIZE = 6
+
+
+class NogoodStore:
+    """
+    Bounded LRU set of nogoods, each a sorted tuple of (row, col, digit) placements.
+    """
+
+    def __init__(self, capacity=DEFAULT_NOGOOD_CAPACITY, max_size=DEFAULT_MAX_NOGOOD_SIZE):
+        """
+        Args:
+            capacity: Maximum number of nogoods kept
+            max_size: Longer nogoods are not recorded
+        """
+        self.capacity = capacity
+        self.max_size = max_size
+        self._nogoods = OrderedDict()
+        self._index = {}  # (row, col, digit) -> set of nogoods containing it
+
+        # Counters for monitoring (see SolverStats)
+        self.prunes = 0
+        self.recorded = 0
+        self.skipped = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._nogoods)
+
+    def match(self, grid, row, col, num):
+        """
+        Find a nogood that placing num at (row, col) would complete.
+
+        Returns:
+            The nogood, or None if the placement completes none
+        """
+        candidates = self._index.get((row, col, num))
+        if not candidates:
+            return None
+        for nogood in candidates:
+            if all(grid[r][c] == value for r, c, value in nogood if (r, c) != (row, col)):
+                self._nogoods.move_to_end(nogood)
+                self.prunes += 1
+                return nogood
+        return None
+
+    def add(self, placements):
+        """
+        Record a nogood.
+
+        Args:
+            placements: Iterable of (row, col, digit)
+
+        Returns:
+            bool: Whether the nogood was stored (False if too long)
+        """
+        nogood = tuple(sorted(placements))
+        if not nogood or len(nogood) > self.max_size:
+            self.skipped += 1
+            return False
+        if nogood in self._nogoods:
+            self._nogoods.move_to_end(nogood)
+            return True
+        self._nogoods[nogood] = None
+        for placement in nogood:
+            self._index.setdefault(placement, set()).add(nogood)
+        self.recorded += 1
+        if len(self._nogoods) > self.capacity:
+            evicted, _ = self._nogoods.popitem(last=False)
+            for placement in evicted:
+                self._index[placement].discard(evicted)
+            self.evictions += 1
+        return True
+
+    def clear(self):
+        """Forget all nogoods."""
+        self._nogoods.clear()
+        self._index.clear()
+
+    def stats(self):
+        """Return the database's counters."""
+        return {
+            "nogoods": len(self._nogoods),
+            "capacity": self.capacity,
+            "prunes": self.prunes,
+            "recorded": self.recorded,
+            "skipped": self.skipped,
+            "evictions": self.evictions,
+        }
+
+
+class _RecordingRow:
+    """Read-only view of a grid row that records the cells read."""
+
+    __slots__ = ("_row", "_index", "_reads")
+
+    def __init__(self, row, index, reads):
+        self._row = row
+        self._index = index
+        self._reads = reads
+
+    def __getitem__(self, col):
+        if isinstance(col, slice):
+            self._reads.update((self._index, c) for c in range(len(self._row))[col])
+        else:
+            self._reads.add((self._index, col % len(self._row)))
+        return self._row[col]
+
+    def __iter__(self):
+        self._reads.update((self._index, c) for c in range(len(self._row)))
+        return iter(self._row)
+
+    def __contains__(self, value):
+        self._reads.update((self._index, c) for c in range(len(self._row)))
+        return value in self._row
+
+    def __len__(self):
+        return len(self._row)
+
+    def __copy__(self):
+        raise TypeError("recorded grids cannot be copied")
+
+    __deepcopy__ = __copy__
+
+
+class _RecordingGrid:
+    """Read-only view of a grid whose rows record the cells read."""
+
+    __slots__ = ("_rows",)
+
+    def __init__(self, grid, reads):
+        self._rows = [_RecordingRow(row, index, reads) for index, row in enumerate(grid)]
+
+    def __getitem__(self, index):
+        return self._rows[index]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __copy__(self):
+        raise TypeError("recorded grids cannot be copied")
+
+    __deepcopy__ = __copy__
+
+
+def cells_read(validate, grid, row, col, num):
+    """
+    Run validate on a view of the grid and return the cells it read.
+
+    Args:
+        validate: A rule's validate(grid, row, col, num)
+        grid: The grid (not modified)
+
+    Returns:
+        tuple: (result of validate, set of (row, col) read), or (None, None)
+               if validate used the grid in a way the view does not support
+    """
+    reads = set()
+    try:
+        result = validate(_RecordingGrid(grid, reads), row, col, num)
+    except Exception:
+        return None, None
+    return result, reads
@@ -29,10 +29,10 @@ def time_generation(rule_folder, mode='auto'):
     try:
         if mode == 'reverse' or (mode == 'auto' and custom_rule.supports_reverse_generation()):
             print(f"  Testing REVERSE generation for {custom_rule.name}...")
-            puzzle, solution = generate_sudoku_reverse(custom_rule, rule_folder, difficulty_attempts=5)
+            puzzle, solution = generate_sudoku_reverse(custom_rule, rule_folder, difficulty_attempts=5, save=False)
         else:
             print(f"  Testing FORWARD generation for {custom_rule.name}...")
-            puzzle, solution = generate_sudoku_forward(custom_rule, rule_folder, difficulty_attempts=5)
+            puzzle, solution = generate_sudoku_forward(custom_rule, rule_folder, difficulty_attempts=5, save=False)
 
         elapsed = time.time() - start_time
         success = puzzle is not None and solution is not None
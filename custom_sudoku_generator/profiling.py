@@ -0,0 +1,212 @@
+"""
+Profiling of a single rule's generation.
+
+``Profiler`` wraps a block in cProfile and writes, per rule:
+
+- ``<name>.pstats``: cProfile data for ``python -m pstats``, snakeviz, etc.
+- ``<name>.collapsed``: sampled call stacks in the collapsed format
+  (``frame;frame;frame count``) read by flamegraph.pl, speedscope and inferno.
+  cProfile only records caller/callee pairs, which cannot be turned back into
+  stacks through the generator's recursion, so stacks are sampled separately
+  with SIGPROF where available.
+- ``<name>.summary.txt``: the top functions by own time and by cumulative
+  time, plus the largest allocation sites when tracemalloc is enabled.
+
+SIGTERM is turned into a normal exit while profiling, so a run that is
+stopped by generate_all.py's time budget still writes its report.
+
+Usage:
+    with Profiler("profiles", "sudoku_killer_rule", memory=True):
+        generate_sudoku_for_rule("sudoku_killer_rule")
+"""
+import cProfile
+import os
+import pstats
+import signal
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+DEFAULT_TOP = 20
+# Seconds of CPU time between stack samples
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+def frame_label(code):
+    """Collapsed-stack label for a code object: ``name (file:line)``."""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Counts call stacks on a CPU-time timer (SIGPROF).
+
+    Only works in the main thread on platforms with SIGPROF; otherwise
+    ``available`` is False and no samples are collected.
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self._labels = {}  # code object -> frame_label(code)
+        self.available = (hasattr(signal, "SIGPROF")
+                          and threading.current_thread() is threading.main_thread())
+        self._previous = None
+
+    def _sample(self, signum, frame):
+        labels = self._labels
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                label = labels[code] = frame_label(code)
+            stack.append(label)
+            frame = frame.f_back
+        self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        if self.available:
+            self._previous = signal.signal(signal.SIGPROF, self._sample)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        if self.available:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self._previous)
+
+    def write(self, path):
+        """Write the samples in collapsed format, most frequent stacks first."""
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def top_functions(stats, sort_key, top=DEFAULT_TOP):
+    """
+    Format the top entries of a pstats.Stats as a table.
+
+    Args:
+        stats: pstats.Stats
+        sort_key: "tottime" or "cumulative"
+        top: Number of rows
+
+    Returns:
+        list: Lines of text
+    """
+    index = 2 if sort_key == "tottime" else 3
+    # Leave out the stack sampler's own frames
+    entries = [item for item in stats.stats.items() if item[0][0] != __file__]
+    rows = sorted(entries, key=lambda item: item[1][index], reverse=True)[:top]
+    lines = [f"{'calls':>12} {'own s':>9} {'cum s':>9}  function"]
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in rows:
+        location = f"{os.path.basename(filename)}:{line}" if line else filename
+        lines.append(f"{calls:>12} {tottime:>9.3f} {cumtime:>9.3f}  {name} ({location})")
+    return lines
+
+
+class _Terminated(BaseException):
+    """
+    Raised inside the profiled block when the process receives SIGTERM.
+
+    A BaseException, so ``except Exception`` in rule code does not swallow it.
+    """
+
+
+class Profiler:
+    """
+    Context manager that profiles a block and writes the report files.
+
+    Args:
+        out_dir: Directory for the report files (created if missing)
+        name: File name stem, usually the rule folder name
+        memory: Also trace allocations with tracemalloc (slows generation noticeably)
+        top: Rows per summary table
+        interval: Seconds of CPU time between stack samples
+        quiet: Do not print the summary
+    """
+
+    def __init__(self, out_dir, name, memory=False, top=DEFAULT_TOP,
+                 interval=DEFAULT_SAMPLE_INTERVAL, quiet=False):
+        self.out_dir = out_dir
+        self.name = name
+        self.memory = memory
+        self.top = top
+        self.quiet = quiet
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(interval)
+        self.paths = {}
+        self._previous_sigterm = None
+        self._started = None
+
+    def _terminate(self, signum, frame):
+        raise _Terminated()
+
+    def __enter__(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        if threading.current_thread() is threading.main_thread():
+            self._previous_sigterm = signal.signal(signal.SIGTERM, self._terminate)
+        if self.memory:
+            tracemalloc.start()
+        self._started = time.perf_counter()
+        self.sampler.start()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profile.disable()
+        self.sampler.stop()
+        elapsed = time.perf_counter() - self._started
+        snapshot, peak = None, None
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, tracemalloc.__file__),
+            ])
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if self._previous_sigterm is not None:
+            signal.signal(signal.SIGTERM, self._previous_sigterm)
+
+        interrupted = exc_type is not None
+        self.write(elapsed, snapshot, peak, interrupted)
+        if exc_type is _Terminated:
+            # Exit the way SIGTERM would have, now that the report is written
+            raise SystemExit(128 + signal.SIGTERM)
+        return False
+
+    def write(self, elapsed, snapshot=None, peak=None, interrupted=False):
+        """Write the .pstats, .collapsed and .summary.txt files."""
+        stem = os.path.join(self.out_dir, self.name)
+        self.paths = {
+            "pstats": stem + ".pstats",
+            "collapsed": stem + ".collapsed",
+            "summary": stem + ".summary.txt",
+        }
+        self.profile.dump_stats(self.paths["pstats"])
+        if self.sampler.available:
+            self.sampler.write(self.paths["collapsed"])
+        else:
+            del self.paths["collapsed"]
+
+        stats = pstats.Stats(self.profile)
+        lines = [f"Profile of {self.name}: {elapsed:.2f}s wall"
+                 + (" (interrupted)" if interrupted else "")]
+        lines.append(f"Stack samples: {sum(self.sampler.samples.values())}")
+        lines += ["", f"Top {self.top} by own time:"] + top_functions(stats, "tottime", self.top)
+        lines += ["", f"Top {self.top} by cumulative time:"] + top_functions(stats, "cumulative", self.top)
+        if snapshot is not None:
+            lines += ["", f"Peak traced memory: {peak / 1024:.1f} KiB", f"Top {self.top} allocation sites:"]
+            for stat in snapshot.statistics("lineno")[:self.top]:
+                frame = stat.traceback[0]
+                lines.append(f"{stat.size / 1024:>10.1f} KiB {stat.count:>8} blocks  "
+                             f"{os.path.basename(frame.filename)}:{frame.lineno}")
+        lines += ["", "Files:"] + [f"  {path}" for path in self.paths.values()]
+
+        summary = "\n".join(lines) + "\n"
+        with open(self.paths["summary"], "w") as f:
+            f.write(summary)
+        if not self.quiet:
+            print("\n" + summary)
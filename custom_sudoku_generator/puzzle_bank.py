@@ -0,0 +1,357 @@
+"""
+Binary puzzle bank: many puzzles for one rule in a single memory-mapped file.
+
+The text files in a rule folder hold exactly one puzzle and have to be parsed
+line by line. A bank stores thousands of puzzles with fixed-width records, so
+``bank[i]`` is a constant-time slice of a memory-mapped file. Several processes
+(e.g. gunicorn workers) opening the same bank share one copy in the page cache.
+
+File layout (all integers little-endian):
+
+    header      64 bytes   magic, version, grid size, record count,
+                           blob offset/size, rule name
+    records     count * record_size bytes
+    blob        JSON document per record (metadata and rule constraints)
+
+Each record holds:
+
+    givens      size*size bytes, one digit per cell (0 = empty)
+    solution    size*size digits packed two per byte (4-bit nibbles)
+    blob_offset uint32, offset of the record's JSON relative to the blob start
+    blob_length uint32
+
+Usage:
+    python puzzle_bank.py info banks/sudoku_killer_rule.bank
+    python puzzle_bank.py show banks/sudoku_killer_rule.bank 17
+    python puzzle_bank.py convert banks/sudoku_killer_rule.jsonl banks/sudoku_killer_rule.bank
+"""
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+MAGIC = b"SDKB"
+VERSION = 1
+
+# magic, version, header size, grid size, record size, count, blob offset, blob size, rule name
+HEADER_FORMAT = "<4sHHHHIQQ32s"
+HEADER_SIZE = 64
+_HEADER_STRUCT = struct.Struct(HEADER_FORMAT)
+_BLOB_REF = struct.Struct("<II")
+
+
+class BankFormatError(ValueError):
+    """Raised when a file is not a valid puzzle bank."""
+
+
+def record_size(size=9):
+    """Return the record width in bytes for a grid of the given size."""
+    cells = size * size
+    return cells + (cells + 1) // 2 + _BLOB_REF.size
+
+
+def _pack_header(size, count, blob_offset, blob_size, rule):
+    header = _HEADER_STRUCT.pack(
+        MAGIC, VERSION, HEADER_SIZE, size, record_size(size),
+        count, blob_offset, blob_size, rule.encode("utf-8")[:32])
+    return header.ljust(HEADER_SIZE, b"\0")
+
+
+def _unpack_header(data):
+    if len(data) < HEADER_SIZE:
+        raise BankFormatError("File too small to be a puzzle bank")
+    magic, version, header_size, size, rec_size, count, blob_offset, blob_size, rule = \
+        _HEADER_STRUCT.unpack_from(data)
+    if magic != MAGIC:
+        raise BankFormatError("Not a puzzle bank (bad magic)")
+    if version != VERSION:
+        raise BankFormatError(f"Unsupported puzzle bank version {version}")
+    if rec_size != record_size(size):
+        raise BankFormatError("Record size does not match grid size")
+    return {
+        "header_size": header_size,
+        "size": size,
+        "record_size": rec_size,
+        "count": count,
+        "blob_offset": blob_offset,
+        "blob_size": blob_size,
+        "rule": rule.rstrip(b"\0").decode("utf-8"),
+    }
+
+
+def _pack_nibbles(values):
+    values = list(values)
+    if len(values) % 2:
+        values.append(0)
+    return bytes((values[i] << 4) | values[i + 1] for i in range(0, len(values), 2))
+
+
+def _unpack_nibbles(data, count):
+    values = []
+    for byte in data:
+        values.append(byte >> 4)
+        values.append(byte & 0x0F)
+    return values[:count]
+
+
+def _copy_bytes(src, dst, length):
+    """Copy exactly length bytes from src to dst."""
+    while length > 0:
+        chunk = src.read(min(length, 1 << 20))
+        if not chunk:
+            raise BankFormatError("Puzzle bank is truncated")
+        dst.write(chunk)
+        length -= len(chunk)
+
+
+class PuzzleBankWriter:
+    """
+    Streaming writer for a puzzle bank.
+
+    Records are written to a temporary file next to the bank while their JSON
+    blobs are spooled to a second temporary file; close() appends the blob,
+    writes the header and moves the finished bank into place with os.replace.
+    The bank at ``path`` is therefore never seen half-written: a run that
+    crashes or is killed leaves it unchanged, and readers that have it
+    memory-mapped keep reading the old file. Use the writer as a context
+    manager so the bank is finalized even on KeyboardInterrupt.
+    """
+
+    def __init__(self, path, rule="", size=9, append=False):
+        """
+        Open a bank for writing.
+
+        Args:
+            path: Path to the bank file
+            rule: Rule name stored in the header
+            size: Grid size (default 9)
+            append: Add to an existing bank instead of replacing it
+        """
+        self.path = path
+        self.size = size
+        self.rule = rule
+        self.count = 0
+        self._cells = size * size
+        self._blob = tempfile.TemporaryFile()
+        self._blob_size = 0
+        self._mode = 0o644
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".",
+                                              suffix=".tmp")
+        self._file = os.fdopen(fd, "w+b")
+        self._file.write(_pack_header(size, 0, HEADER_SIZE, 0, rule))
+
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            try:
+                with open(path, "rb") as existing:
+                    header = _unpack_header(existing.read(HEADER_SIZE))
+                    if header["size"] != size:
+                        raise BankFormatError(f"Bank grid size {header['size']} does not match {size}")
+                    self.rule = header["rule"] or rule
+                    self.count = header["count"]
+                    self._mode = os.stat(existing.fileno()).st_mode & 0o777
+                    # Copy the existing records, and their blob to the blob spool
+                    existing.seek(header["header_size"])
+                    _copy_bytes(existing, self._file, header["blob_offset"] - header["header_size"])
+                    existing.seek(header["blob_offset"])
+                    _copy_bytes(existing, self._blob, header["blob_size"])
+                    self._blob_size = header["blob_size"]
+            except BaseException:
+                self._discard()
+                raise
+
+    def append(self, record):
+        """
+        Add a puzzle record.
+
+        Args:
+            record: Dictionary with "puzzle" and "solution" grids; every other
+                    key is stored in the record's JSON blob
+
+        Returns:
+            int: Index of the new record
+        """
+        givens = [value for row in record["puzzle"] for value in row]
+        solution = [value for row in record["solution"] for value in row]
+        if len(givens) != self._cells or len(solution) != self._cells:
+            raise ValueError(f"Expected {self.size}x{self.size} grids")
+
+        extra = {key: value for key, value in record.items() if key not in ("puzzle", "solution")}
+        blob = json.dumps(extra, separators=(",", ":")).encode("utf-8")
+
+        self._file.write(bytes(givens))
+        self._file.write(_pack_nibbles(solution))
+        self._file.write(_BLOB_REF.pack(self._blob_size, len(blob)))
+        self._blob.write(blob)
+        self._blob_size += len(blob)
+
+        self.count += 1
+        return self.count - 1
+
+    def close(self):
+        """Append the blob, write the final header and move the bank into place."""
+        if self._file is None:
+            return
+        try:
+            blob_offset = self._file.tell()
+            self._blob.seek(0)
+            shutil.copyfileobj(self._blob, self._file)
+            self._file.seek(0)
+            self._file.write(_pack_header(self.size, self.count, blob_offset, self._blob_size, self.rule))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.chmod(self._tmp_path, self._mode)
+            os.replace(self._tmp_path, self.path)
+        except BaseException:
+            self._discard()
+            raise
+        self._blob.close()
+        self._file = None
+
+    def _discard(self):
+        """Drop the unfinished bank, leaving the one at self.path untouched."""
+        self._file.close()
+        self._blob.close()
+        self._file = None
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class PuzzleBank:
+    """
+    Read-only, memory-mapped view of a puzzle bank.
+
+    ``bank[i]`` decodes a single record without reading the rest of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            self._file.close()
+            raise BankFormatError("File too small to be a puzzle bank")
+        try:
+            header = _unpack_header(self._mmap[:HEADER_SIZE])
+        except BankFormatError:
+            self.close()
+            raise
+        self.size = header["size"]
+        self.rule = header["rule"]
+        self.record_size = header["record_size"]
+        self._count = header["count"]
+        self._records_offset = header["header_size"]
+        self._blob_offset = header["blob_offset"]
+        self._cells = self.size * self.size
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        givens, solution, blob_start, blob_length = self._read(index)
+        record = json.loads(self._mmap[blob_start:blob_start + blob_length])
+        record["puzzle"] = self._to_grid(givens)
+        record["solution"] = self._to_grid(solution)
+        return record
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def givens(self, index):
+        """Return the flat list of givens for a record (0 = empty cell)."""
+        return list(self._read(index)[0])
+
+    def metadata(self, index):
+        """Return only the JSON blob of a record (metadata and constraints)."""
+        _, _, blob_start, blob_length = self._read(index)
+        return json.loads(self._mmap[blob_start:blob_start + blob_length])
+
+    def digest(self):
+        """Return the SHA-256 hex digest of the whole file (e.g. to spot a rebuilt bank)."""
+        return hashlib.sha256(self._mmap).hexdigest()
+
+    def _read(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("puzzle bank index out of range")
+
+        start = self._records_offset + index * self.record_size
+        givens = self._mmap[start:start + self._cells]
+        packed_end = start + self._cells + (self._cells + 1) // 2
+        solution = _unpack_nibbles(self._mmap[start + self._cells:packed_end], self._cells)
+        blob_offset, blob_length = _BLOB_REF.unpack_from(self._mmap, packed_end)
+        return givens, solution, self._blob_offset + blob_offset, blob_length
+
+    def _to_grid(self, values):
+        return [list(values[r * self.size:(r + 1) * self.size]) for r in range(self.size)]
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def convert_jsonl(jsonl_path, bank_path, rule=""):
+    """
+    Convert a JSON Lines bank (see bulk.write_bank) into a binary bank.
+
+    Returns:
+        int: Number of records converted
+    """
+    with open(jsonl_path, "r", encoding="utf-8") as src, PuzzleBankWriter(bank_path, rule=rule) as writer:
+        for line in src:
+            line = line.strip()
+            if line:
+                writer.append(json.loads(line))
+        return writer.count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "info":
+        with PuzzleBank(sys.argv[2]) as bank:
+            print(f"Rule: {bank.rule or '(unknown)'}")
+            print(f"Grid size: {bank.size}")
+            print(f"Puzzles: {len(bank)}")
+            print(f"Record size: {bank.record_size} bytes")
+    elif len(sys.argv) >= 4 and sys.argv[1] == "show":
+        with PuzzleBank(sys.argv[2]) as bank:
+            record = bank[int(sys.argv[3])]
+            print("Puzzle:")
+            for row in record["puzzle"]:
+                print(row)
+            print("\nSolution:")
+            for row in record["solution"]:
+                print(row)
+    elif len(sys.argv) >= 4 and sys.argv[1] == "convert":
+        rule = os.path.splitext(os.path.basename(sys.argv[3]))[0]
+        converted = convert_jsonl(sys.argv[2], sys.argv[3], rule=rule)
+        print(f"Converted {converted} puzzle(s) to {sys.argv[3]}")
+    else:
+        print("Usage:")
+        print("  python puzzle_bank.py info <bank>")
+        print("  python puzzle_bank.py show <bank> <index>")
+        print("  python puzzle_bank.py convert <input.jsonl> <output.bank>")
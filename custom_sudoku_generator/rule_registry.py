@@ -0,0 +1,135 @@
+"""
+Registry of custom rule modules.
+
+Each rule folder's ``rule.py`` is imported once, under its own module name,
+and its factory is cached. Creating a rule instance afterwards is just a call
+to the factory; the module is only re-imported when ``rule.py`` changes on disk.
+"""
+import importlib.util
+import os
+import sys
+import threading
+
+from base_rule import BaseRule
+
+
+def module_name_for(rule_folder):
+    """Return the unique module name a rule folder is imported under."""
+    return "custom_rule_" + os.path.basename(os.path.normpath(rule_folder))
+
+
+class RuleRegistry:
+    """
+    Discovers rule folders and caches their compiled modules and factories.
+    """
+
+    def __init__(self, base_folder=None):
+        """
+        Args:
+            base_folder: Folder containing the rule folders (defaults to this directory)
+        """
+        if base_folder is None:
+            base_folder = os.path.dirname(os.path.abspath(__file__))
+        self.base_folder = base_folder
+        self._factories = {}      # rule.py path -> (mtime, factory)
+        self._folders = None      # (directory mtime, sorted rule folders)
+        self._lock = threading.RLock()
+
+    def discover(self):
+        """
+        Return all rule folders (folders containing a rule.py), sorted by name.
+
+        The listing is cached until the base folder itself changes.
+        """
+        mtime = os.stat(self.base_folder).st_mtime_ns
+        with self._lock:
+            if self._folders is not None and self._folders[0] == mtime:
+                return list(self._folders[1])
+
+            rule_folders = []
+            for item in os.listdir(self.base_folder):
+                item_path = os.path.join(self.base_folder, item)
+                if os.path.isdir(item_path) and os.path.exists(os.path.join(item_path, "rule.py")):
+                    rule_folders.append(item_path)
+            rule_folders.sort()
+            self._folders = (mtime, rule_folders)
+            return list(rule_folders)
+
+    def get_factory(self, rule_folder):
+        """
+        Return a callable that creates a fresh instance of the folder's rule.
+
+        Args:
+            rule_folder: Path to the folder containing rule.py
+
+        Returns:
+            The factory, or None if the folder has no usable rule
+        """
+        rule_file = os.path.abspath(os.path.join(rule_folder, "rule.py"))
+        try:
+            mtime = os.stat(rule_file).st_mtime_ns
+        except OSError:
+            print(f"Warning: No rule.py found in {rule_folder}")
+            return None
+
+        with self._lock:
+            cached = self._factories.get(rule_file)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+            factory = self._load_factory(rule_folder, rule_file)
+            self._factories[rule_file] = (mtime, factory)
+            return factory
+
+    def create(self, rule_folder):
+        """
+        Create a fresh rule instance for a folder.
+
+        Returns:
+            An instance of the custom rule class (BaseRule if none is found)
+        """
+        factory = self.get_factory(rule_folder)
+        if factory is None:
+            return BaseRule()
+        return factory()
+
+    def clear(self):
+        """Forget all cached modules and listings."""
+        with self._lock:
+            self._factories.clear()
+            self._folders = None
+
+    def _load_factory(self, rule_folder, rule_file):
+        name = module_name_for(rule_folder)
+        spec = importlib.util.spec_from_file_location(name, rule_file)
+        module = importlib.util.module_from_spec(spec)
+        # Register the module so rule instances can be pickled for worker processes
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+
+        # Try the create_rule factory function
+        if hasattr(module, 'create_rule'):
+            return module.create_rule
+
+        # Look for a class that inherits from BaseRule
+        for item_name in dir(module):
+            item = getattr(module, item_name)
+            if isinstance(item, type) and issubclass(item, BaseRule) and item is not BaseRule:
+                return item
+
+        print(f"Warning: No valid rule class found in {rule_file}")
+        return None
+
+
+_registries = {}
+
+
+def get_registry(base_folder=None):
+    """Return the shared registry for a base folder (defaults to this directory)."""
+    if base_folder is None:
+        base_folder = os.path.dirname(os.path.abspath(__file__))
+    base_folder = os.path.abspath(base_folder)
+    registry = _registries.get(base_folder)
+    if registry is None:
+        registry = _registries.setdefault(base_folder, RuleRegistry(base_folder))
+    return registry
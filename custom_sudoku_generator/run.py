@@ -2,16 +2,143 @@ import random
 import copy
 import os
 import json
-import importlib.util
+import platform
+import time
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 from base_rule import BaseRule
+from rule_registry import get_registry
+from nogoods import NogoodStore, cells_read
+from transposition import DEFAULT_TRANSPOSITION_SIZE, TranspositionTable, zobrist_hash, zobrist_keys
+
+# Emit a progress event every this many backtracks while filling the grid
+PROGRESS_BACKTRACK_INTERVAL = 1000
+
+# With nogood learning, the fill restarts after RESTART_BACKTRACKS * luby(n)
+# backtracks, keeping what it learned
+RESTART_BACKTRACKS = 256
+
+# JSON Lines log the batch drivers append one record per generated rule to
+DEFAULT_GENERATION_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generation_log.jsonl")
+
+
+def report_progress(progress, phase, message, **counters):
+    """
+    Send a progress event to a callback, or print the message if there is none.
+
+    Args:
+        progress: Callable taking an event dict, or None to print instead
+        phase: Generation phase ("start", "solution", "constraints", "removal",
+               "done" or "failed")
+        message: Human-readable description of the step
+        **counters: Extra event fields (backtracks, cells_removed, attempts_left)
+    """
+    if progress is None:
+        print(message)
+        return
+    event = {"phase": phase, "message": message}
+    event.update(counters)
+    progress(event)
+
+
+@contextmanager
+def timed_phase(report, phase):
+    """
+    Add the time spent in the block to report["timings"][phase].
+
+    Args:
+        report: Dict collecting the run's record, or None to skip timing
+        phase: Phase name ("load_rule", "fill", "derive", "removal", "save")
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if report is not None:
+            timings = report.setdefault("timings", {})
+            timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+
+
+class GenerationResult(tuple):
+    """
+    (puzzle_grid, solution_grid) plus a record describing the run.
+
+    Unpacks like the plain tuple generate_sudoku_for_rule used to return. The
+    record holds the rule, generation mode, seed, difficulty attempts,
+    attempts used, clue count and per-phase timings in seconds, and is
+    JSON-serializable so the batch drivers can log it.
+    """
+
+    def __new__(cls, puzzle_grid, solution_grid, record):
+        result = super().__new__(cls, (puzzle_grid, solution_grid))
+        result.record = record
+        return result
+
+    @property
+    def puzzle(self):
+        return self[0]
+
+    @property
+    def solution(self):
+        return self[1]
+
+
+def luby(index):
+    """
+    Return the index-th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, ...
+
+    Restart limits following it waste at most a logarithmic factor over the
+    best fixed limit, without having to know that limit.
+    """
+    while True:
+        bits = index.bit_length()
+        if index == (1 << bits) - 1:
+            return 1 << (bits - 1)
+        index -= (1 << (bits - 1)) - 1
+
+
+def append_generation_log(path, record):
+    """Append a record to a JSON Lines log as a single write."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
 
 class SudokuGenerator:
-    def __init__(self, size=9, box_size=3, custom_rule=None):
+    def __init__(self, size=9, box_size=3, custom_rule=None, progress=None, stats=None, trace=None,
+                 transposition_size=DEFAULT_TRANSPOSITION_SIZE, learn_nogoods=None):
         self.size = size              # 9 for classic Sudoku
         self.box_size = box_size      # 3 for classic Sudoku (3x3 boxes)
         self.grid = [[0]*size for _ in range(size)]
         self.custom_rule_instance = custom_rule if custom_rule else BaseRule(size, box_size)
+        # Optional callback receiving progress event dicts (see report_progress)
+        self.progress = progress
+        self.backtracks = 0
+        # Failed removals in the last remove_numbers call
+        self.removal_attempts_used = 0
+        # Completion counts of grid states seen by count_solutions (0 disables)
+        self.transposition = TranspositionTable(transposition_size) if transposition_size else None
+        self.zobrist = zobrist_keys(size)
+        # Backjumping and nogood learning in the fill (see _fill_grid_learning);
+        # by default only for rules that ask for it or are highly restrictive
+        if learn_nogoods is None:
+            learn_nogoods = (getattr(self.custom_rule_instance, 'learn_nogoods', False)
+                             or getattr(self.custom_rule_instance, 'is_highly_restrictive', False))
+        self.nogoods = NogoodStore() if learn_nogoods else None
+        self.backjumps = 0
+        self.restarts = 0
+        self._backtrack_limit = None  # restart once self.backtracks reaches it
+        self._restarting = False
+        self._fill_stack = []   # (row, col) of the fill's placements, in order
+        self._fill_levels = {}  # (row, col) -> index in _fill_stack
+        self._conflict = set()  # levels responsible for the last failed _fill_grid call
+        self._peers = {}        # (row, col) -> cells sharing its row, column or box
+        # Optional SolverStats; counting wrappers are only installed when given
+        if stats is not None:
+            stats.attach(self)
+        # Optional search_trace.SearchTrace recording the fill search
+        if trace is not None:
+            trace.attach(self)
 
 
     def is_valid(self, grid, row, col, num):
@@ -58,6 +185,13 @@ class SudokuGenerator:
 
     def generate_full_grid(self):
         self.grid = [[0]*self.size for _ in range(self.size)]
+        # pre_fill_grid may set new constraints, invalidating cached completion counts
+        if self.transposition is not None:
+            self.transposition.clear()
+        if self.nogoods is not None:
+            self.nogoods.clear()
+        self._fill_stack = []
+        self._fill_levels = {}
 
         # Check if the rule supports pre-filling (e.g., magic square)
         if hasattr(self.custom_rule_instance, 'pre_fill_grid'):
@@ -65,10 +199,39 @@ class SudokuGenerator:
             if not success:
                 print("Warning: Pre-fill failed, but continuing anyway...")
 
-        self._fill_grid(self.grid)
+        if self.nogoods is None:
+            self._fill_grid(self.grid)
+        else:
+            self._fill_with_restarts(self.grid)
         return self.grid
 
+    def _fill_with_restarts(self, grid):
+        """
+        Fill the grid with _fill_grid_learning, restarting whenever the search
+        uses up its backtrack budget.
+
+        A run that went wrong early can spend exponential time below that
+        mistake; a restart picks new random digits from the top, and the
+        nogoods learned so far keep it from repeating the old dead ends.
+        """
+        attempt = 1
+        while True:
+            self._backtrack_limit = self.backtracks + RESTART_BACKTRACKS * luby(attempt)
+            self._restarting = False
+            if self._fill_grid(grid):
+                return True
+            if not self._restarting:
+                return False  # no solution with these constraints
+            self.restarts += 1
+            attempt += 1
+            if self.progress is not None:
+                report_progress(self.progress, "solution",
+                                f"Restarting fill ({self.restarts} restarts, {len(self.nogoods)} nogoods)...",
+                                backtracks=self.backtracks)
+
     def _fill_grid(self, grid):
+        if self.nogoods is not None:
+            return self._fill_grid_learning(grid)
         empty = self._find_empty(grid)
         if not empty:
             return True
@@ -82,8 +245,107 @@ class SudokuGenerator:
                 if self._fill_grid(grid):
                     return True
                 grid[row][col] = 0
+                self.backtracks += 1
+                if self.progress is not None and self.backtracks % PROGRESS_BACKTRACK_INTERVAL == 0:
+                    report_progress(self.progress, "solution",
+                                    f"Filling grid ({self.backtracks} backtracks)...",
+                                    backtracks=self.backtracks)
         return False
 
+    def _fill_grid_learning(self, grid):
+        """
+        _fill_grid with conflict-directed backjumping and nogood learning.
+
+        A failed call leaves in self._conflict the levels (indices into
+        self._fill_stack) of the placements that caused the failure. A caller
+        whose own placement is not among them returns at once, because another
+        digit there would fail the same way (a backjump). When a cell runs out
+        of digits, the placements responsible are recorded in self.nogoods,
+        and placements completing a recorded nogood are skipped from then on.
+
+        Rejections are explained by _explain_rejection once the cell has run
+        out of digits; most rejections happen in cells that do get filled.
+        """
+        empty = self._find_empty(grid)
+        if not empty:
+            return True
+        row, col = empty
+        stack = self._fill_stack
+        levels = self._fill_levels
+        level = len(stack)
+        conflict = set()
+        rejected = []
+
+        nums = list(range(1, self.size+1))
+        random.shuffle(nums)
+        for num in nums:
+            nogood = self.nogoods.match(grid, row, col, num)
+            if nogood is not None:
+                conflict.update(levels[r, c] for r, c, _ in nogood if (r, c) != (row, col))
+                continue
+            if not self.is_valid(grid, row, col, num):
+                rejected.append(num)
+                continue
+            grid[row][col] = num
+            levels[row, col] = level
+            stack.append((row, col))
+            if self._fill_grid(grid):
+                return True
+            stack.pop()
+            del levels[row, col]
+            grid[row][col] = 0
+            if self._restarting:
+                return False
+            self.backtracks += 1
+            if self.progress is not None and self.backtracks % PROGRESS_BACKTRACK_INTERVAL == 0:
+                report_progress(self.progress, "solution",
+                                f"Filling grid ({self.backtracks} backtracks)...",
+                                backtracks=self.backtracks)
+            if self._backtrack_limit is not None and self.backtracks >= self._backtrack_limit:
+                # Unwind to _fill_with_restarts
+                self._restarting = True
+                return False
+            child_conflict = self._conflict
+            if level not in child_conflict:
+                self.backjumps += 1
+                return False
+            child_conflict.discard(level)
+            conflict |= child_conflict
+
+        for num in rejected:
+            conflict |= self._explain_rejection(grid, row, col, num)
+        self.nogoods.add((stack[l][0], stack[l][1], grid[stack[l][0]][stack[l][1]]) for l in conflict)
+        self._conflict = conflict
+        return False
+
+    def _explain_rejection(self, grid, row, col, num):
+        """
+        Find fill placements that make is_valid reject num at (row, col).
+
+        Returns:
+            set: Levels in self._fill_stack (empty if the pre-filled cells alone reject it)
+        """
+        levels = self._fill_levels
+        peers = self._peers.get((row, col))
+        if peers is None:
+            peers = [(row, c) for c in range(self.size) if c != col] + [(r, col) for r in range(self.size) if r != row]
+            if self.custom_rule_instance.use_standard_boxes:
+                box_row = (row // self.box_size) * self.box_size
+                box_col = (col // self.box_size) * self.box_size
+                peers += [(r, c) for r in range(box_row, box_row + self.box_size)
+                          for c in range(box_col, box_col + self.box_size) if r != row and c != col]
+            self._peers[row, col] = peers
+        culprits = [levels.get(peer, -1) for peer in peers if grid[peer[0]][peer[1]] == num]
+        if culprits:
+            # The earliest culprit allows the longest backjump
+            return set() if min(culprits) < 0 else {min(culprits)}
+
+        # Rejected by the rule: the placements among the cells validate reads
+        ok, reads = cells_read(self.custom_rule_instance.validate, grid, row, col, num)
+        if reads is None or ok:
+            return set(range(len(self._fill_stack)))
+        return {levels[cell] for cell in reads if cell in levels}
+
     def _find_empty(self, grid):
         for r in range(self.size):
             for c in range(self.size):
@@ -94,6 +356,7 @@ class SudokuGenerator:
     # Remove clues while ensuring unique solution
     def remove_numbers(self, attempts=5):
         grid = copy.deepcopy(self.grid)
+        initial_attempts = attempts
 
         # Get priority cells from the rule (cells that should be removed first)
         priority_cells = []
@@ -103,8 +366,8 @@ class SudokuGenerator:
             priority_cells = [(r, c) for r, c in priority_cells if grid[r][c] != 0]
             random.shuffle(priority_cells)  # Randomize order within priority cells
 
-        cells_attempted = 0
         priority_index = 0
+        cells_removed = 0
 
         while attempts > 0:
             # First try priority cells, then fall back to random cells
@@ -139,19 +402,51 @@ class SudokuGenerator:
                 attempts -= 1
             else:
                 self.grid = grid
+                cells_removed += 1
+
+            if self.progress is not None:
+                report_progress(self.progress, "removal",
+                                f"Removed {cells_removed} cells, {attempts} attempts left",
+                                backtracks=self.backtracks, cells_removed=cells_removed,
+                                attempts_left=attempts)
+        self.removal_attempts_used = initial_attempts - attempts
         return grid
 
-    def count_solutions(self, grid, count):
+    def count_solutions(self, grid, count, key=None):
+        """
+        Count the solutions of a grid, stopping as soon as there are two.
+
+        Args:
+            grid: Grid to complete (modified in place)
+            count: Solutions found so far
+            key: Zobrist hash of grid, maintained by the recursion
+
+        Returns:
+            int: count plus the solutions found; more than 1 means "not unique"
+        """
+        table = self.transposition
         for row in range(self.size):
             for col in range(self.size):
                 if grid[row][col] == 0:
+                    if table is not None:
+                        if key is None:
+                            key = zobrist_hash(grid, self.zobrist)
+                        completions = table.get(key)
+                        if completions is not None:
+                            return min(count + completions, 2)
+                    cell_keys = self.zobrist[row][col]
+                    start = count
                     for num in range(1, self.size + 1):
                         if self.is_valid(grid, row, col, num):
                             grid[row][col] = num
-                            count = self.count_solutions(grid, count)
+                            count = self.count_solutions(grid, count, None if table is None else key ^ cell_keys[num])
                             if count > 1:  # Early stop if more than 1 solution
+                                if table is not None and start == 0:
+                                    table.put(key, 2)  # Two or more
                                 return count
                             grid[row][col] = 0
+                    if table is not None:
+                        table.put(key, count - start)
                     return count
         return count + 1
 
@@ -164,73 +459,81 @@ class SudokuGenerator:
             puzzle_grid: The puzzle grid (with some cells empty)
             solution_grid: The complete solution grid
         """
-        os.makedirs(output_folder, exist_ok=True)
-
-        # Save puzzle
-        puzzle_path = os.path.join(output_folder, "sudoku.txt")
-        with open(puzzle_path, 'w') as f:
-            for row in puzzle_grid:
-                f.write(str(row) + '\n')
-
-        # Save solution
-        solution_path = os.path.join(output_folder, "solution.txt")
-        with open(solution_path, 'w') as f:
-            for row in solution_grid:
-                f.write(str(row) + '\n')
-
-        # Save metadata
-        metadata = {
-            "rule": self.custom_rule_instance.get_metadata(),
-            "generated_at": datetime.now().isoformat(),
-            "size": self.size,
-            "box_size": self.box_size
-        }
-        metadata_path = os.path.join(output_folder, "metadata.json")
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        puzzle_path, solution_path, metadata_path = write_puzzle_files(
+            output_folder, puzzle_grid, solution_grid, self.get_puzzle_metadata())
 
         print(f"Puzzle saved to: {output_folder}")
         print(f"  - Puzzle: {puzzle_path}")
         print(f"  - Solution: {solution_path}")
         print(f"  - Metadata: {metadata_path}")
 
+    def get_puzzle_metadata(self):
+        """
+        Build the metadata dictionary stored alongside a generated puzzle.
 
-def load_custom_rule(rule_folder):
+        Returns:
+            Dictionary with rule information and generation details
+        """
+        return {
+            "rule": self.custom_rule_instance.get_metadata(),
+            "generated_at": datetime.now().isoformat(),
+            "size": self.size,
+            "box_size": self.box_size
+        }
+
+
+def write_puzzle_files(output_folder, puzzle_grid, solution_grid, metadata):
     """
-    Load a custom rule from a folder.
+    Write sudoku.txt, solution.txt and metadata.json to a folder.
 
     Args:
-        rule_folder: Path to the folder containing rule.py
+        output_folder: Folder path where files will be saved
+        puzzle_grid: The puzzle grid (with some cells empty)
+        solution_grid: The complete solution grid
+        metadata: Metadata dictionary (see SudokuGenerator.get_puzzle_metadata)
 
     Returns:
-        An instance of the custom rule class
+        tuple: (puzzle_path, solution_path, metadata_path)
     """
-    rule_file = os.path.join(rule_folder, "rule.py")
+    os.makedirs(output_folder, exist_ok=True)
+
+    # Save puzzle
+    puzzle_path = os.path.join(output_folder, "sudoku.txt")
+    with open(puzzle_path, 'w') as f:
+        for row in puzzle_grid:
+            f.write(str(row) + '\n')
+
+    # Save solution
+    solution_path = os.path.join(output_folder, "solution.txt")
+    with open(solution_path, 'w') as f:
+        for row in solution_grid:
+            f.write(str(row) + '\n')
+
+    # Save metadata
+    metadata_path = os.path.join(output_folder, "metadata.json")
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    return puzzle_path, solution_path, metadata_path
 
-    if not os.path.exists(rule_file):
-        print(f"Warning: No rule.py found in {rule_folder}")
-        return BaseRule()
 
-    # Load the module dynamically
-    spec = importlib.util.spec_from_file_location("custom_rule_module", rule_file)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
+def load_custom_rule(rule_folder):
+    """
+    Load a custom rule from a folder.
 
-    # Try to call the create_rule factory function
-    if hasattr(module, 'create_rule'):
-        return module.create_rule()
+    The rule module is compiled once and cached by the rule registry; each call
+    returns a fresh instance from the cached factory.
 
-    # Look for a class that inherits from BaseRule
-    for item_name in dir(module):
-        item = getattr(module, item_name)
-        if isinstance(item, type) and issubclass(item, BaseRule) and item is not BaseRule:
-            return item()
+    Args:
+        rule_folder: Path to the folder containing rule.py
 
-    print(f"Warning: No valid rule class found in {rule_file}")
-    return BaseRule()
+    Returns:
+        An instance of the custom rule class
+    """
+    return get_registry(os.path.dirname(os.path.abspath(rule_folder))).create(rule_folder)
 
 
-def generate_sudoku_for_rule(rule_folder, difficulty_attempts=None):
+def generate_sudoku_for_rule(rule_folder, difficulty_attempts=None, stats=None, seed=None, trace=None):
     """
     Generate a Sudoku puzzle for a specific rule folder.
 
@@ -238,37 +541,138 @@ def generate_sudoku_for_rule(rule_folder, difficulty_attempts=None):
         rule_folder: Path to the folder containing the rule
         difficulty_attempts: Number of attempts to remove cells (higher = harder).
                            If None, uses smart defaults based on rule complexity.
+        stats: Optional SolverStats that collects search counters for this run
+        seed: Seed for the random module; if None the module is not reseeded
+              and the record's seed is None
+        trace: Optional SearchTrace that records the fill search
 
     Returns:
-        tuple: (puzzle_grid, solution_grid)
+        GenerationResult: Unpacks to (puzzle_grid, solution_grid); its record
+                          holds the timings, counts and seed of the run
     """
+    started_at = datetime.now().isoformat()
+    total_start = time.perf_counter()
+    if seed is not None:
+        random.seed(seed)
+    report = {"timings": {}}
+
     # Load the custom rule
-    custom_rule = load_custom_rule(rule_folder)
+    with timed_phase(report, "load_rule"):
+        custom_rule = load_custom_rule(rule_folder)
 
     print(f"\nGenerating Sudoku with rule: {custom_rule.name}")
     print(f"Description: {custom_rule.description}")
 
     # Use smart defaults if not specified
     if difficulty_attempts is None:
-        # Check if rule is highly restrictive (e.g., non-consecutive)
-        if hasattr(custom_rule, 'is_highly_restrictive') and custom_rule.is_highly_restrictive:
-            difficulty_attempts = 1 # Very few attempts for highly restrictive rules
-        # Reverse generation rules have complex constraints - use fewer attempts
-        elif custom_rule.supports_reverse_generation():
-            difficulty_attempts = 5  # Fewer attempts for complex rules
-        else:
-            difficulty_attempts = 5  # Standard attempts for simple rules
+        difficulty_attempts = default_difficulty_attempts(custom_rule)
 
     # Check if this rule supports reverse generation
-    if custom_rule.supports_reverse_generation():
+    reverse = custom_rule.supports_reverse_generation()
+    if reverse:
         print("Using REVERSE GENERATION mode (solution first, then constraints)...")
-        return generate_sudoku_reverse(custom_rule, rule_folder, difficulty_attempts)
+        puzzle_grid, solution_grid = generate_sudoku_reverse(
+            custom_rule, rule_folder, difficulty_attempts, stats=stats, report=report, trace=trace)
     else:
         print("Using FORWARD GENERATION mode (constraints first, then solution)...")
-        return generate_sudoku_forward(custom_rule, rule_folder, difficulty_attempts)
+        puzzle_grid, solution_grid = generate_sudoku_forward(
+            custom_rule, rule_folder, difficulty_attempts, stats=stats, report=report, trace=trace)
+    report["timings"]["total"] = time.perf_counter() - total_start
+
+    record = {
+        "rule": os.path.basename(os.path.normpath(rule_folder)),
+        "rule_name": custom_rule.name,
+        "mode": "reverse" if reverse else "forward",
+        "success": puzzle_grid is not None,
+        "seed": seed,
+        "difficulty_attempts": difficulty_attempts,
+        "attempts_used": report.get("attempts_used"),
+        "clues": sum(1 for row in puzzle_grid for value in row if value) if puzzle_grid else None,
+        "timings": {phase: round(seconds, 6) for phase, seconds in report["timings"].items()},
+        "started_at": started_at,
+        "host": platform.node(),
+        "python": platform.python_version(),
+    }
+    if stats is not None:
+        record["stats"] = stats.to_dict()
+    return GenerationResult(puzzle_grid, solution_grid, record)
+
+
+def default_difficulty_attempts(custom_rule):
+    """
+    Pick the default number of removal attempts for a rule.
 
+    Args:
+        custom_rule: The custom rule instance
 
-def generate_sudoku_forward(custom_rule, rule_folder, difficulty_attempts=5):
+    Returns:
+        int: Number of attempts to remove cells
+    """
+    # Check if rule is highly restrictive (e.g., non-consecutive)
+    if hasattr(custom_rule, 'is_highly_restrictive') and custom_rule.is_highly_restrictive:
+        return 1  # Very few attempts for highly restrictive rules
+    # Reverse generation rules have complex constraints - use fewer attempts
+    elif custom_rule.supports_reverse_generation():
+        return 5  # Fewer attempts for complex rules
+    else:
+        return 5  # Standard attempts for simple rules
+
+
+def generate_puzzle(rule_folder, difficulty_attempts=None, progress=None, stats=None, trace=None):
+    """
+    Generate a Sudoku puzzle for a rule folder without saving it.
+
+    Unlike generate_sudoku_for_rule, the rule folder's sudoku.txt, solution.txt
+    and metadata.json are left untouched, so this can be called repeatedly to
+    produce many puzzles for the same rule.
+
+    Args:
+        rule_folder: Path to the folder containing the rule
+        difficulty_attempts: Number of attempts to remove cells.
+                           If None, uses smart defaults based on rule complexity.
+        progress: Optional callback receiving progress events instead of printing
+        stats: Optional SolverStats that collects search counters for this run
+        trace: Optional SearchTrace that records the fill search
+
+    Returns:
+        dict: {"puzzle", "solution", "metadata", "difficulty_attempts"},
+              or None if constraints could not be derived
+    """
+    # A fresh instance per puzzle, since reverse rules store derived constraints
+    custom_rule = load_custom_rule(rule_folder)
+
+    if difficulty_attempts is None:
+        difficulty_attempts = default_difficulty_attempts(custom_rule)
+
+    report_progress(progress, "start", f"Generating Sudoku with rule: {custom_rule.name}",
+                    attempts_left=difficulty_attempts)
+
+    if custom_rule.supports_reverse_generation():
+        puzzle_grid, solution_grid = generate_sudoku_reverse(
+            custom_rule, rule_folder, difficulty_attempts, save=False, progress=progress, stats=stats,
+            trace=trace)
+    else:
+        puzzle_grid, solution_grid = generate_sudoku_forward(
+            custom_rule, rule_folder, difficulty_attempts, save=False, progress=progress, stats=stats,
+            trace=trace)
+
+    if puzzle_grid is None:
+        return None
+
+    report_progress(progress, "done", "Puzzle generated",
+                    cells_removed=sum(row.count(0) for row in puzzle_grid))
+
+    gen = SudokuGenerator(custom_rule=custom_rule)
+    return {
+        "puzzle": puzzle_grid,
+        "solution": solution_grid,
+        "metadata": gen.get_puzzle_metadata(),
+        "difficulty_attempts": difficulty_attempts
+    }
+
+
+def generate_sudoku_forward(custom_rule, rule_folder, difficulty_attempts=5, save=True, progress=None, stats=None,
+                            report=None, trace=None):
     """
     Traditional generation: Start with constraints, generate a solution that satisfies them.
 
@@ -276,28 +680,41 @@ def generate_sudoku_forward(custom_rule, rule_folder, difficulty_attempts=5):
         custom_rule: The custom rule instance
         rule_folder: Path to save the puzzle
         difficulty_attempts: Number of attempts to remove cells
+        save: Whether to write the puzzle files to rule_folder
+        progress: Optional callback receiving progress events instead of printing
+        stats: Optional SolverStats that collects search counters
+        report: Optional dict receiving per-phase "timings" and "attempts_used"
+        trace: Optional SearchTrace that records the fill search
 
     Returns:
         tuple: (puzzle_grid, solution_grid)
     """
     # Create generator with the custom rule
-    gen = SudokuGenerator(custom_rule=custom_rule)
+    gen = SudokuGenerator(custom_rule=custom_rule, progress=progress, stats=stats, trace=trace)
 
     # Generate full solution
-    print("Generating full solution...")
-    solution_grid = gen.generate_full_grid()
+    report_progress(progress, "solution", "Generating full solution...")
+    with timed_phase(report, "fill"):
+        solution_grid = gen.generate_full_grid()
 
     # Create puzzle by removing numbers
-    print(f"Creating puzzle (difficulty attempts: {difficulty_attempts})...")
-    puzzle_grid = gen.remove_numbers(attempts=difficulty_attempts)
+    report_progress(progress, "removal", f"Creating puzzle (difficulty attempts: {difficulty_attempts})...",
+                    backtracks=gen.backtracks, cells_removed=0, attempts_left=difficulty_attempts)
+    with timed_phase(report, "removal"):
+        puzzle_grid = gen.remove_numbers(attempts=difficulty_attempts)
+    if report is not None:
+        report["attempts_used"] = gen.removal_attempts_used
 
     # Save the puzzle
-    gen.save_puzzle(rule_folder, puzzle_grid, solution_grid)
+    if save:
+        with timed_phase(report, "save"):
+            gen.save_puzzle(rule_folder, puzzle_grid, solution_grid)
 
     return puzzle_grid, solution_grid
 
 
-def generate_sudoku_reverse(custom_rule, rule_folder, difficulty_attempts=5):
+def generate_sudoku_reverse(custom_rule, rule_folder, difficulty_attempts=5, save=True, progress=None, stats=None,
+                            report=None, trace=None):
     """
     Reverse generation: Generate a standard Sudoku solution first, then derive constraints from it.
 
@@ -307,31 +724,47 @@ def generate_sudoku_reverse(custom_rule, rule_folder, difficulty_attempts=5):
         custom_rule: The custom rule instance (must support reverse generation)
         rule_folder: Path to save the puzzle
         difficulty_attempts: Number of attempts to remove cells
+        save: Whether to write the puzzle files to rule_folder
+        progress: Optional callback receiving progress events instead of printing
+        stats: Optional SolverStats that collects search counters
+        report: Optional dict receiving per-phase "timings" and "attempts_used"
+        trace: Optional SearchTrace that records the fill search
 
     Returns:
         tuple: (puzzle_grid, solution_grid)
     """
     # First, generate a standard Sudoku solution (no custom constraints)
-    print("Step 1: Generating standard Sudoku solution...")
-    base_gen = SudokuGenerator(custom_rule=BaseRule())
-    solution_grid = base_gen.generate_full_grid()
+    report_progress(progress, "solution", "Step 1: Generating standard Sudoku solution...")
+    base_gen = SudokuGenerator(custom_rule=BaseRule(), progress=progress, stats=stats, trace=trace)
+    with timed_phase(report, "fill"):
+        solution_grid = base_gen.generate_full_grid()
 
-    print("Step 2: Deriving constraints from solution...")
+    report_progress(progress, "constraints", "Step 2: Deriving constraints from solution...",
+                    backtracks=base_gen.backtracks)
     # Derive constraints from the solution
-    if not custom_rule.derive_constraints_from_solution(solution_grid):
-        print("ERROR: Failed to derive constraints from solution!")
+    with timed_phase(report, "derive"):
+        derived = custom_rule.derive_constraints_from_solution(solution_grid)
+    if not derived:
+        report_progress(progress, "failed", "ERROR: Failed to derive constraints from solution!")
         return None, None
 
-    print("Step 3: Creating puzzle by removing numbers...")
+    report_progress(progress, "removal", "Step 3: Creating puzzle by removing numbers...",
+                    backtracks=base_gen.backtracks, cells_removed=0, attempts_left=difficulty_attempts)
     # Now create a generator with the custom rule that has derived constraints
-    gen = SudokuGenerator(custom_rule=custom_rule)
+    gen = SudokuGenerator(custom_rule=custom_rule, progress=progress, stats=stats, trace=trace)
+    gen.backtracks = base_gen.backtracks
     gen.grid = copy.deepcopy(solution_grid)
 
     # Create puzzle by removing numbers
-    puzzle_grid = gen.remove_numbers(attempts=difficulty_attempts)
+    with timed_phase(report, "removal"):
+        puzzle_grid = gen.remove_numbers(attempts=difficulty_attempts)
+    if report is not None:
+        report["attempts_used"] = gen.removal_attempts_used
 
     # Save the puzzle
-    gen.save_puzzle(rule_folder, puzzle_grid, solution_grid)
+    if save:
+        with timed_phase(report, "save"):
+            gen.save_puzzle(rule_folder, puzzle_grid, solution_grid)
 
     return puzzle_grid, solution_grid
 
@@ -349,17 +782,7 @@ def discover_rules(base_folder=None):
     Returns:
         list: List of rule folder paths
     """
-    if base_folder is None:
-        base_folder = os.path.dirname(os.path.abspath(__file__))
-
-    rule_folders = []
-
-    for item in os.listdir(base_folder):
-        item_path = os.path.join(base_folder, item)
-        if os.path.isdir(item_path) and os.path.exists(os.path.join(item_path, "rule.py")):
-            rule_folders.append(item_path)
-
-    return rule_folders
+    return get_registry(base_folder).discover()
 
 
 if __name__ == "__main__":
@@ -368,17 +791,94 @@ if __name__ == "__main__":
     # Discover rules first
     rule_folders = discover_rules()
 
+    if "--count" in sys.argv:
+        # Bulk mode: many puzzles for one rule, streamed into a puzzle bank.
+        # bulk.py parses its own options (--seed, --out, ...), so dispatch
+        # before any of the single-run options below are taken out of argv
+        from bulk import main as bulk_main
+        sys.exit(bulk_main(sys.argv[1:]))
+
+    def pop_option(flag):
+        """Remove "flag VALUE" from sys.argv and return VALUE (None if absent)."""
+        if flag not in sys.argv:
+            return None
+        flag_index = sys.argv.index(flag)
+        value = sys.argv[flag_index + 1]
+        del sys.argv[flag_index:flag_index + 2]
+        return value
+
+    # Search counters, collected and logged separately for each rule
+    collect_stats = "--stats" in sys.argv
+    if collect_stats:
+        sys.argv.remove("--stats")
+
+    # Profiling (see profiling.py): one report per generated rule
+    profile_memory = "--profile-memory" in sys.argv
+    profile_dir = pop_option("--profile-dir")
+    if profile_dir is None and ("--profile" in sys.argv or profile_memory):
+        from profiling import DEFAULT_PROFILE_DIR
+        profile_dir = DEFAULT_PROFILE_DIR
+    for flag in ("--profile", "--profile-memory"):
+        if flag in sys.argv:
+            sys.argv.remove(flag)
+
+    # Structured log of each run (see GenerationResult); --all logs by default
+    log_path = pop_option("--log-jsonl")
+    if log_path is None and len(sys.argv) > 1 and sys.argv[1] == "--all":
+        log_path = DEFAULT_GENERATION_LOG
+    seed = pop_option("--seed")
+    seed = int(seed) if seed is not None else None
+
+    # Search traces (see search_trace.py): one trace file per generated rule
+    trace_dir = pop_option("--trace-dir")
+    if trace_dir is None and "--trace" in sys.argv:
+        from search_trace import DEFAULT_TRACE_DIR
+        trace_dir = DEFAULT_TRACE_DIR
+    if "--trace" in sys.argv:
+        sys.argv.remove("--trace")
+
+    def generate(folder, difficulty=None):
+        run_seed = seed
+        trace = None
+        stats = None
+        if collect_stats:
+            from solver_stats import SolverStats
+            stats = SolverStats()
+        with ExitStack() as stack:
+            if profile_dir is not None:
+                from profiling import Profiler
+                stack.enter_context(Profiler(profile_dir, os.path.basename(os.path.normpath(folder)),
+                                             memory=profile_memory))
+            if trace_dir is not None:
+                from search_trace import new_trace
+                # The trace header needs the seed before the run starts; pick
+                # it without touching the global random state
+                if run_seed is None:
+                    run_seed = random.Random().randrange(2**32)
+                trace = stack.enter_context(new_trace(folder, run_seed, difficulty, trace_dir))
+            result = generate_sudoku_for_rule(folder, difficulty, stats=stats, seed=run_seed, trace=trace)
+        if trace is not None:
+            print(f"Search trace: {trace.path} ({trace.events} events)")
+        timings = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in result.record["timings"].items())
+        print(f"Timings: {timings}")
+        if stats is not None and (stats.fill_nodes or stats.probe_nodes):
+            print("\nSolver stats:")
+            print(stats.summary())
+        if log_path:
+            append_generation_log(log_path, result.record)
+        return result
+
     # Check for special flags
     if len(sys.argv) > 1 and sys.argv[1] == "--all":
         print("=== Sudoku Generator - Generating All Rules ===\n")
         for folder in tqdm(rule_folders):
-            generate_sudoku_for_rule(folder)
+            generate(folder)
             print("\n" + "="*60 + "\n")
     elif len(sys.argv) > 2 and sys.argv[1] == "--index":
         idx = int(sys.argv[2]) - 1
         if 0 <= idx < len(rule_folders):
             difficulty = int(sys.argv[3]) if len(sys.argv) > 3 else 5
-            generate_sudoku_for_rule(rule_folders[idx], difficulty)
+            generate(rule_folders[idx], difficulty)
         else:
             print(f"Error: Invalid index. Choose between 1 and {len(rule_folders)}")
     elif len(sys.argv) > 1:
@@ -387,7 +887,7 @@ if __name__ == "__main__":
         difficulty = int(sys.argv[2]) if len(sys.argv) > 2 else 5
 
         if os.path.exists(rule_folder):
-            generate_sudoku_for_rule(rule_folder, difficulty)
+            generate(rule_folder, difficulty)
         else:
             print(f"Error: Rule folder '{rule_folder}' not found")
     else:
@@ -415,3 +915,9 @@ if __name__ == "__main__":
             print("  - Run with specific folder: python run.py <rule_folder_path> [difficulty]")
             print("  - Generate for all: python run.py --all")
             print("  - Generate for specific folder from list: python run.py --index <number>")
+            print("  - Generate many puzzles into a bank: python run.py <rule_folder_path> --count N [--jobs J]")
+            print("  - Add --stats to print solver counters for each rule")
+            print("  - Add --profile [--profile-memory] [--profile-dir DIR] to write a profile per rule")
+            print("  - Add --log-jsonl PATH to append a timing record per rule (--all logs to generation_log.jsonl)")
+            print("  - Add --seed N to reproduce a run")
+            print("  - Add --trace [--trace-dir DIR] to record the fill search (see search_trace.py)")
@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+Search-tree traces of the grid fill, with offline summary and replay.
+
+A ``SearchTrace`` attached to a SudokuGenerator (like SolverStats) records
+every step of ``_fill_grid``: each candidate tried, why it was rejected (row,
+column, box or the rule's validate), each placement and each dead end. The
+trace file starts with a JSON header holding the rule and random seed; the
+events follow as a zlib stream of 4-byte records, flushed in chunks so a run
+that is killed at its time budget still leaves a readable trace.
+
+Event records are ``(kind, cell, digit, depth)`` bytes, where cell is
+``row * size + col`` and depth the recursion depth of the fill. Every
+``CLOCK_INTERVAL`` events a CLOCK record stores the milliseconds since the
+fill started in its last three bytes, which lets the summary estimate where
+the time went.
+
+Only the fill is traced. The uniqueness checks in ``remove_numbers`` are
+counted by SolverStats instead.
+
+Usage:
+    python run.py sudoku_argyle_rule --trace               # writes traces/sudoku_argyle_rule.trace
+    python search_trace.py summary traces/sudoku_argyle_rule.trace
+    python search_trace.py replay traces/sudoku_argyle_rule.trace
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import signal
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import datetime
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_TRACE_DIR = os.path.join(script_dir, "traces")
+TRACE_SUFFIX = ".trace"
+MAGIC = b"SDKTRACE"
+VERSION = 1
+# Events between CLOCK records
+CLOCK_INTERVAL = 1024
+# Bytes of events compressed and written at once
+CHUNK_BYTES = 256 * 1024
+DEFAULT_TOP = 10
+# Depths per row of the summary's depth table
+DEPTH_BAND = 9
+
+# Event kinds
+START = 0        # a new top-level fill begins
+PLACE = 1        # candidate accepted and placed
+REJECT_ROW = 2   # candidate already in the row
+REJECT_COL = 3   # ... in the column
+REJECT_BOX = 4   # ... in the box
+REJECT_RULE = 5  # candidate rejected by the rule's validate
+FAIL = 6         # no candidate left at this depth; the placement above is undone
+SOLVED = 7       # grid complete
+CLOCK = 8        # milliseconds since START (24 bits in cell, digit, depth)
+END = 9          # trace closed normally
+
+KIND_NAMES = {START: "start", PLACE: "place", REJECT_ROW: "row", REJECT_COL: "column",
+              REJECT_BOX: "box", REJECT_RULE: "rule", FAIL: "fail", SOLVED: "solved",
+              CLOCK: "clock", END: "end"}
+REJECT_KINDS = (REJECT_ROW, REJECT_COL, REJECT_BOX, REJECT_RULE)
+NO_CELL = 255
+
+_EVENT = struct.Struct("<BBBB")
+
+
+class _ReplayStop(BaseException):
+    """
+    Raised inside the generator to end a replay.
+
+    A BaseException, so ``except Exception`` in rule code does not swallow it.
+    """
+
+
+class SearchTrace:
+    """
+    Records the fill search of the generators it is attached to.
+
+    Use as a context manager around the generation; the file is written while
+    the search runs and closed on exit. While open in the main thread, SIGTERM
+    exits through the context manager so the trace is closed properly.
+
+    Args:
+        path: Trace file to write
+        header: JSON-serializable dict stored at the start of the file; replay
+                needs "rule" (the rule folder name), "seed" and "difficulty_attempts"
+    """
+
+    def __init__(self, path, header):
+        self.path = path
+        self.header = dict(header)
+        self.events = 0
+        self._buffer = bytearray()
+        self._compressor = zlib.compressobj(6)
+        self._file = None
+        self._depth = 0
+        self._cells = {}  # depth -> cell last tried at that depth
+        self._started = None
+        self._filling = False
+        self._previous_sigterm = None
+
+    def __enter__(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "wb")
+        header = json.dumps(self.header).encode()
+        self._file.write(MAGIC + struct.pack("<BI", VERSION, len(header)) + header)
+        self._file.flush()
+        if threading.current_thread() is threading.main_thread():
+            self._previous_sigterm = signal.signal(signal.SIGTERM, self._terminate)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._previous_sigterm is not None:
+            signal.signal(signal.SIGTERM, self._previous_sigterm)
+            self._previous_sigterm = None
+        self.close()
+        return False
+
+    def _terminate(self, signum, frame):
+        raise SystemExit(128 + signum)
+
+    def close(self):
+        """Write the END record and the rest of the stream."""
+        if self._file is None:
+            return
+        if self._filling:
+            # Stopped in the middle of the fill
+            self._clock()
+        self._emit(END, 0, 0, 0)
+        self._file.write(self._compressor.compress(bytes(self._buffer)) + self._compressor.flush())
+        self._file.close()
+        self._file = None
+
+    def _clock(self):
+        ms = min(int((time.perf_counter() - self._started) * 1000), 0xFFFFFF)
+        self._buffer += _EVENT.pack(CLOCK, ms & 0xFF, (ms >> 8) & 0xFF, ms >> 16)
+
+    def _emit(self, kind, cell, num, depth):
+        buffer = self._buffer
+        buffer += _EVENT.pack(kind, cell, num, min(depth, 255))
+        self.events += 1
+        if self.events % CLOCK_INTERVAL == 0 and self._started is not None:
+            self._clock()
+        if len(buffer) >= CHUNK_BYTES and self._file is not None:
+            # Sync flush: everything written so far can be read back on its own
+            self._file.write(self._compressor.compress(bytes(buffer))
+                             + self._compressor.flush(zlib.Z_SYNC_FLUSH))
+            self._file.flush()
+            buffer.clear()
+
+    def attach(self, generator):
+        """
+        Trace the fill search of a generator.
+
+        Args:
+            generator: SudokuGenerator instance; its methods are wrapped in place
+
+        Returns:
+            The same generator
+        """
+        size = generator.size
+        rule = generator.custom_rule_instance
+        is_valid = generator.is_valid
+        custom_rule = generator.custom_rule
+        fill_grid = generator._fill_grid
+        rule_rejected = [False]
+
+        def traced_custom_rule(grid, row, col, num):
+            ok = custom_rule(grid, row, col, num)
+            rule_rejected[0] = not ok
+            return ok
+
+        def traced_is_valid(grid, row, col, num):
+            depth = self._depth
+            if not depth:
+                # Outside the fill (uniqueness checks)
+                return is_valid(grid, row, col, num)
+            rule_rejected[0] = False
+            ok = is_valid(grid, row, col, num)
+            cell = row * size + col
+            self._cells[depth] = cell
+            if ok:
+                self._emit(PLACE, cell, num, depth)
+            elif rule_rejected[0]:
+                self._emit(REJECT_RULE, cell, num, depth)
+            elif num in grid[row]:
+                self._emit(REJECT_ROW, cell, num, depth)
+            elif any(grid[r][col] == num for r in range(size)):
+                self._emit(REJECT_COL, cell, num, depth)
+            elif rule.use_standard_boxes:
+                self._emit(REJECT_BOX, cell, num, depth)
+            else:
+                self._emit(REJECT_RULE, cell, num, depth)
+            return ok
+
+        def traced_fill_grid(grid):
+            if not self._depth:
+                self._started = time.perf_counter()
+                self._filling = True
+                self._emit(START, 0, 0, 0)
+            self._depth += 1
+            depth = self._depth
+            self._cells.pop(depth, None)
+            try:
+                ok = fill_grid(grid)
+            finally:
+                self._depth -= 1
+            if ok:
+                if depth == 1:
+                    self._emit(SOLVED, 0, 0, 0)
+            else:
+                self._emit(FAIL, self._cells.get(depth, NO_CELL), 0, depth)
+            if depth == 1:
+                self._filling = False
+                self._clock()
+            return ok
+
+        generator.custom_rule = traced_custom_rule
+        generator.is_valid = traced_is_valid
+        generator._fill_grid = traced_fill_grid
+        return generator
+
+
+class TraceVerifier(SearchTrace):
+    """
+    A SearchTrace that compares the search against recorded events instead of
+    writing a file. Raises _ReplayStop at the first difference or once all
+    recorded events have been matched.
+    """
+
+    def __init__(self, recorded_events):
+        super().__init__(None, {})
+        self._expected = [event for event in recorded_events if event[0] not in (CLOCK, END)]
+        self.matched = 0
+        self.mismatch = None  # (event number, expected, actual)
+
+    def __enter__(self):
+        return self
+
+    def close(self):
+        pass
+
+    def _emit(self, kind, cell, num, depth):
+        if self.matched >= len(self._expected):
+            raise _ReplayStop()
+        actual = (kind, cell, num, min(depth, 255))
+        expected = self._expected[self.matched]
+        if actual != expected:
+            self.mismatch = (self.matched, expected, actual)
+            raise _ReplayStop()
+        self.matched += 1
+        if self.matched == len(self._expected):
+            raise _ReplayStop()
+
+
+def new_trace(rule_folder, seed, difficulty_attempts, trace_dir=DEFAULT_TRACE_DIR):
+    """Create a SearchTrace for one generation run in trace_dir/<rule>.trace."""
+    rule = os.path.basename(os.path.normpath(rule_folder))
+    return SearchTrace(os.path.join(trace_dir, rule + TRACE_SUFFIX), {
+        "rule": rule,
+        "seed": seed,
+        "difficulty_attempts": difficulty_attempts,
+        "created_at": datetime.now().isoformat(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+    })
+
+
+def read_trace(path):
+    """
+    Read a trace file.
+
+    Returns:
+        tuple: (header dict, list of (kind, cell, digit, depth) events, complete)
+               where complete is False if the writer was stopped before closing
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a search trace")
+    offset = len(MAGIC)
+    version, header_length = struct.unpack_from("<BI", data, offset)
+    if version != VERSION:
+        raise ValueError(f"Unsupported trace version {version}")
+    offset += struct.calcsize("<BI")
+    header = json.loads(data[offset:offset + header_length])
+    decompressor = zlib.decompressobj()
+    try:
+        raw = decompressor.decompress(data[offset + header_length:])
+    except zlib.error:
+        raw = b""
+    raw = raw[:len(raw) - len(raw) % _EVENT.size]
+    events = list(_EVENT.iter_unpack(raw))
+    complete = bool(events) and events[-1][0] == END
+    return header, events, complete
+
+
+def clock_ms(event):
+    return event[1] | (event[2] << 8) | (event[3] << 16)
+
+
+def summarize(events, size=9, top=DEFAULT_TOP):
+    """
+    Summarize a trace's events.
+
+    Args:
+        events: (kind, cell, digit, depth) tuples from read_trace
+        size: Grid size, to turn cell numbers into (row, col)
+        top: Rows in the cell rankings
+
+    Returns:
+        dict: {"events", "fills", "solved", "seconds", "placements", "backtracks",
+               "max_depth", "rejections", "depths", "backtracked_cells",
+               "rule_rejected_cells"}
+    """
+    placements = 0
+    fails = 0
+    solved = 0
+    fills = 0
+    max_depth = 0
+    rejections = Counter()
+    depths = {}  # depth -> {"placements", "rejections", "fails", "ms"}
+    backtracked = Counter()
+    rule_cells = Counter()
+    last_place = {}  # depth -> cell placed there most recently
+
+    window = Counter()  # non-clock events per depth since the last CLOCK
+    last_ms = 0
+    total_ms = 0
+    fill_start_ms = 0  # time spent in earlier fills (restarts start a new one)
+
+    def entry(depth):
+        stats = depths.get(depth)
+        if stats is None:
+            stats = depths[depth] = {"placements": 0, "rejections": 0, "fails": 0, "ms": 0.0}
+        return stats
+
+    def spend(ms):
+        events_in_window = sum(window.values())
+        for depth, count in window.items():
+            entry(depth)["ms"] += ms * count / events_in_window
+        window.clear()
+
+    for event in events:
+        kind, cell, num, depth = event
+        if kind == CLOCK:
+            ms = clock_ms(event)
+            if window:
+                spend(ms - last_ms)
+            last_ms = ms
+            total_ms = fill_start_ms + ms
+            continue
+        if kind == START:
+            fills += 1
+            last_place.clear()
+            last_ms = 0
+            fill_start_ms = total_ms
+            continue
+        if kind == END:
+            continue
+        if kind == SOLVED:
+            solved += 1
+            continue
+        window[depth] += 1
+        max_depth = max(max_depth, depth)
+        if kind == PLACE:
+            placements += 1
+            entry(depth)["placements"] += 1
+            last_place[depth] = cell
+        elif kind in REJECT_KINDS:
+            rejections[KIND_NAMES[kind]] += 1
+            entry(depth)["rejections"] += 1
+            if kind == REJECT_RULE:
+                rule_cells[cell] += 1
+        elif kind == FAIL:
+            fails += 1
+            entry(depth)["fails"] += 1
+            # The placement one level up gets undone
+            undone = last_place.get(depth - 1)
+            if undone is not None:
+                backtracked[undone] += 1
+
+    def cells(counter):
+        return [{"cell": [cell // size, cell % size], "count": count} for cell, count in counter.most_common(top)]
+
+    return {
+        "events": sum(1 for event in events if event[0] not in (CLOCK, END)),
+        "fills": fills,
+        "solved": solved,
+        "seconds": total_ms / 1000,
+        "placements": placements,
+        "backtracks": fails,
+        "max_depth": max_depth,
+        "rejections": dict(rejections),
+        "depths": {depth: {key: round(value, 1) if key == "ms" else value for key, value in stats.items()}
+                   for depth, stats in sorted(depths.items())},
+        "backtracked_cells": cells(backtracked),
+        "rule_rejected_cells": cells(rule_cells),
+    }
+
+
+def format_summary(header, summary, complete):
+    lines = [f"Trace of {header.get('rule')} (seed {header.get('seed')}, {header.get('created_at', '?')})"]
+    if not complete:
+        lines.append("  Incomplete: the run was stopped before the trace was closed")
+    lines.append(f"  {summary['events']} events over ~{summary['seconds']:.2f}s: "
+                 f"{summary['placements']} placements, {summary['backtracks']} backtracks, "
+                 f"max depth {summary['max_depth']}, {'solved' if summary['solved'] else 'not solved'}"
+                 + (f" after {summary['fills']} fills" if summary['fills'] > 1 else ""))
+
+    total_rejections = sum(summary["rejections"].values())
+    lines.append(f"\nRejections ({total_rejections}):")
+    for reason, count in sorted(summary["rejections"].items(), key=lambda item: -item[1]):
+        label = f"rule ({header.get('rule')})" if reason == "rule" else reason
+        lines.append(f"  {label:32} {count:>10} ({count / total_rejections:.0%})")
+
+    # One band per DEPTH_BAND depths (a grid row's worth of cells by default)
+    bands = {}
+    for depth, stats in summary["depths"].items():
+        band = bands.setdefault((depth - 1) // DEPTH_BAND, Counter())
+        band.update(stats)
+    lines.append(f"\n{'depth':>7} {'placements':>10} {'rejections':>10} {'fails':>8} {'~ms':>9}")
+    busiest = max((band["ms"] for band in bands.values()), default=0)
+    for index, band in sorted(bands.items()):
+        label = f"{index * DEPTH_BAND + 1}-{(index + 1) * DEPTH_BAND}"
+        bar = "#" * round(20 * band["ms"] / busiest) if busiest else ""
+        lines.append(f"{label:>7} {band['placements']:>10} {band['rejections']:>10} {band['fails']:>8} "
+                     f"{band['ms']:>9.1f} {bar}")
+
+    for title, key in (("Most backtracked cells", "backtracked_cells"),
+                       ("Cells most rejected by the rule", "rule_rejected_cells")):
+        if summary[key]:
+            lines.append(f"\n{title}:")
+            for item in summary[key]:
+                row, col = item["cell"]
+                lines.append(f"  r{row + 1}c{col + 1}: {item['count']}")
+    return "\n".join(lines)
+
+
+def replay(path, rule_dir=script_dir, quiet=True):
+    """
+    Re-run a traced generation with its seed and check it takes the same path.
+
+    Returns:
+        dict: {"recorded", "matched", "mismatch", "seconds", "recorded_seconds"}
+    """
+    from run import generate_puzzle
+
+    header, events, complete = read_trace(path)
+    rule_folder = os.path.join(rule_dir, header["rule"])
+    if not os.path.isdir(rule_folder):
+        raise FileNotFoundError(f"Rule folder '{rule_folder}' not found")
+
+    verifier = TraceVerifier(events)
+    random.seed(header["seed"])
+    start = time.perf_counter()
+    try:
+        if quiet:
+            with redirect_stdout(io.StringIO()):
+                generate_puzzle(rule_folder, header.get("difficulty_attempts"), trace=verifier)
+        else:
+            generate_puzzle(rule_folder, header.get("difficulty_attempts"), trace=verifier)
+    except _ReplayStop:
+        pass
+    seconds = time.perf_counter() - start
+
+    clocks = any(event[0] == CLOCK for event in events)
+    return {
+        "recorded": sum(1 for event in events if event[0] not in (CLOCK, END)),
+        "complete": complete,
+        "matched": verifier.matched,
+        "mismatch": verifier.mismatch,
+        "seconds": seconds,
+        "recorded_seconds": summarize(events, header.get("size", 9))["seconds"] if clocks else None,
+    }
+
+
+def describe_event(event):
+    kind, cell, num, depth = event
+    return f"{KIND_NAMES.get(kind, kind)} cell {cell} digit {num} depth {depth}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize or replay search traces written with run.py --trace.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    summary_parser = subparsers.add_parser("summary", help="Where the search spent its time")
+    summary_parser.add_argument("trace", help="Trace file")
+    summary_parser.add_argument("--top", type=int, default=DEFAULT_TOP, help=f"Cells per ranking (default: {DEFAULT_TOP})")
+    summary_parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    replay_parser = subparsers.add_parser("replay", help="Re-run the traced generation and compare")
+    replay_parser.add_argument("trace", help="Trace file")
+    replay_parser.add_argument("--rule-dir", default=script_dir, help="Folder containing the rule folders")
+    replay_parser.add_argument("--verbose", action="store_true", help="Show the generator's output")
+
+    args = parser.parse_args(argv)
+    try:
+        header, events, complete = read_trace(args.trace)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    if args.command == "summary":
+        summary = summarize(events, header.get("size", 9), args.top)
+        if args.json:
+            print(json.dumps({"header": header, "complete": complete, "summary": summary}, indent=2))
+        else:
+            print(format_summary(header, summary, complete))
+        return 0
+
+    try:
+        result = replay(args.trace, args.rule_dir, quiet=not args.verbose)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return 1
+    recorded = f"{result['recorded_seconds']:.2f}s" if result["recorded_seconds"] is not None else "n/a"
+    if result["mismatch"] is not None:
+        index, expected, actual = result["mismatch"]
+        print(f"✗ Diverged at event {index}: expected {describe_event(expected)}, got {describe_event(actual)}")
+        print("  The rule or generator changed since the trace was recorded.")
+        return 1
+    if result["matched"] < result["recorded"]:
+        print(f"✗ Replay ended after {result['matched']} of {result['recorded']} events")
+        return 1
+    print(f"✓ Reproduced all {result['recorded']} events of {header['rule']} with seed {header['seed']} "
+          f"({'complete' if result['complete'] else 'incomplete'} trace) in {result['seconds']:.2f}s "
+          f"(recorded: {recorded})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Opt-in counters for the generator's search.
+
+When a door is slow it is not obvious whether the time goes to the standard
+row/column/box checks, to one rule's ``validate``, to filling the grid or to
+the uniqueness checks in ``remove_numbers``. A SolverStats attached to a
+SudokuGenerator counts all of these.
+
+Attaching works by replacing the generator's methods on the instance with
+counting wrappers, so a generator without stats runs the plain class methods
+and pays nothing.
+
+Usage:
+    stats = SolverStats()
+    puzzle, solution = generate_sudoku_for_rule(folder, stats=stats)
+    print(stats.summary())
+"""
+import time
+
+
+class SolverStats:
+    """
+    Search counters collected across one or more SudokuGenerator instances.
+
+    Attributes:
+        fill_nodes: _fill_grid calls (search nodes while building the solution)
+        probe_nodes: count_solutions calls (search nodes while checking uniqueness)
+        backtracks: Placements undone while filling the grid
+        is_valid_calls: Candidate checks
+        standard_rejections: Candidates rejected by the row, column or box check
+        custom_rejections: Candidates rejected by a rule's validate
+        validate: {rule name: {"calls", "rejections", "seconds"}}
+        probes: Uniqueness checks started by remove_numbers
+        unique_probes: Probes that found exactly one solution
+        probe_seconds: Total time spent in uniqueness checks
+        transposition_hits: Probe nodes answered from the transposition table
+        transposition_misses: Probe nodes that had to be searched
+        backjumps: Fill levels skipped by conflict-directed backjumping
+        restarts: Fill restarts (with nogood learning)
+        nogood_prunes: Placements skipped because they complete a learned nogood
+        fill_seconds: Total time spent filling grids
+    """
+
+    def __init__(self):
+        self.fill_nodes = 0
+        self.probe_nodes = 0
+        self.backtracks = 0
+        self.is_valid_calls = 0
+        self.standard_rejections = 0
+        self.custom_rejections = 0
+        self.validate = {}
+        self.probes = 0
+        self.unique_probes = 0
+        self.probe_seconds = 0.0
+        self.fill_seconds = 0.0
+        self.transposition_hits = 0
+        self.transposition_misses = 0
+        self.backjumps = 0
+        self.restarts = 0
+        self.nogood_prunes = 0
+
+    def attach(self, generator):
+        """
+        Count the search of a generator.
+
+        Args:
+            generator: SudokuGenerator instance; its methods are wrapped in place
+
+        Returns:
+            The same generator
+        """
+        rule = generator.custom_rule_instance
+        rule_name = getattr(rule, 'name', type(rule).__name__)
+        entry = self.validate.setdefault(rule_name, {"calls": 0, "rejections": 0, "seconds": 0.0})
+
+        # Bound class methods; the instance attributes below shadow them, and
+        # recursive calls through self.<method> go through the wrappers too
+        is_valid = generator.is_valid
+        custom_rule = generator.custom_rule
+        fill_grid = generator._fill_grid
+        count_solutions = generator.count_solutions
+        depth = [0, 0]  # fill, probe recursion depth
+        before = [0, 0, 0]  # backtracks, backjumps, nogood prunes at the start of a fill
+
+        def counted_custom_rule(grid, row, col, num):
+            start = time.perf_counter()
+            ok = custom_rule(grid, row, col, num)
+            entry["seconds"] += time.perf_counter() - start
+            entry["calls"] += 1
+            if not ok:
+                entry["rejections"] += 1
+                self.custom_rejections += 1
+            return ok
+
+        def counted_is_valid(grid, row, col, num):
+            self.is_valid_calls += 1
+            calls = entry["calls"]
+            ok = is_valid(grid, row, col, num)
+            # validate only runs once the standard checks have passed
+            if not ok and entry["calls"] == calls:
+                self.standard_rejections += 1
+            return ok
+
+        def counted_fill_grid(grid):
+            self.fill_nodes += 1
+            if depth[0]:
+                return fill_grid(grid)
+            depth[0] += 1
+            nogoods = generator.nogoods
+            before[:] = [generator.backtracks, generator.backjumps, nogoods.prunes if nogoods is not None else 0]
+            start = time.perf_counter()
+            try:
+                return fill_grid(grid)
+            finally:
+                self.fill_seconds += time.perf_counter() - start
+                self.backtracks += generator.backtracks - before[0]
+                self.backjumps += generator.backjumps - before[1]
+                if nogoods is not None:
+                    self.nogood_prunes += nogoods.prunes - before[2]
+                    if generator._restarting:
+                        self.restarts += 1
+                depth[0] -= 1
+
+        def counted_count_solutions(grid, count, key=None):
+            self.probe_nodes += 1
+            if depth[1]:
+                return count_solutions(grid, count, key)
+            depth[1] += 1
+            table = generator.transposition
+            if table is not None:
+                hits, misses = table.hits, table.misses
+            start = time.perf_counter()
+            try:
+                result = count_solutions(grid, count, key)
+            finally:
+                self.probe_seconds += time.perf_counter() - start
+                depth[1] -= 1
+                if table is not None:
+                    self.transposition_hits += table.hits - hits
+                    self.transposition_misses += table.misses - misses
+            self.probes += 1
+            if result == 1:
+                self.unique_probes += 1
+            return result
+
+        generator.custom_rule = counted_custom_rule
+        generator.is_valid = counted_is_valid
+        generator._fill_grid = counted_fill_grid
+        generator.count_solutions = counted_count_solutions
+        return generator
+
+    def to_dict(self):
+        """Return the counters as a JSON-serializable dict."""
+        return {
+            "fill_nodes": self.fill_nodes,
+            "probe_nodes": self.probe_nodes,
+            "backtracks": self.backtracks,
+            "is_valid_calls": self.is_valid_calls,
+            "standard_rejections": self.standard_rejections,
+            "custom_rejections": self.custom_rejections,
+            "validate": {name: dict(entry) for name, entry in self.validate.items()},
+            "probes": self.probes,
+            "unique_probes": self.unique_probes,
+            "probe_seconds": self.probe_seconds,
+            "fill_seconds": self.fill_seconds,
+            "transposition_hits": self.transposition_hits,
+            "transposition_misses": self.transposition_misses,
+            "backjumps": self.backjumps,
+            "restarts": self.restarts,
+            "nogood_prunes": self.nogood_prunes,
+        }
+
+    def summary(self):
+        """Return a short human-readable report."""
+        lines = [
+            f"Nodes: {self.fill_nodes} fill, {self.probe_nodes} uniqueness",
+            f"Backtracks: {self.backtracks}",
+            f"is_valid calls: {self.is_valid_calls} "
+            f"(rejected: {self.standard_rejections} standard, {self.custom_rejections} custom)",
+            f"Uniqueness probes: {self.probes} ({self.unique_probes} unique), {self.probe_seconds:.3f}s",
+            f"Grid fill: {self.fill_seconds:.3f}s",
+        ]
+        if self.backjumps or self.restarts or self.nogood_prunes:
+            lines.append(f"Nogood learning: {self.backjumps} backjumps, {self.restarts} restarts, "
+                         f"{self.nogood_prunes} placements pruned")
+        lookups = self.transposition_hits + self.transposition_misses
+        if lookups:
+            lines.append(f"Transposition table: {self.transposition_hits}/{lookups} hits "
+                         f"({100 * self.transposition_hits / lookups:.1f}%)")
+        for name, entry in self.validate.items():
+            lines.append(f"validate [{name}]: {entry['calls']} calls, "
+                         f"{entry['rejections']} rejections, {entry['seconds']:.3f}s")
+        return "\n".join(lines)
@@ -20,6 +20,9 @@ class KropkiRule(BaseRule):
         self.name = "Kropki Sudoku"
         self.description = "Adjacent cells have specific difference or ratio relationships"
 
+        # Dots far apart in the fill order cause deep dead ends; learn from them
+        self.learn_nogoods = True
+
         # Define white dots (consecutive, differ by 1): pairs of cells
         self.white_dots = [
             ((0, 1), (0, 2)),
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test nogood learning: the nogood database, the read recording behind the
+explanations, and grids filled with learning on for every rule.
+"""
+import contextlib
+import copy
+import io
+import os
+import random
+import sys
+
+from base_rule import BaseRule
+from nogoods import NogoodStore, cells_read
+from run import SudokuGenerator, discover_rules, load_custom_rule
+
+# Rules whose fill is too slow to test here, with or without learning
+SKIP_FILL = {
+    "sudoku_xv_rule": "the fill takes minutes for every seed tried",
+}
+
+
+class NoRepeatLeftRule(BaseRule):
+    """Reads the two cells left of the target through a slice."""
+
+    def validate(self, grid, row, col, num):
+        return num not in grid[row][max(0, col - 2):col]
+
+
+class CopyingRule(BaseRule):
+    """Copies the grid, which the recording view does not allow."""
+
+    def validate(self, grid, row, col, num):
+        return copy.deepcopy(grid)[row][col] == 0
+
+
+def check(condition, message):
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def empty_grid():
+    return [[0] * 9 for _ in range(9)]
+
+
+def test_store():
+    results = []
+    grid = empty_grid()
+    grid[0][0] = 5
+    grid[1][4] = 7
+
+    store = NogoodStore(capacity=2, max_size=3)
+    results.append(check(store.add([(1, 4, 7), (0, 0, 5), (4, 4, 2)]) and len(store) == 1,
+                         "add stores a nogood"))
+    results.append(check(store.match(grid, 4, 4, 2) == ((0, 0, 5), (1, 4, 7), (4, 4, 2)),
+                         "match finds the nogood a placement completes"))
+    results.append(check(store.match(grid, 4, 4, 3) is None and store.match(grid, 5, 5, 2) is None,
+                         "match ignores placements outside every nogood"))
+    grid[1][4] = 0
+    results.append(check(store.match(grid, 4, 4, 2) is None,
+                         "match needs every other placement of the nogood on the grid"))
+    grid[1][4] = 7
+
+    results.append(check(not store.add([]) and not store.add([(0, 0, 1), (0, 1, 2), (0, 2, 3), (0, 3, 4)])
+                         and store.skipped == 2 and len(store) == 1,
+                         "Empty and over-long nogoods are skipped"))
+    store.add([(4, 4, 2), (1, 4, 7), (0, 0, 5)])
+    results.append(check(len(store) == 1 and store.recorded == 1, "Adding a nogood twice stores it once"))
+
+    # A match refreshes the first nogood, so the second is the least recently used
+    store.add([(0, 0, 5), (8, 8, 1)])
+    store.match(grid, 4, 4, 2)
+    store.add([(1, 4, 7), (8, 8, 9)])
+    results.append(check(len(store) == 2 and store.evictions == 1, "Beyond capacity one nogood is evicted"))
+    results.append(check(store.match(grid, 8, 8, 1) is None and store.match(grid, 4, 4, 2) is not None
+                         and store.match(grid, 8, 8, 9) is not None,
+                         "The least recently used nogood is the one evicted"))
+    results.append(check(all(((0, 0, 5), (8, 8, 1)) not in nogoods for nogoods in store._index.values()),
+                         "Evicted nogoods leave the placement index"))
+
+    store.clear()
+    results.append(check(len(store) == 0 and store.match(grid, 4, 4, 2) is None, "clear forgets every nogood"))
+    return results
+
+
+def test_cells_read():
+    results = []
+    grid = empty_grid()
+    grid[3][1] = 4
+    grid[3][2] = 6
+
+    rule = NoRepeatLeftRule()
+    result, reads = cells_read(rule.validate, grid, 3, 3, 6)
+    results.append(check(result is False and reads == {(3, 1), (3, 2)},
+                         "cells_read records the cells a slice reads"))
+    result, reads = cells_read(rule.validate, grid, 3, 0, 6)
+    results.append(check(result is True and reads == set(), "An empty slice reads no cells"))
+
+    diagonal = load_custom_rule("sudoku_diagonal_rule")
+    grid[4][4] = 9
+    result, reads = cells_read(diagonal.validate, grid, 0, 0, 9)
+    results.append(check(result == diagonal.validate(grid, 0, 0, 9) and (4, 4) in reads,
+                         "cells_read returns validate's result and the cells behind it"))
+    results.append(check(cells_read(CopyingRule().validate, grid, 0, 0, 1) == (None, None),
+                         "Copying the recorded grid gives (None, None)"))
+    return results
+
+
+def test_fills():
+    results = []
+    for folder in discover_rules():
+        rule_name = os.path.basename(folder.rstrip("/"))
+        if rule_name in SKIP_FILL:
+            print(f"- {rule_name} skipped: {SKIP_FILL[rule_name]}")
+            continue
+        random.seed(1)
+        generator = SudokuGenerator(custom_rule=load_custom_rule(folder), learn_nogoods=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            grid = generator.generate_full_grid()
+
+        invalid = []
+        for row in range(generator.size):
+            for col in range(generator.size):
+                num = grid[row][col]
+                grid[row][col] = 0
+                if not num or not generator.is_valid(grid, row, col, num):
+                    invalid.append((row, col))
+                grid[row][col] = num
+        results.append(check(not invalid, f"{rule_name}: every placement of the learned fill is valid"
+                                          + (f" (invalid: {invalid[:5]})" if invalid else "")))
+    return results
+
+
+def main():
+    results = test_store() + test_cells_read() + test_fills()
+    print(f"\n{sum(results)}/{len(results)} checks passed")
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
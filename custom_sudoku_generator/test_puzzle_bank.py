@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test that puzzle banks round-trip puzzles, solutions and metadata.
+"""
+import os
+import random
+import sys
+import tempfile
+
+from puzzle_bank import PuzzleBank, PuzzleBankWriter, BankFormatError, convert_jsonl
+from bulk import write_bank
+from run import SudokuGenerator
+
+
+def make_record(index):
+    """Build a puzzle record from a freshly generated grid (no clue removal)."""
+    random.seed(index)
+    gen = SudokuGenerator()
+    solution = gen.generate_full_grid()
+    puzzle = [[value if random.random() < 0.4 else 0 for value in row] for row in solution]
+    return {
+        "puzzle": puzzle,
+        "solution": [row[:] for row in solution],
+        "metadata": {"rule": {"name": "Test", "cages": [{"sum": index, "cells": [[0, 0]]}]}},
+        "seed": index,
+    }
+
+
+def check(condition, message):
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def main():
+    records = [make_record(i) for i in range(20)]
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "test.bank")
+
+        with PuzzleBankWriter(path, rule="test") as writer:
+            for record in records[:12]:
+                writer.append(record)
+
+        with PuzzleBank(path) as bank:
+            results.append(check(len(bank) == 12, "Bank reports the number of written records"))
+            results.append(check(bank.rule == "test", "Rule name is stored in the header"))
+            results.append(check(all(bank[i]["puzzle"] == records[i]["puzzle"] for i in range(12)),
+                                 "Puzzles round-trip"))
+            results.append(check(all(bank[i]["solution"] == records[i]["solution"] for i in range(12)),
+                                 "Solutions round-trip"))
+            results.append(check(bank[-1]["metadata"] == records[11]["metadata"],
+                                 "Metadata round-trips and negative indices work"))
+            try:
+                bank[12]
+                results.append(check(False, "Out-of-range index raises IndexError"))
+            except IndexError:
+                results.append(check(True, "Out-of-range index raises IndexError"))
+
+        # A writer that never finishes (crash, SIGKILL) leaves the bank as it was
+        with open(path, "rb") as f:
+            before = f.read()
+        abandoned = PuzzleBankWriter(path, rule="test", append=True)
+        abandoned.append(records[12])
+        abandoned._file.flush()
+        with open(path, "rb") as f:
+            results.append(check(f.read() == before, "An unfinished append leaves the bank untouched"))
+        abandoned._discard()
+
+        # Appending keeps the existing records and their blobs intact, while a
+        # reader that mapped the old bank keeps reading it
+        with PuzzleBank(path) as old_bank:
+            written = write_bank(iter(records[12:]), path)
+            results.append(check(len(old_bank) == 12 and old_bank[11]["seed"] == 11,
+                                 "Open readers keep the old bank while it is replaced"))
+        with PuzzleBank(path) as bank:
+            results.append(check(written == 8 and len(bank) == 20, "write_bank appends to an existing bank"))
+            results.append(check([bank[i]["seed"] for i in range(20)] == list(range(20)),
+                                 "Blobs stay aligned with their records after appending"))
+        results.append(check(os.listdir(tmp) == ["test.bank"], "No temporary files are left behind"))
+
+        # JSON Lines banks convert to the same content
+        jsonl_path = os.path.join(tmp, "test.jsonl")
+        write_bank(iter(records), jsonl_path)
+        converted_path = os.path.join(tmp, "converted.bank")
+        convert_jsonl(jsonl_path, converted_path)
+        with PuzzleBank(converted_path) as bank:
+            results.append(check(list(bank) == records, "JSON Lines banks convert to binary banks"))
+
+        bogus_path = os.path.join(tmp, "bogus.bank")
+        with open(bogus_path, "wb") as f:
+            f.write(b"not a bank" * 10)
+        try:
+            PuzzleBank(bogus_path)
+            results.append(check(False, "Invalid files raise BankFormatError"))
+        except BankFormatError:
+            results.append(check(True, "Invalid files raise BankFormatError"))
+
+    print(f"\n{sum(results)}/{len(results)} checks passed")
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
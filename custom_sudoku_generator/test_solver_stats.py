@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test that SolverStats counts every rejected candidate exactly once.
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+
+from run import SudokuGenerator, generate_puzzle
+from solver_stats import SolverStats
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# One forward and one reverse rule, each generated once with a fixed seed
+RULES = [("sudoku_kings_rule", 1), ("sudoku_thermo_rule", 1)]
+
+
+def check(condition, message):
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def generate_counted(rule_name, seed):
+    """
+    Generate one puzzle with SolverStats while counting is_valid results directly.
+
+    Returns:
+        tuple: (stats, is_valid calls, rejected is_valid calls)
+    """
+    counts = [0, 0]
+    is_valid = SudokuGenerator.is_valid
+
+    # Patched on the class, so SolverStats.attach wraps the counting version
+    def counting_is_valid(self, grid, row, col, num):
+        ok = is_valid(self, grid, row, col, num)
+        counts[0] += 1
+        counts[1] += not ok
+        return ok
+
+    stats = SolverStats()
+    random.seed(seed)
+    SudokuGenerator.is_valid = counting_is_valid
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_puzzle(os.path.join(script_dir, rule_name), difficulty_attempts=2, stats=stats)
+    finally:
+        SudokuGenerator.is_valid = is_valid
+    return stats, counts[0], counts[1]
+
+
+def main():
+    results = []
+    for rule_name, seed in RULES:
+        stats, calls, rejected = generate_counted(rule_name, seed)
+        results.append(check(rejected > 0 and stats.is_valid_calls == calls,
+                             f"{rule_name}: is_valid_calls matches the calls made ({calls})"))
+        results.append(check(stats.standard_rejections + stats.custom_rejections == rejected,
+                             f"{rule_name}: standard + custom rejections equal the rejected calls "
+                             f"({stats.standard_rejections} + {stats.custom_rejections} = {rejected})"))
+        results.append(check(sum(entry["rejections"] for entry in stats.validate.values()) == stats.custom_rejections,
+                             f"{rule_name}: per-rule validate rejections add up to the custom rejections"))
+
+    print(f"\n{sum(results)}/{len(results)} checks passed")
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
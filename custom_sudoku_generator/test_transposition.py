@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test that the transposition table does not change count_solutions results.
+"""
+import os
+import random
+import sys
+
+from run import SudokuGenerator, load_custom_rule
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Rules whose counts are compared besides the standard rules
+RULES = ["sudoku_diagonal_rule", "sudoku_windoku_rule"]
+
+
+def make_generator(rule_name=None, transposition_size=None):
+    """Create a generator for a rule, with the default table, a given size, or none (0)."""
+    rule = load_custom_rule(os.path.join(script_dir, rule_name)) if rule_name else None
+    if transposition_size is None:
+        return SudokuGenerator(custom_rule=rule)
+    return SudokuGenerator(custom_rule=rule, transposition_size=transposition_size)
+
+
+def partial_grids(generator, seed):
+    """
+    Build partial grids from one solution: clues removed one at a time (as in
+    remove_numbers, from unique to multi-solution), plus grids without solutions.
+    """
+    random.seed(seed)
+    solution = generator.generate_full_grid()
+    cells = [(r, c) for r in range(generator.size) for c in range(generator.size)]
+    random.shuffle(cells)
+
+    # Up to 50 empty cells: beyond that, plain backtracking can take minutes
+    grids = []
+    grid = [row[:] for row in solution]
+    for removed, (r, c) in enumerate(cells[:50], 1):
+        grid[r][c] = 0
+        if removed >= 30:
+            grids.append([row[:] for row in grid])
+
+    # Change a given to another digit that breaks no constraint directly
+    for r, c in cells[50:60]:
+        grid = [row[:] for row in grids[10]]
+        grid[r][c] = 0
+        for num in range(1, generator.size + 1):
+            if num != solution[r][c] and generator.is_valid(grid, r, c, num):
+                grid[r][c] = num
+                grids.append(grid)
+                break
+    return grids
+
+
+def count(generator, grid):
+    return generator.count_solutions([row[:] for row in grid], 0)
+
+
+def check(condition, message):
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def main():
+    results = []
+    counts_seen = set()
+
+    for rule_name in [None] + RULES:
+        label = rule_name or "standard"
+        reference = make_generator(rule_name, transposition_size=0)
+        cached = make_generator(rule_name)
+        small = make_generator(rule_name, transposition_size=16)
+        for seed in (1, 2):
+            grids = partial_grids(reference, seed)
+            expected = [count(reference, grid) for grid in grids]
+            counts_seen.update(expected)
+
+            # One table for all the probes, as in remove_numbers
+            cached.transposition.clear()
+            results.append(check([count(cached, grid) for grid in grids] == expected,
+                                 f"{label}, seed {seed}: table gives the same counts on {len(grids)} grids"))
+            results.append(check([count(cached, grid) for grid in grids] == expected,
+                                 f"{label}, seed {seed}: counts stay the same when answered from the table"))
+
+            small.transposition.clear()
+            evictions = small.transposition.evictions
+            results.append(check([count(small, grid) for grid in grids] == expected,
+                                 f"{label}, seed {seed}: a 16-entry table gives the same counts"))
+            results.append(check(small.transposition.evictions > evictions,
+                                 f"{label}, seed {seed}: the 16-entry table evicted entries"))
+
+    results.append(check(counts_seen == {0, 1, 2},
+                         "Test grids include unsolvable, unique and multi-solution grids"))
+    results.append(check(make_generator(transposition_size=0).transposition is None,
+                         "transposition_size=0 disables the table"))
+
+    print(f"\n{sum(results)}/{len(results)} checks passed")
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
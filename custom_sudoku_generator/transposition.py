@@ -0,0 +1,110 @@
+"""
+Transposition table for the uniqueness checks in ``remove_numbers``.
+
+``remove_numbers`` runs ``count_solutions`` once per clue it tries to remove,
+on grids that differ from the previous probe by a single cell, and a rejected
+removal is followed by probes of grids that were partly searched before. The
+same partial grids are therefore searched again and again.
+
+Grid states are identified by a Zobrist hash: one random 64-bit number per
+(cell, digit), XORed together over the filled cells, so placing or removing a
+digit updates the hash with a single XOR. The table maps a hash to the number
+of completions of that state, capped at 2: 0 (dead end), 1 (unique) or 2
+(two or more, which is all the uniqueness check needs to know).
+
+The completions of a state depend on the rule's constraints, so a table
+belongs to one generator and its rule instance (see
+``SudokuGenerator.count_solutions``). Rules must validate from the grid
+alone, which all built-in rules do.
+"""
+import random
+from collections import OrderedDict
+
+# Entries kept per generator; the least recently used ones are evicted first
+DEFAULT_TRANSPOSITION_SIZE = 100000
+# Fixed seed: the keys must not consume or depend on the generator's random state
+ZOBRIST_SEED = 0x5D0C0
+
+_zobrist_keys = {}
+
+
+def zobrist_keys(size):
+    """
+    Return the Zobrist keys for a grid size: keys[row][col][digit].
+
+    The keys are generated once per size from a fixed seed.
+    """
+    keys = _zobrist_keys.get(size)
+    if keys is None:
+        rng = random.Random(ZOBRIST_SEED + size)
+        keys = [[[0] + [rng.getrandbits(64) for _ in range(size)] for _ in range(size)] for _ in range(size)]
+        _zobrist_keys[size] = keys
+    return keys
+
+
+def zobrist_hash(grid, keys):
+    """Hash of a grid state: the XOR of the keys of all filled cells."""
+    value = 0
+    for row, cells in zip(grid, keys):
+        for digit, cell_keys in zip(row, cells):
+            if digit:
+                value ^= cell_keys[digit]
+    return value
+
+
+class TranspositionTable:
+    """
+    Bounded LRU map from grid hashes to completion counts (0, 1 or 2 for "two or more").
+    """
+
+    def __init__(self, capacity=DEFAULT_TRANSPOSITION_SIZE):
+        """
+        Args:
+            capacity: Maximum number of entries
+        """
+        self.capacity = capacity
+        self._entries = OrderedDict()
+
+        # Counters for monitoring (see SolverStats)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the stored completion count for a hash, or None."""
+        completions = self._entries.get(key)
+        if completions is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return completions
+
+    def put(self, key, completions):
+        """Store a completion count (0, 1, or 2 for two or more)."""
+        entries = self._entries
+        entries[key] = completions
+        entries.move_to_end(key)
+        self.stores += 1
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Forget all entries (e.g. after the rule's constraints changed)."""
+        self._entries.clear()
+
+    def stats(self):
+        """Return the table's counters."""
+        return {
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
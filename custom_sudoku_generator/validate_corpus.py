@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Corpus of partially filled grids for timing each rule's ``validate``.
+
+``build`` takes every rule's stored solution (``solution.txt``, read only),
+derives the rule's constraints from it for reverse-generation rules, and
+blanks random cells to produce grids at several fill levels. The rule seed is
+stored with each entry, so ``run`` rebuilds exactly the same constraints.
+
+``run`` times every rule over the corpus in two ways:
+
+- ``validate``: ns per call, over the candidates the search would actually
+  pass to validate (digits that survive the row, column and box checks).
+- ``cell``: ns per empty cell for all digits, once through validate and once
+  through ``candidate_mask``, and checks that both agree. Rules that override
+  ``BaseRule.candidate_mask`` with a faster path can be compared directly.
+
+Usage:
+    python validate_corpus.py build
+    python validate_corpus.py run
+    python validate_corpus.py run --rules killer thermo --repeats 20 --json results.json
+"""
+import argparse
+import ast
+import copy
+import io
+import json
+import os
+import random
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from base_rule import BaseRule
+from benchmark import format_seconds, summarize, write_json
+from generate_all import find_rule_folders, normalize_rule_name
+from run import load_custom_rule
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CORPUS = os.path.join(script_dir, "benchmarks", "validate_corpus.json")
+DEFAULT_LEVELS = (0.2, 0.4, 0.6, 0.8)
+DEFAULT_GRIDS_PER_LEVEL = 3
+DEFAULT_SEED = 1234
+DEFAULT_REPEATS = 5
+# Seeds tried per rule until the derived constraints agree with the stored solution
+MAX_DERIVE_TRIES = 20
+
+
+def read_grid(path):
+    """Read a grid file written by write_puzzle_files (one Python list per line)."""
+    with open(path) as f:
+        return [ast.literal_eval(line) for line in f if line.strip()]
+
+
+def conflicts(custom_rule, solution):
+    """Count solution cells whose own value the rule rejects."""
+    grid = copy.deepcopy(solution)
+    count = 0
+    for row in range(len(grid)):
+        for col in range(len(grid)):
+            num = grid[row][col]
+            grid[row][col] = 0
+            if not custom_rule.validate(grid, row, col, num):
+                count += 1
+            grid[row][col] = num
+    return count
+
+
+def build_rule(rule_folder, solution, rule_seed):
+    """
+    Create a rule instance and derive its constraints from a solution.
+
+    The rule's own output is suppressed.
+
+    Returns:
+        The rule instance, or None if constraints could not be derived
+    """
+    random.seed(rule_seed)
+    with redirect_stdout(io.StringIO()):
+        custom_rule = load_custom_rule(rule_folder)
+        if custom_rule.supports_reverse_generation():
+            if not custom_rule.derive_constraints_from_solution(solution):
+                return None
+    return custom_rule
+
+
+def partial_grids(solution, levels, per_level, rng):
+    """
+    Blank random cells of a solution.
+
+    Args:
+        solution: Complete grid
+        levels: Fractions of cells to keep filled
+        per_level: Grids to produce per level
+        rng: random.Random instance
+
+    Returns:
+        list: [{"level", "grid"}]
+    """
+    size = len(solution)
+    cells = [(r, c) for r in range(size) for c in range(size)]
+    grids = []
+    for level in levels:
+        keep = round(level * len(cells))
+        for _ in range(per_level):
+            kept = set(rng.sample(cells, keep))
+            grid = [[solution[r][c] if (r, c) in kept else 0 for c in range(size)] for r in range(size)]
+            grids.append({"level": level, "grid": grid})
+    return grids
+
+
+def build_corpus(rule_folders, levels=DEFAULT_LEVELS, per_level=DEFAULT_GRIDS_PER_LEVEL, seed=DEFAULT_SEED):
+    """
+    Build the corpus for a list of rule folders.
+
+    Returns:
+        dict: Corpus ready to be written as JSON
+    """
+    corpus = {
+        "created_at": datetime.now().isoformat(),
+        "seed": seed,
+        "levels": list(levels),
+        "rules": {},
+    }
+    for index, folder in enumerate(rule_folders):
+        rule_name = os.path.basename(os.path.normpath(folder))
+        solution_path = os.path.join(folder, "solution.txt")
+        if not os.path.exists(solution_path):
+            print(f"Warning: {rule_name} has no solution.txt, skipped")
+            continue
+        solution = read_grid(solution_path)
+
+        # Random derivations (e.g. killer cages) do not always fit the solution
+        for attempt in range(MAX_DERIVE_TRIES):
+            rule_seed = seed + index * MAX_DERIVE_TRIES + attempt
+            custom_rule = build_rule(folder, solution, rule_seed)
+            if custom_rule is not None and conflicts(custom_rule, solution) == 0:
+                break
+        else:
+            print(f"Warning: {rule_name}: no constraints consistent with the stored solution, skipped")
+            continue
+
+        rng = random.Random(rule_seed)
+        corpus["rules"][rule_name] = {
+            "rule_seed": rule_seed,
+            "solution": solution,
+            "metadata": json.loads(json.dumps(custom_rule.get_metadata())),
+            "grids": partial_grids(solution, levels, per_level, rng),
+        }
+        print(f"✓ {rule_name}: {len(levels) * per_level} grids")
+    return corpus
+
+
+def standard_candidates(grid, row, col, use_standard_boxes, box_size=3):
+    """Digits allowed at (row, col) by the row, column and (optionally) box checks."""
+    size = len(grid)
+    used = set(grid[row]) | {grid[r][col] for r in range(size)}
+    if use_standard_boxes:
+        box_row, box_col = (row // box_size) * box_size, (col // box_size) * box_size
+        used |= {grid[r][c] for r in range(box_row, box_row + box_size)
+                 for c in range(box_col, box_col + box_size)}
+    return [num for num in range(1, size + 1) if num not in used]
+
+
+def time_rule(custom_rule, grids, repeats):
+    """
+    Time validate and candidate_mask for one rule over its corpus grids.
+
+    Returns:
+        dict: {"validate", "cell_validate", "cell_mask"} summaries (seconds per
+              call or per cell), plus "mismatches", "probes", "cells" and "native_mask"
+    """
+    probes = []
+    cells = []
+    for entry in grids:
+        grid = entry["grid"]
+        size = len(grid)
+        for row in range(size):
+            for col in range(size):
+                if grid[row][col] != 0:
+                    continue
+                cells.append((grid, row, col))
+                for num in standard_candidates(grid, row, col, custom_rule.use_standard_boxes, custom_rule.box_size):
+                    probes.append((grid, row, col, num))
+
+    validate = custom_rule.validate
+    candidate_mask = custom_rule.candidate_mask
+    digits = range(1, custom_rule.size + 1)
+
+    validate_samples, cell_validate_samples, cell_mask_samples = [], [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for grid, row, col, num in probes:
+            validate(grid, row, col, num)
+        validate_samples.append((time.perf_counter() - start) / max(len(probes), 1))
+
+        start = time.perf_counter()
+        for grid, row, col in cells:
+            for num in digits:
+                validate(grid, row, col, num)
+        cell_validate_samples.append((time.perf_counter() - start) / max(len(cells), 1))
+
+        start = time.perf_counter()
+        for grid, row, col in cells:
+            candidate_mask(grid, row, col)
+        cell_mask_samples.append((time.perf_counter() - start) / max(len(cells), 1))
+
+    mismatches = 0
+    for grid, row, col in cells:
+        expected = 0
+        for num in digits:
+            if validate(grid, row, col, num):
+                expected |= 1 << num
+        if candidate_mask(grid, row, col) != expected:
+            mismatches += 1
+
+    return {
+        "validate": summarize(validate_samples),
+        "cell_validate": summarize(cell_validate_samples),
+        "cell_mask": summarize(cell_mask_samples),
+        "mismatches": mismatches,
+        "probes": len(probes),
+        "cells": len(cells),
+        "native_mask": type(custom_rule).candidate_mask is not BaseRule.candidate_mask,
+    }
+
+
+def run_corpus(corpus, rule_folders, repeats=DEFAULT_REPEATS):
+    """
+    Time every rule in the corpus that is also in rule_folders.
+
+    Returns:
+        dict: {rule name: result from time_rule}
+    """
+    folders = {os.path.basename(os.path.normpath(folder)): folder for folder in rule_folders}
+    results = {}
+    for rule_name, entry in corpus["rules"].items():
+        if rule_name not in folders:
+            continue
+        custom_rule = build_rule(folders[rule_name], entry["solution"], entry["rule_seed"])
+        if custom_rule is None:
+            print(f"✗ {rule_name}: could not derive constraints")
+            continue
+        if json.loads(json.dumps(custom_rule.get_metadata())) != entry["metadata"]:
+            print(f"Warning: {rule_name}: constraints differ from the corpus (rule changed?); rebuild it")
+
+        result = time_rule(custom_rule, entry["grids"], repeats)
+        results[rule_name] = result
+        mask_label = "mask" if result["native_mask"] else "mask (default)"
+        line = (f"{rule_name:32} validate {format_seconds(result['validate']['median']):>7}/call   "
+                f"per cell: validate {format_seconds(result['cell_validate']['median']):>7}  "
+                f"{mask_label} {format_seconds(result['cell_mask']['median']):>7}")
+        if result["mismatches"]:
+            line += f"  ✗ {result['mismatches']} mask mismatch(es)"
+        print(line)
+    return results
+
+
+def select_folders(names):
+    rule_folders = find_rule_folders()
+    if not names:
+        return rule_folders
+    wanted = {normalize_rule_name(name) for name in names}
+    return [folder for folder in rule_folders if os.path.basename(folder) in wanted]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and time a validate() corpus of partial grids.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Generate the corpus from the stored solutions")
+    build_parser.add_argument("--out", default=DEFAULT_CORPUS, help="Corpus file (default: benchmarks/validate_corpus.json)")
+    build_parser.add_argument("--rules", nargs="+", metavar="RULE", help="Only these rules")
+    build_parser.add_argument("--levels", nargs="+", type=float, default=list(DEFAULT_LEVELS),
+                              help="Fractions of cells kept filled (default: 0.2 0.4 0.6 0.8)")
+    build_parser.add_argument("--grids", type=int, default=DEFAULT_GRIDS_PER_LEVEL,
+                              help=f"Grids per fill level (default: {DEFAULT_GRIDS_PER_LEVEL})")
+    build_parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"Random seed (default: {DEFAULT_SEED})")
+
+    run_parser = subparsers.add_parser("run", help="Time validate and candidate_mask over the corpus")
+    run_parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Corpus file")
+    run_parser.add_argument("--rules", nargs="+", metavar="RULE", help="Only these rules")
+    run_parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS,
+                            help=f"Passes over the corpus per rule (default: {DEFAULT_REPEATS})")
+    run_parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+
+    args = parser.parse_args(argv)
+    rule_folders = select_folders(args.rules)
+
+    if args.command == "build":
+        corpus = build_corpus(rule_folders, args.levels, args.grids, args.seed)
+        write_json(args.out, corpus)
+        print(f"\nCorpus with {len(corpus['rules'])} rule(s) written to {args.out}")
+        return 0
+
+    if not os.path.exists(args.corpus):
+        print(f"Error: Corpus '{args.corpus}' not found. Run: python validate_corpus.py build")
+        return 1
+    with open(args.corpus) as f:
+        corpus = json.load(f)
+    results = run_corpus(corpus, rule_folders, args.repeats)
+    if args.json:
+        write_json(args.json, {"corpus": args.corpus, "repeats": args.repeats, "rules": results})
+    return 1 if any(result["mismatches"] for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
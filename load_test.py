@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+"""
+Load test for the web app: latency percentiles and throughput per route.
+
+Virtual users (threads) request a weighted mix of the calendar (``/``), door
+pages (``/door/<n>``) and ``/generate/<n>`` for a fixed time. Each user keeps
+its own cookies, like a browser. Requests run against one of:
+
+- the Flask test client (default): no server needed, measures the app itself
+- ``--url``: an already running server
+- ``--gunicorn``: a gunicorn started here with the Procfile's settings
+
+Redirects (``/`` and ``/door/<n>`` go to the visitor's language) are followed
+and counted as part of the request. ``/generate`` is timed until its response;
+queued jobs are not waited for.
+
+Usage:
+    python load_test.py
+    python load_test.py --gunicorn --workers 2 --concurrency 32 --duration 30
+    python load_test.py --url http://127.0.0.1:8000 --mix door=10 generate=1
+    python load_test.py --baseline load_results/before.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from datetime import datetime
+from http.cookiejar import CookieJar
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(script_dir, 'custom_sudoku_generator'))
+
+from benchmark import format_seconds, percentile, write_json
+
+DEFAULT_OUT = os.path.join(script_dir, 'load_results', 'latest.json')
+DEFAULT_MIX = {'index': 1, 'door': 8, 'generate': 1}
+DEFAULT_CONCURRENCY = 8
+DEFAULT_DURATION = 10.0
+DEFAULT_SEED = 1
+# Slower p95 or lower throughput than this fraction of the baseline is flagged
+DEFAULT_THRESHOLD = 0.25
+# Seconds to wait for a started gunicorn to answer
+GUNICORN_STARTUP = 30
+
+ROUTES = {
+    'index': lambda door: '/',
+    'door': lambda door: f'/door/{door}',
+    'generate': lambda door: f'/generate/{door}',
+}
+# Admission control turning requests away (see DEPLOYMENT_NOTES.md), not failures
+REJECTED_STATUSES = ('429', '503')
+ROUTE_LABELS = {'index': '/', 'door': '/door/<n>', 'generate': '/generate/<n>'}
+
+
+def parse_mix(items):
+    """Parse ``route=weight`` pairs, e.g. ['door=8', 'generate=1']."""
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition('=')
+        if name not in ROUTES:
+            raise ValueError(f"Unknown route '{name}' (choose from {', '.join(ROUTES)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class TestClientSession:
+    """One virtual user on the Flask test client."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, path):
+        """Returns (status, JSON body or None) of the final response."""
+        response = self.client.get(path, follow_redirects=True)
+        data = response.get_json(silent=True) if response.is_json else None
+        return response.status_code, data
+
+
+class HttpSession:
+    """One virtual user talking HTTP, with its own cookie jar."""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def get(self, path):
+        try:
+            with self.opener.open(self.base_url + path, timeout=self.timeout) as response:
+                status, body, content_type = response.status, response.read(), response.headers.get_content_type()
+        except urllib.error.HTTPError as e:
+            status, body, content_type = e.code, e.read(), e.headers.get_content_type()
+        data = None
+        if content_type == 'application/json':
+            try:
+                data = json.loads(body)
+            except ValueError:
+                pass
+        return status, data
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(workers, threads, env_overrides):
+    """
+    Start gunicorn like the Procfile does, on a free local port.
+
+    Returns:
+        tuple: (process, base URL)
+    """
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '--worker-class', 'gthread', '--threads', str(threads),
+               '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+               '--chdir', os.path.join(script_dir, 'website'), 'app:app']
+    env = dict(os.environ, **env_overrides)
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + GUNICORN_STARTUP
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(base_url + '/de/', timeout=2).close()
+            return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not answer within {GUNICORN_STARTUP}s")
+
+
+def run_user(session, mix, doors, deadline, rng, results, lock):
+    """Send requests from one virtual user until the deadline."""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    local = []
+    while time.monotonic() < deadline:
+        route = rng.choices(names, weights)[0]
+        door = rng.choice(doors)
+        started = time.perf_counter()
+        try:
+            status, data = session.get(ROUTES[route](door))
+        except Exception as e:
+            status, data = type(e).__name__, None
+        elapsed = time.perf_counter() - started
+        source = data.get('source') if route == 'generate' and isinstance(data, dict) else None
+        local.append((route, elapsed, status, source))
+    with lock:
+        results.extend(local)
+
+
+def summarize_route(samples, wall):
+    """
+    Reduce one route's samples.
+
+    Args:
+        samples: (elapsed, status, source) tuples
+        wall: Seconds the test ran
+
+    Returns:
+        dict: {"requests", "throughput", "errors", "rejected", "p50", "p95", "p99", "max", "status", "sources"}
+    """
+    latencies = [elapsed for elapsed, _, _ in samples]
+    statuses = Counter(str(status) for _, status, _ in samples)
+    rejected = sum(statuses[status] for status in REJECTED_STATUSES)
+    errors = sum(count for status, count in statuses.items()
+                 if not status.isdigit() or int(status) >= 500) - statuses['503']
+    summary = {
+        'requests': len(samples),
+        'throughput': len(samples) / wall if wall else 0.0,
+        'errors': errors,
+        'rejected': rejected,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'max': max(latencies),
+        'status': dict(statuses),
+    }
+    sources = Counter(source for _, _, source in samples if source)
+    if sources:
+        summary['sources'] = dict(sources)
+    return summary
+
+
+def run_load(make_session, mix, doors, concurrency, duration, seed):
+    """
+    Run the load test.
+
+    Args:
+        make_session: Callable returning a new session (one per virtual user)
+        mix: {route name: weight}
+        doors: Door numbers to pick from
+        concurrency: Number of virtual users
+        duration: Seconds to run
+        seed: Base random seed (user i uses seed + i)
+
+    Returns:
+        dict: {"wall", "total": summary, "routes": {label: summary}}
+    """
+    results = []
+    lock = threading.Lock()
+    sessions = [make_session() for _ in range(concurrency)]
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run_user,
+                                args=(session, mix, doors, deadline, random.Random(seed + i), results, lock))
+               for i, session in enumerate(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    by_route = {}
+    for route, elapsed, status, source in results:
+        by_route.setdefault(ROUTE_LABELS[route], []).append((elapsed, status, source))
+    return {
+        'wall': wall,
+        'total': summarize_route([sample for samples in by_route.values() for sample in samples], wall)
+        if results else None,
+        'routes': {label: summarize_route(samples, wall) for label, samples in sorted(by_route.items())},
+    }
+
+
+def print_report(report):
+    print(f"\n{'route':16} {'requests':>8} {'req/s':>8} {'errors':>6} {'busy':>6} "
+          f"{'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    rows = list(report['routes'].items())
+    if report['total'] is not None:
+        rows.append(('total', report['total']))
+    for label, summary in rows:
+        print(f"{label:16} {summary['requests']:>8} {summary['throughput']:>8.1f} "
+              f"{summary['errors']:>6} {summary['rejected']:>6} {format_seconds(summary['p50']):>9} "
+              f"{format_seconds(summary['p95']):>9} {format_seconds(summary['p99']):>9} {format_seconds(summary['max']):>9}")
+    for label, summary in report['routes'].items():
+        extra = ', '.join(f"{status}: {count}" for status, count in sorted(summary['status'].items()))
+        if 'sources' in summary:
+            extra += '; ' + ', '.join(f"{source}: {count}" for source, count in sorted(summary['sources'].items()))
+        print(f"  {label}: {extra}")
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Print p95 and throughput changes per route against a baseline report.
+
+    Returns:
+        list: Routes that got slower or lost throughput beyond the threshold
+    """
+    regressions = []
+    print(f"\nCompared with baseline ({baseline.get('created_at', 'unknown date')}):")
+    for label, summary in report['routes'].items():
+        before = baseline['routes'].get(label)
+        if before is None:
+            print(f"  {label}: not in baseline")
+            continue
+        p95_change = summary['p95'] / before['p95'] - 1 if before['p95'] else 0.0
+        throughput_change = summary['throughput'] / before['throughput'] - 1 if before['throughput'] else 0.0
+        worse = p95_change > threshold or throughput_change < -threshold
+        mark = '✗' if worse else '✓'
+        print(f"  {mark} {label}: p95 {format_seconds(before['p95'])} -> {format_seconds(summary['p95'])} "
+              f"({p95_change:+.0%}), throughput {before['throughput']:.1f} -> {summary['throughput']:.1f} req/s "
+              f"({throughput_change:+.0%})")
+        if worse:
+            regressions.append(label)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the web app and report latency percentiles per route.")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help="Test a running server at this base URL instead of the Flask test client")
+    target.add_argument('--gunicorn', action='store_true', help="Start a local gunicorn (Procfile settings) and test it")
+    parser.add_argument('--workers', type=int, default=1, help="gunicorn worker processes (default: 1)")
+    parser.add_argument('--threads', type=int, default=8, help="gunicorn threads per worker (default: 8)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Virtual users sending requests at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION,
+                        help=f"Seconds to run (default: {DEFAULT_DURATION:g})")
+    parser.add_argument('--mix', nargs='+', metavar='ROUTE=WEIGHT',
+                        help="Request mix over index, door and generate (default: index=1 door=8 generate=1)")
+    parser.add_argument('--doors', nargs='+', type=int, default=list(range(1, 25)), help="Doors to request (default: 1-24)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f"Random seed (default: {DEFAULT_SEED})")
+    parser.add_argument('--out', default=DEFAULT_OUT, help="Where to write the results JSON (default: load_results/latest.json)")
+    parser.add_argument('--baseline', help="Compare against this results file")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Allowed p95/throughput regression against the baseline (default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix) if args.mix else dict(DEFAULT_MIX)
+    except ValueError as e:
+        parser.error(str(e))
+
+    process = None
+    if args.gunicorn:
+        # Keep background generation from competing with the requests being measured
+        env = {'PUZZLE_POOL_SIZE': os.environ.get('PUZZLE_POOL_SIZE', '0')}
+        process, base_url = start_gunicorn(args.workers, args.threads, env)
+        target_name = f"gunicorn ({args.workers} worker(s) x {args.threads} threads) at {base_url}"
+        make_session = lambda: HttpSession(base_url)
+    elif args.url:
+        target_name = args.url
+        make_session = lambda: HttpSession(args.url)
+    else:
+        os.environ.setdefault('PUZZLE_POOL_SIZE', '0')
+        from website.app import app
+        target_name = 'Flask test client'
+        make_session = lambda: TestClientSession(app)
+
+    print(f"Load test against {target_name}: {args.concurrency} users for {args.duration:g}s, "
+          f"mix {' '.join(f'{name}={weight:g}' for name, weight in mix.items())}")
+    try:
+        report = run_load(make_session, mix, args.doors, args.concurrency, args.duration, args.seed)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report.update({
+        'created_at': datetime.now().isoformat(),
+        'target': target_name,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'mix': mix,
+        'doors': args.doors,
+        'seed': args.seed,
+    })
+    print_report(report)
+    write_json(args.out, report)
+    print(f"\nResults written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -31,7 +31,7 @@ def test_door_loading(door_number):
         # Test web page
         print(f"Testing web page for door {door_number}...")
         with app.test_client() as client:
-            response = client.get(f'/door/{door_number}')
+            response = client.get(f'/door/{door_number}', follow_redirects=True)
             print(f"✓ Page loaded with status: {response.status_code}")
 
             if response.status_code == 200:
@@ -3,6 +3,7 @@
 
 import sys
 import os
+import time
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -22,6 +23,15 @@ def test_generate_endpoint():
             data = response.get_json()
             print(f"Response JSON: {data}")
 
+            # A queued job: poll its status until it finishes
+            if response.status_code == 202:
+                status_url = data['status_url']
+                while data['job']['status'] in ('queued', 'running'):
+                    time.sleep(1)
+                    response = client.get(status_url)
+                    data = response.get_json()
+                print(f"Job: {data.get('job')}")
+
             if response.status_code == 200:
                 if data.get('success'):
                     print("✓ SUCCESS: Generation endpoint works correctly!")
@@ -0,0 +1,180 @@
+"""
+Generation slots shared by all gunicorn workers on a machine.
+
+Each slot is a lock file in a shared directory; holding a slot means holding an
+exclusive ``flock`` on its file. The kernel drops the lock when the holder's
+file is closed or its process dies, so a crashed worker never leaks a slot.
+
+Worker processes forked while a slot is held would inherit its file, and the
+lock would stay held until they exit; held slots are therefore closed in
+every forked child.
+
+The holder also writes its pid into the file, so the slots in use can be
+counted for monitoring without touching the locks: probing a slot by locking
+it would make a concurrent try_acquire skip a free slot.
+
+A holder that is alive but stuck would keep its slot forever, so slots can be
+given a maximum hold time. Next to the pid the holder writes when it took the
+slot; once every slot is busy and one has been held longer than ``max_hold``,
+its lock file is unlinked and replaced by a fresh one that the caller locks.
+The stuck holder keeps its lock on the unlinked file, which nobody opens again.
+"""
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so the global limit is not enforced
+    fcntl = None
+
+# File descriptors of the slots held by this process
+_held_fds = set()
+
+
+def _close_held_fds():
+    # Runs in a forked child: drop its copies, the parent keeps the locks
+    for fd in _held_fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    _held_fds.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_close_held_fds)
+
+
+class Slot:
+    """A held slot; release() (or process exit) frees it."""
+
+    def __init__(self, number, fd):
+        self.number = number
+        self._fd = fd
+        if fd is not None:
+            _held_fds.add(fd)
+
+    def release(self):
+        if self._fd is not None:
+            _held_fds.discard(self._fd)
+            try:
+                os.ftruncate(self._fd, 0)
+            except OSError:
+                pass
+            os.close(self._fd)
+            self._fd = None
+
+
+class SlotSemaphore:
+    """
+    Non-blocking counting semaphore backed by lock files.
+    """
+
+    def __init__(self, directory, slots, max_hold=None):
+        """
+        Args:
+            directory: Directory for the lock files (shared by all processes)
+            slots: Number of slots
+            max_hold: Optional seconds after which a held slot may be taken over
+        """
+        self.directory = directory
+        self.slots = slots
+        self.max_hold = max_hold
+        self.enabled = fcntl is not None and slots > 0
+        if fcntl is None:
+            print("Warning: fcntl not available; global generation limit is disabled")
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, number):
+        return os.path.join(self.directory, f"slot-{number}.lock")
+
+    def try_acquire(self):
+        """
+        Take a free slot without waiting.
+
+        Returns:
+            Slot, or None if every slot is held
+        """
+        if not self.enabled:
+            return Slot(None, None)
+        for number in range(self.slots):
+            slot = self._try_lock(number)
+            if slot is not None:
+                return slot
+        if self.max_hold is not None:
+            for number in range(self.slots):
+                if self._break_if_stale(number):
+                    slot = self._try_lock(number)
+                    if slot is not None:
+                        return slot
+        return None
+
+    def _try_lock(self, number):
+        fd = os.open(self._path(number), os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return None
+        try:
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{os.getpid()} {time.time():.3f}\n".encode())
+        except OSError:
+            pass  # still held; only in_use() undercounts it
+        return Slot(number, fd)
+
+    def _break_if_stale(self, number):
+        # Unlink a slot's lock file if its holder has kept it longer than
+        # max_hold. A released slot's file is empty and is never broken.
+        path = self._path(number)
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            pid, acquired = os.read(fd, 64).split()[:2]
+            held = time.time() - float(acquired)
+            if held <= self.max_hold:
+                return False
+            if os.fstat(fd).st_ino != os.stat(path).st_ino:
+                return True  # another process has just replaced it
+            os.unlink(path)
+        except (OSError, ValueError):
+            return False
+        finally:
+            os.close(fd)
+        print(f"Warning: Generation slot {number} held by pid {pid.decode()} for {held:.0f}s; "
+              f"taking it over")
+        return True
+
+    def in_use(self):
+        """
+        Return the number of slots currently held by any process (None if disabled).
+
+        Reads the holders' pids instead of probing the locks, so it never
+        competes with try_acquire. A slot whose holder died without releasing
+        it names a pid that no longer exists and is not counted.
+        """
+        if not self.enabled:
+            return None
+        held = 0
+        for number in range(self.slots):
+            try:
+                with open(self._path(number), "r") as f:
+                    pid = int((f.read().split() or [0])[0])
+            except (OSError, ValueError):
+                continue
+            if pid and _pid_alive(pid):
+                held += 1
+        return held
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
@@ -1,20 +1,112 @@
-from flask import Flask, render_template, jsonify, request, session
+from flask import Flask, Response, g, redirect, render_template, jsonify, request, send_from_directory, session, url_for
 from flask_babel import Babel
+from werkzeug.exceptions import HTTPException
 import random
 import os
 import ast
+import json
 import sys
+import tempfile
+import threading
+import time
+import uuid
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['BABEL_DEFAULT_LOCALE'] = 'de'
 app.config['BABEL_SUPPORTED_LOCALES'] = ['en', 'de']
+# Pre-generated puzzle pool for /generate (set PUZZLE_POOL_SIZE=0 to disable)
+app.config['PUZZLE_POOL_SIZE'] = int(os.environ.get('PUZZLE_POOL_SIZE', 3))
+app.config['PUZZLE_POOL_LOW_WATER'] = int(os.environ.get('PUZZLE_POOL_LOW_WATER', 1))
+app.config['PUZZLE_POOL_WORKERS'] = int(os.environ.get('PUZZLE_POOL_WORKERS', 1))
+# Seconds after which a pool refill is abandoned and its worker process replaced (0: no limit)
+app.config['PUZZLE_POOL_TIMEOUT'] = float(os.environ.get('PUZZLE_POOL_TIMEOUT', 300))
+# Seconds between checks for changed puzzle files of a cached door
+app.config['DOOR_CACHE_CHECK_INTERVAL'] = float(os.environ.get('DOOR_CACHE_CHECK_INTERVAL', 2.0))
+# Worker processes running /generate jobs that the pool and bank cannot serve
+app.config['GENERATION_WORKERS'] = int(os.environ.get('GENERATION_WORKERS', 1))
+# Seconds after which a generation job is failed and its worker process replaced (0: no limit)
+app.config['GENERATION_JOB_TIMEOUT'] = float(os.environ.get('GENERATION_JOB_TIMEOUT', 300))
+# Seconds a finished job's status stays available
+app.config['GENERATION_JOB_RETENTION'] = int(os.environ.get('GENERATION_JOB_RETENTION', 600))
+# Admission control: queued plus running jobs per process (0 = twice the workers)
+app.config['GENERATION_MAX_PENDING'] = int(os.environ.get('GENERATION_MAX_PENDING', 0))
+# Generation jobs running at once across all gunicorn workers (0 disables the limit)
+app.config['GENERATION_GLOBAL_LIMIT'] = int(os.environ.get('GENERATION_GLOBAL_LIMIT', max(1, (os.cpu_count() or 2) - 1)))
+# Seconds after which a slot whose holder is still running may be taken over
+# (keep above GENERATION_JOB_TIMEOUT and PUZZLE_POOL_TIMEOUT; 0: never)
+app.config['GENERATION_SLOT_MAX_HOLD'] = float(os.environ.get('GENERATION_SLOT_MAX_HOLD', 900))
+# Directory holding the lock files that implement the global limit (and the
+# lock that lets a single gunicorn worker refill the puzzle pool)
+app.config['GENERATION_LOCK_DIR'] = os.environ.get(
+    'GENERATION_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'sudoku-generation-slots'))
+# Generated puzzles kept per session and door (in memory, optionally shared on disk)
+app.config['SESSION_PUZZLE_CAPACITY'] = int(os.environ.get('SESSION_PUZZLE_CAPACITY', 1000))
+app.config['SESSION_PUZZLE_TTL'] = int(os.environ.get('SESSION_PUZZLE_TTL', 86400))
+app.config['SESSION_PUZZLE_SPILL_DIR'] = os.environ.get('SESSION_PUZZLE_SPILL_DIR') or None
+# Cache lifetime for content-hashed assets under /assets (a year; URLs change with content)
+app.config['ASSET_MAX_AGE'] = int(os.environ.get('ASSET_MAX_AGE', 31536000))
+# Seconds between keep-alive comments on an idle progress stream
+app.config['GENERATION_EVENTS_KEEPALIVE'] = float(os.environ.get('GENERATION_EVENTS_KEEPALIVE', 15))
+# Progress streams one worker serves at once; each holds a gunicorn thread (0: no limit)
+app.config['GENERATION_EVENTS_MAX_STREAMS'] = int(os.environ.get('GENERATION_EVENTS_MAX_STREAMS', 4))
+# Seconds shared caches may keep a rendered page (pages are per URL, see get_locale)
+app.config['PAGE_MAX_AGE'] = int(os.environ.get('PAGE_MAX_AGE', 300))
+# Directory where gunicorn workers share their /metrics snapshots (empty: this process only)
+app.config['METRICS_DIR'] = os.environ.get(
+    'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'sudoku-metrics')) or None
+# Seconds between metrics snapshots written to METRICS_DIR
+app.config['METRICS_FLUSH_INTERVAL'] = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
 
 def get_locale():
-    # Try to get locale from session first, then from request
-    if 'language' in session:
+    # Locale-prefixed URLs (/de/door/5) decide the language on their own
+    lang = (request.view_args or {}).get('lang')
+    if lang in app.config['BABEL_SUPPORTED_LOCALES']:
+        return lang
+    return preferred_locale()
+
+def preferred_locale():
+    """Guess the visitor's language for redirects: cookie, then session, then Accept-Language."""
+    supported = app.config['BABEL_SUPPORTED_LOCALES']
+    lang = request.cookies.get('language')
+    if lang in supported:
+        return lang
+    if has_session_cookie() and session.get('language') in supported:
         return session['language']
-    return request.accept_languages.best_match(app.config['BABEL_SUPPORTED_LOCALES']) or 'de'
+    return request.accept_languages.best_match(supported) or app.config['BABEL_DEFAULT_LOCALE']
+
+def has_session_cookie():
+    """Whether the request carries a session cookie (checked without touching the session)."""
+    return app.config['SESSION_COOKIE_NAME'] in request.cookies
+
+def page_response(html, private=False):
+    """
+    Wrap a rendered page with cache headers.
+
+    Pages depend only on their URL unless the session holds the visitor's own
+    puzzle, so they may be stored by shared caches. Vary: Cookie keeps a
+    visitor with a session from getting another variant.
+    """
+    response = app.make_response(html)
+    response.vary.add('Cookie')
+    if private:
+        response.cache_control.private = True
+        response.cache_control.no_store = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config['PAGE_MAX_AGE']
+    return response
+
+def query_args():
+    """The request's query arguments, minus names that clash with route arguments."""
+    return {key: value for key, value in request.args.items() if key not in ('lang', 'door_number')}
+
+def redirect_to_locale(endpoint, **values):
+    """Redirect an unprefixed URL to the visitor's preferred locale."""
+    response = redirect(url_for(endpoint, lang=preferred_locale(), **values))
+    response.vary.update(['Cookie', 'Accept-Language'])
+    response.cache_control.no_cache = True
+    return response
 
 babel = Babel(app, locale_selector=get_locale)
 
@@ -22,6 +114,8 @@ babel = Babel(app, locale_selector=get_locale)
 @app.errorhandler(Exception)
 def handle_error(e):
     # Only return JSON for API routes
+    if not isinstance(e, HTTPException):
+        metric_errors.inc(route=request_route(), exception=type(e).__name__)
     if '/generate/' in request.path:
         return jsonify({
             'success': False,
@@ -30,8 +124,135 @@ def handle_error(e):
     # For other routes, let Flask handle it normally
     raise e
 
-# Add the custom_sudoku_generator to the path
+# Add the custom_sudoku_generator and this directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'custom_sudoku_generator'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from admission import SlotSemaphore
+from assets import AssetManifest
+from door_api import DoorPayloads
+from door_cache import DoorCache
+from generation_jobs import DONE, QUEUED, RUNNING, JobManager, JobRejected
+from metrics import CONTENT_TYPE, GENERATION_BUCKETS, MetricsRegistry
+from session_store import SessionPuzzleStore
+from puzzle_pool import PuzzlePool
+
+asset_manifest = AssetManifest(app.static_folder)
+
+metrics = MetricsRegistry(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_INTERVAL'])
+metric_requests = metrics.counter(
+    'sudoku_http_requests_total', 'HTTP requests by route, method and status.',
+    ('route', 'method', 'status'))
+metric_request_seconds = metrics.histogram(
+    'sudoku_http_request_duration_seconds', 'Time spent handling a request.', ('route',))
+metric_errors = metrics.counter(
+    'sudoku_http_exceptions_total', 'Exceptions raised while handling a request.',
+    ('route', 'exception'))
+metric_generation_seconds = metrics.histogram(
+    'sudoku_generation_duration_seconds',
+    'Time to generate one puzzle (source: job for /generate, pool for refills).',
+    ('door', 'mode', 'source'), buckets=GENERATION_BUCKETS)
+metric_generation_queue_seconds = metrics.histogram(
+    'sudoku_generation_queue_seconds', 'Time a generation job waited before it started.',
+    buckets=GENERATION_BUCKETS)
+metric_generations = metrics.counter(
+    'sudoku_generations_total', 'Finished puzzle generations by outcome.',
+    ('door', 'mode', 'source', 'status'))
+
+def request_route():
+    """The matched URL rule (e.g. /<lang>/door/<int:door_number>), keeping label values few."""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+def record_request(status):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request_route()
+        metric_request_seconds.observe(time.perf_counter() - started, route=route)
+        metric_requests.inc(route=route, method=request.method, status=status)
+
+@app.after_request
+def record_request_metrics(response):
+    record_request(response.status_code)
+    return response
+
+@app.teardown_request
+def record_failed_request_metrics(exc):
+    # Requests whose exception escaped handle_error never reach after_request
+    record_request(500)
+
+_generation_modes = {}
+
+def generation_mode(door_number):
+    """'reverse' or 'forward': how the door's rule generates puzzles (cached per door)."""
+    mode = _generation_modes.get(door_number)
+    if mode is None:
+        from rule_registry import get_registry
+        custom_rule = get_registry().create(get_rule_folder(door_number))
+        mode = 'reverse' if custom_rule.supports_reverse_generation() else 'forward'
+        _generation_modes[door_number] = mode
+    return mode
+
+def record_job_metrics(job):
+    """JobManager on_finish callback: record a finished job's timings."""
+    mode = generation_mode(job.door_number)
+    status = 'success' if job.status == DONE else 'failure'
+    metric_generations.inc(door=job.door_number, mode=mode, source='job', status=status)
+    if job.started_at is None:
+        return
+    metric_generation_queue_seconds.observe(job.started_at - job.created_at)
+    if job.status == DONE:
+        metric_generation_seconds.observe(job.finished_at - job.started_at,
+                                          door=job.door_number, mode=mode, source='job')
+
+def record_pool_metrics(door_number, seconds, ok):
+    """PuzzlePool on_generated callback: record a refill's duration."""
+    mode = generation_mode(door_number)
+    metric_generations.inc(door=door_number, mode=mode, source='pool',
+                           status='success' if ok else 'failure')
+    if ok:
+        metric_generation_seconds.observe(seconds, door=door_number, mode=mode, source='pool')
+
+def job_gauges():
+    counts = _job_manager.counts() if _job_manager is not None else {}
+    return {('queued',): counts.get(QUEUED, 0), ('running',): counts.get(RUNNING, 0)}
+
+def job_rejections():
+    rejected = _job_manager.rejected if _job_manager is not None else {}
+    return {(reason,): count for reason, count in rejected.items()}
+
+metrics.gauge_callback('sudoku_generation_jobs', 'Generation jobs queued or running.', job_gauges, ('state',))
+metrics.counter_callback('sudoku_generation_rejected_total', 'Generation jobs rejected by admission control.',
+                         job_rejections, ('reason',))
+metrics.counter_callback('sudoku_door_cache_requests_total', 'Door cache lookups by result.',
+                         lambda: {('hit',): door_cache.hits, ('miss',): door_cache.misses}, ('result',))
+metrics.gauge_callback('sudoku_puzzle_pool_stocked', 'Pre-generated puzzles in stock.',
+                       lambda: sum(_puzzle_pool.stats()['stocked'].values()) if _puzzle_pool is not None else 0)
+
+def asset_url(filename):
+    """URL of a static file under its content-hashed name (plain /static if missing)."""
+    hashed = asset_manifest.hashed(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('hashed_asset', filename=hashed)
+
+@app.context_processor
+def inject_url_helpers():
+    """URL helpers used by the templates; export_static.py passes its own."""
+    lang = get_locale()
+    return {
+        'asset_url': asset_url,
+        'door_url': lambda door_number: url_for('door', lang=lang, door_number=door_number),
+        'calendar_url': url_for('calendar', lang=lang),
+        # Where the language switcher leads (the view passes the current page's URLs)
+        'language_urls': {other: url_for('calendar', lang=other)
+                          for other in app.config['BABEL_SUPPORTED_LOCALES']},
+        'static_export': False,
+        'dynamic_base': '',
+    }
 
 # Mapping of door numbers to rule folders
 DOOR_TO_RULE = {
@@ -66,6 +287,126 @@ def get_rule_folder(door_number):
     rule_name = DOOR_TO_RULE.get(door_number, 'sudoku_knights_rule')
     return os.path.join(os.path.dirname(__file__), '..', 'custom_sudoku_generator', rule_name)
 
+# Guards the lazily created process-wide singletons below: gthread workers
+# serve requests on several threads, and two threads creating the pool or the
+# job manager at once would start two sets of background threads.
+_singleton_lock = threading.Lock()
+
+_bank_catalog = None
+
+def get_bank_catalog():
+    """Return the catalog of pre-generated puzzle banks (custom_sudoku_generator/banks)."""
+    global _bank_catalog
+    if _bank_catalog is None:
+        with _singleton_lock:
+            if _bank_catalog is None:
+                from bank_index import BankCatalog
+                _bank_catalog = BankCatalog(os.path.join(os.path.dirname(__file__), '..', 'custom_sudoku_generator', 'banks'))
+    return _bank_catalog
+
+def parse_bank_filters(args):
+    """Read clue count and difficulty ranges from request query parameters."""
+    return {
+        'clues': (args.get('min_clues', type=int), args.get('max_clues', type=int)),
+        'difficulty': (args.get('min_difficulty', type=int), args.get('max_difficulty', type=int)),
+    }
+
+def select_bank_puzzle(door_number, filters=None):
+    """
+    Pick a random puzzle from the door's bank matching the filters.
+
+    Returns:
+        tuple: (record_number, record), or None if there is no bank or no match
+    """
+    entry = get_bank_catalog().get(DOOR_TO_RULE.get(door_number, 'sudoku_knights_rule'))
+    if entry is None:
+        return None
+    bank, index = entry
+    record_number = index.select(**(filters or {}))
+    if record_number is None:
+        return None
+    return record_number, bank[record_number]
+
+def load_bank_puzzle(door_number, record_number):
+    """Load a specific bank record for a door, or None if it does not exist."""
+    entry = get_bank_catalog().get(DOOR_TO_RULE.get(door_number, 'sudoku_knights_rule'))
+    if entry is None:
+        return None
+    bank, _ = entry
+    try:
+        return bank[record_number]
+    except IndexError:
+        return None
+
+def make_generation_slots():
+    """Return the machine-wide generation slots, or None if the limit is disabled."""
+    if app.config['GENERATION_GLOBAL_LIMIT'] <= 0:
+        return None
+    return SlotSemaphore(app.config['GENERATION_LOCK_DIR'], app.config['GENERATION_GLOBAL_LIMIT'],
+                         max_hold=app.config['GENERATION_SLOT_MAX_HOLD'] or None)
+
+_puzzle_pool = None
+
+def get_puzzle_pool():
+    """Return the process-wide puzzle pool, starting it on first use (None if disabled)."""
+    global _puzzle_pool
+    if _puzzle_pool is None and app.config['PUZZLE_POOL_SIZE'] > 0:
+        with _singleton_lock:
+            if _puzzle_pool is None:
+                from bulk import generate_one
+                pool = PuzzlePool(
+                    generate_one,
+                    {door: get_rule_folder(door) for door in DOOR_TO_RULE},
+                    capacity=app.config['PUZZLE_POOL_SIZE'],
+                    low_water=app.config['PUZZLE_POOL_LOW_WATER'],
+                    workers=app.config['PUZZLE_POOL_WORKERS'],
+                    on_generated=record_pool_metrics,
+                    slots=make_generation_slots(),
+                    refill_lock=SlotSemaphore(os.path.join(app.config['GENERATION_LOCK_DIR'], 'pool-refill'), 1),
+                    timeout=app.config['PUZZLE_POOL_TIMEOUT'] or None,
+                )
+                pool.start()
+                _puzzle_pool = pool
+    return _puzzle_pool
+
+_job_manager = None
+
+def get_job_manager():
+    """Return the process-wide generation job manager, creating it on first use."""
+    global _job_manager
+    if _job_manager is None:
+        with _singleton_lock:
+            if _job_manager is None:
+                from bulk import generate_one
+                _job_manager = JobManager(
+                    generate_one,
+                    workers=app.config['GENERATION_WORKERS'],
+                    retention=app.config['GENERATION_JOB_RETENTION'],
+                    max_pending=app.config['GENERATION_MAX_PENDING'] or None,
+                    slots=make_generation_slots(),
+                    on_finish=record_job_metrics,
+                    timeout=app.config['GENERATION_JOB_TIMEOUT'] or None,
+                )
+    return _job_manager
+
+session_store = SessionPuzzleStore(
+    capacity=app.config['SESSION_PUZZLE_CAPACITY'],
+    ttl=app.config['SESSION_PUZZLE_TTL'],
+    spill_dir=app.config['SESSION_PUZZLE_SPILL_DIR'],
+)
+
+def get_session_id(create=False):
+    """Return the visitor's session id, assigning one if create is True."""
+    sid = session.get('sid')
+    if sid is None and create:
+        sid = session['sid'] = uuid.uuid4().hex
+    return sid
+
+def claim_job_result(job, sid):
+    """Store a finished job's puzzle for a session that requested it."""
+    if job.status == 'done' and sid is not None and sid in job.owners:
+        session_store.put(sid, job.door_number, job.result)
+
 def load_metadata(door_number):
     """Load metadata for a given door number."""
     rule_folder = get_rule_folder(door_number)
@@ -83,7 +424,7 @@ def load_metadata(door_number):
             }
         }
 
-def get_translated_rule_info(door_number):
+def get_translated_rule_info(door_number, metadata=None):
     """Get translated rule name and description based on current locale."""
     locale = get_locale()
     
@@ -115,8 +456,9 @@ def get_translated_rule_info(door_number):
         24: {'name': 'Puzzle-Sudoku', 'description': 'Unregelmäßige Regionen ersetzen 3x3-Boxen, müssen alle Ziffern 1-9 enthalten'},
     }
     
-    # Load metadata to get English names
-    metadata = load_metadata(door_number)
+    # Use metadata to get English names
+    if metadata is None:
+        metadata = door_cache.get(door_number).metadata
     english_name = metadata['rule']['name']
     english_description = metadata['rule']['description']
     
@@ -160,49 +502,136 @@ def load_solution(door_number=1):
             grid.append(row)
     return grid
 
+door_cache = DoorCache(
+    get_rule_folder, load_metadata, load_sudoku, load_solution,
+    check_interval=app.config['DOOR_CACHE_CHECK_INTERVAL'],
+)
+door_payloads = DoorPayloads(door_cache)
+
 @app.route('/set_language/<language>')
 def set_language(language):
+    # Only a hint for redirects from unprefixed URLs; pages take the locale from the URL
+    response = jsonify({'success': True, 'language': language})
     if language in app.config['BABEL_SUPPORTED_LOCALES']:
         session['language'] = language
-    # Redirect back to the referrer or home page
-    return jsonify({'success': True, 'language': language})
+        response.set_cookie('language', language, max_age=365 * 24 * 3600, samesite='Lax')
+    return response
 
 @app.route('/')
-def calendar():
+def index():
+    return redirect_to_locale('calendar')
+
+@app.route('/<lang>/')
+def calendar(lang):
+    if lang not in app.config['BABEL_SUPPORTED_LOCALES']:
+        return "Unknown language", 404
     doors = list(range(1, 25))
     # Pass list of tuples (door_number, position_class)
     door_positions = list(zip(doors, position_classes))
-    return render_template("calendar.html", door_positions=door_positions, get_locale=get_locale)
+    return page_response(render_template("calendar.html", door_positions=door_positions, get_locale=get_locale))
+
+@app.route('/assets/<path:filename>')
+def hashed_asset(filename):
+    """Serve a static file by its content-hashed name with long-lived caching."""
+    original = asset_manifest.resolve(filename)
+    if original is None:
+        return "Asset not found", 404
+    response = send_from_directory(app.static_folder, original, max_age=app.config['ASSET_MAX_AGE'])
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/door/<int:door_number>')
-def door(door_number):
-    # Validate door number
+def unprefixed_door(door_number):
+    return redirect_to_locale('door', door_number=door_number, **query_args())
+
+@app.route('/<lang>/door/<int:door_number>')
+def door(lang, door_number):
+    # Validate language and door number
+    if lang not in app.config['BABEL_SUPPORTED_LOCALES']:
+        return "Unknown language", 404
     if door_number < 1 or door_number > 24:
         return "Invalid door number", 404
     
     # Load metadata, sudoku grid, and solution for the door
-    metadata = load_metadata(door_number)
-    sudoku_grid = load_sudoku(door_number)
-    solution_grid = load_solution(door_number)
+    # (?puzzle=<n> shows record n of the door's puzzle bank instead, and a
+    # puzzle generated for this session takes precedence over the default)
+    record = None
+    record_number = request.args.get('puzzle', type=int)
+    if record_number is not None:
+        record = load_bank_puzzle(door_number, record_number)
+    elif has_session_cookie():
+        sid = get_session_id()
+        if sid is not None:
+            record = session_store.get(sid, door_number)
+    # Only a session's own puzzle makes the page personal
+    personal = record is not None and record_number is None
+    if record is not None:
+        metadata = record['metadata']
+        sudoku_grid = record['puzzle']
+        solution_grid = record['solution']
+        # One-off puzzles are inlined into the page
+        door_data_url = None
+    else:
+        door_data = door_cache.get(door_number)
+        metadata = door_data.metadata
+        sudoku_grid = door_data.sudoku
+        solution_grid = door_data.solution
+        # The default puzzle's solution and metadata come from the cacheable API
+        door_data_url = url_for('door_api', door_number=door_number, v=door_data.version)
     
     # Get translated rule name and description
-    rule_name, rule_description = get_translated_rule_info(door_number)
+    rule_name, rule_description = get_translated_rule_info(door_number, metadata)
+
+    # Stock this door first so "Generate New Puzzle" can be served from the pool
+    pool = get_puzzle_pool()
+    if pool is not None:
+        pool.warm(door_number)
     
     # Use a generic template for all doors
-    return render_template("door.html", 
+    html = render_template("door.html", 
                          door=door_number, 
                          metadata=metadata,
                          rule_name=rule_name,
                          rule_description=rule_description,
                          sudoku=sudoku_grid, 
                          solution=solution_grid,
+                         door_data_url=door_data_url,
+                         language_urls={other: url_for('door', lang=other, door_number=door_number, **query_args())
+                                        for other in app.config['BABEL_SUPPORTED_LOCALES']},
                          get_locale=get_locale)
+    return page_response(html, private=personal)
+
+@app.route('/api/door/<int:door_number>')
+def door_api(door_number):
+    """Serve a door's default puzzle, solution and metadata as compact JSON.
+
+    The payload is pre-serialized and pre-compressed per puzzle version. Its
+    strong ETag answers If-None-Match with 304, and a request naming the
+    current version (?v=<version>) may be cached indefinitely.
+    """
+    if door_number < 1 or door_number > 24:
+        return jsonify({'success': False, 'message': 'Invalid door number'}), 404
+
+    payload = door_payloads.get(door_number)
+    encoding, body = payload.negotiate(request.accept_encodings)
+    response = Response(body, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(payload.etag(encoding))
+    response.cache_control.public = True
+    if request.args.get('v') == payload.version:
+        response.cache_control.max_age = app.config['ASSET_MAX_AGE']
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/generate/<int:door_number>')
 def generate_puzzle(door_number):
     """Generate a new sudoku puzzle for the specified door."""
     try:
-        # Check if we have write permissions
         rule_folder = get_rule_folder(door_number)
 
         # Ensure the rule folder exists
@@ -212,36 +641,67 @@ def generate_puzzle(door_number):
                 'message': f'Rule folder not found: {rule_folder}'
             }), 404
 
-        # Check write permissions by trying to create a test file
-        test_file = os.path.join(rule_folder, '.write_test')
-        try:
-            with open(test_file, 'w') as f:
-                f.write('test')
-            os.remove(test_file)
-        except (IOError, OSError) as e:
+        # New puzzles are kept for this visitor's session only
+        sid = get_session_id(create=True)
+
+        # Optional filters, e.g. /generate/18?max_clues=28&min_difficulty=20
+        filters = parse_bank_filters(request.args)
+        filtered = any(bound is not None for bounds in filters.values() for bound in bounds)
+
+        # Serve a pre-generated puzzle if the pool has one in stock
+        pool = get_puzzle_pool()
+        puzzle = pool.take(door_number) if pool is not None and not filtered else None
+        if puzzle is not None:
+            session_store.put(sid, door_number, puzzle)
             return jsonify({
-                'success': False,
-                'message': f'No write permission in rule folder. Please check file permissions on the server.'
-            }), 403
+                'success': True,
+                'message': 'New puzzle generated successfully!',
+                'source': 'pool'
+            })
 
-        # Import the generation function
-        try:
-            from run import generate_sudoku_for_rule
-        except ImportError as e:
+        # Otherwise pick one from the door's puzzle bank via its index
+        selected = select_bank_puzzle(door_number, filters)
+        if selected is not None:
+            record_number, puzzle = selected
+            session_store.put(sid, door_number, puzzle)
+            return jsonify({
+                'success': True,
+                'message': 'New puzzle generated successfully!',
+                'source': 'bank',
+                'puzzle': record_number
+            })
+        if filtered:
             return jsonify({
                 'success': False,
-                'message': f'Could not import generation module: {str(e)}'
-            }), 500
+                'message': 'No pre-generated puzzle matches the requested filters.'
+            }), 404
 
-        # Generate new puzzle
-        print(f"Generating new puzzle for door {door_number}...")
-        print(f"Rule folder: {rule_folder}")
-        puzzle_grid, solution_grid = generate_sudoku_for_rule(rule_folder)
+        # Generate a new puzzle in the background; the page polls the job's status
+        try:
+            job, created = get_job_manager().submit(door_number, rule_folder, owner=sid)
+        except JobRejected as e:
+            if e.reason == 'queue_full':
+                message, status = 'Too many puzzles are being generated right now. Please try again shortly.', 429
+            else:
+                message, status = 'The server is busy generating puzzles. Please try again shortly.', 503
+            response = jsonify({
+                'success': False,
+                'message': message,
+                'retry_after': e.retry_after
+            })
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, status
+        if created:
+            print(f"Queued generation job {job.id} for door {door_number} ({rule_folder})")
 
         return jsonify({
             'success': True,
-            'message': 'New puzzle generated successfully!'
-        })
+            'message': 'Generating a new puzzle...',
+            'source': 'job',
+            'job': job.to_dict(),
+            'status_url': url_for('generation_job_status', job_id=job.id),
+            'events_url': url_for('generation_job_events', job_id=job.id)
+        }), 202
     except Exception as e:
         print(f"Error generating puzzle: {e}")
         import traceback
@@ -257,5 +717,105 @@ def generate_puzzle(door_number):
             'message': f'Error: {error_message}'
         }), 500
 
+@app.route('/generate/stats')
+def generation_stats():
+    """Report generation queue depth and admission counters for monitoring."""
+    pool = get_puzzle_pool()
+    return jsonify({
+        'jobs': get_job_manager().stats(),
+        'pool': pool.stats() if pool is not None else None,
+        'sessions': session_store.stats(),
+        'door_cache': {'hits': door_cache.hits, 'misses': door_cache.misses}
+    })
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Request, generation and cache metrics of all workers in the Prometheus text format."""
+    response = Response(metrics.render(), content_type=CONTENT_TYPE)
+    response.cache_control.no_store = True
+    return response
+
+@app.route('/generate/jobs/<job_id>')
+def generation_job_status(job_id):
+    """Report the status and timings of a generation job."""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Unknown or expired generation job.'
+        }), 404
+
+    claim_job_result(job, get_session_id())
+    response = {
+        'success': job.status != 'failed',
+        'job': job.to_dict()
+    }
+    if job.status == 'done':
+        response['message'] = 'New puzzle generated successfully!'
+    elif job.status == 'failed':
+        response['message'] = f'Error: {job.error}'
+    return jsonify(response)
+
+_event_streams = (threading.BoundedSemaphore(app.config['GENERATION_EVENTS_MAX_STREAMS'])
+                  if app.config['GENERATION_EVENTS_MAX_STREAMS'] > 0 else None)
+
+@app.route('/generate/jobs/<job_id>/events')
+def generation_job_events(job_id):
+    """Stream a generation job's progress as server-sent events.
+
+    Each progress event is sent as ``event: progress`` with the event number as
+    its id, so a reconnecting EventSource resumes via Last-Event-ID. The stream
+    ends with a ``done`` or ``failed`` event carrying the job status.
+
+    An open stream occupies one of the worker's threads for the whole
+    generation, so at most GENERATION_EVENTS_MAX_STREAMS are served at once;
+    beyond that the request gets a 503 and the door page polls the job
+    status instead.
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Unknown or expired generation job.'
+        }), 404
+
+    if _event_streams is not None and not _event_streams.acquire(blocking=False):
+        return jsonify({
+            'success': False,
+            'message': 'Too many progress streams open; poll the job status instead.',
+            'status_url': url_for('generation_job_status', job_id=job.id)
+        }), 503
+
+    try:
+        next_event = int(request.headers.get('Last-Event-ID', -1)) + 1
+    except ValueError:
+        next_event = 0
+    keepalive = app.config['GENERATION_EVENTS_KEEPALIVE']
+    sid = get_session_id()
+
+    def stream():
+        nonlocal next_event
+        while True:
+            events = job.wait_for_events(next_event, timeout=keepalive)
+            for number, event in events:
+                yield f"id: {number}\nevent: progress\ndata: {json.dumps(event)}\n\n"
+                next_event = number + 1
+            if job.finished:
+                claim_job_result(job, sid)
+                yield f"event: {job.status}\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    if _event_streams is not None:
+        # Runs when the server is done with the response, including when the
+        # client disconnects mid-stream
+        response.call_on_close(_event_streams.release)
+    return response
+
 if __name__ == "__main__":
     app.run( debug = True , host = '0.0.0.0', port = 5001)
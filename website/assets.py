@@ -0,0 +1,91 @@
+"""
+Content-hashed names for static files.
+
+``door.js`` is served as ``door.<hash>.js``, where the hash comes from the
+file's content. A changed file gets a new URL, so responses can carry
+far-future cache headers and browsers never use a stale copy. Both the Flask
+app (the /assets route) and the static exporter resolve names through
+AssetManifest.
+"""
+import hashlib
+import os
+import threading
+
+HASH_LENGTH = 10
+
+
+def content_hash(path):
+    """Return the first HASH_LENGTH hex digits of a file's SHA-256."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_filename(filename, digest):
+    """Insert a digest before the extension: door.js -> door.<digest>.js."""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest}{ext}"
+
+
+class AssetManifest:
+    """
+    Maps files in a static directory to their content-hashed names.
+
+    Hashes are cached per file and recomputed when its modification time or
+    size changes, so edits during development are picked up without a restart.
+    """
+
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self._hashes = {}  # filename -> ((mtime_ns, size), hashed filename)
+        self._lock = threading.Lock()
+
+    def hashed(self, filename):
+        """
+        Return the hashed name of a file relative to static_dir, or None if missing.
+        """
+        path = os.path.join(self.static_dir, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._hashes.get(filename)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        name = hashed_filename(filename, content_hash(path))
+        with self._lock:
+            self._hashes[filename] = (signature, name)
+        return name
+
+    def resolve(self, hashed_name):
+        """
+        Map a hashed name back to the original filename.
+
+        Returns None unless the digest matches the file's current content, so
+        an outdated URL is a 404 rather than silently serving new content.
+        """
+        stem, ext = os.path.splitext(hashed_name)
+        stem, dot, digest = stem.rpartition('.')
+        if not dot or len(digest) != HASH_LENGTH:
+            return None
+        filename = stem + ext
+        if self.hashed(filename) != hashed_name:
+            return None
+        return filename
+
+    def files(self):
+        """Return all files below static_dir, relative to it, with '/' separators."""
+        found = []
+        for root, _, names in os.walk(self.static_dir):
+            for name in names:
+                relative = os.path.relpath(os.path.join(root, name), self.static_dir)
+                found.append(relative.replace(os.sep, '/'))
+        return sorted(found)
+
+    def mapping(self):
+        """Return {filename: hashed filename} for every static file."""
+        return {filename: self.hashed(filename) for filename in self.files()}
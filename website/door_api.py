@@ -0,0 +1,83 @@
+"""
+Pre-serialized, pre-compressed door data for /api/door/<n>.
+
+A door's payload (puzzle, solution and metadata, which for some rules holds
+long cage or thermometer lists) is serialized and compressed once per puzzle
+version instead of on every request. The version comes from the door cache
+and doubles as the strong ETag, so revalidating clients get a 304.
+"""
+import gzip
+import json
+import threading
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is always available
+    brotli = None
+
+
+class EncodedPayload:
+    """One door payload in every available encoding."""
+
+    __slots__ = ('version', 'identity', 'gzip', 'br')
+
+    def __init__(self, version, data):
+        self.version = version
+        self.identity = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        # mtime=0 keeps the bytes identical across processes
+        self.gzip = gzip.compress(self.identity, compresslevel=9, mtime=0)
+        self.br = brotli.compress(self.identity) if brotli is not None else None
+
+    def negotiate(self, accept_encodings):
+        """
+        Pick the smallest encoding the client accepts.
+
+        Args:
+            accept_encodings: werkzeug Accept object (request.accept_encodings)
+
+        Returns:
+            tuple: (content encoding or None for identity, body bytes)
+        """
+        if self.br is not None and accept_encodings['br']:
+            return 'br', self.br
+        if accept_encodings['gzip']:
+            return 'gzip', self.gzip
+        return None, self.identity
+
+    def etag(self, encoding):
+        """Strong ETag for the payload in an encoding (each encoding is its own representation)."""
+        return f"{self.version}-{encoding}" if encoding else self.version
+
+
+class DoorPayloads:
+    """
+    Encoded payload per door, rebuilt when the door cache reports a new version.
+    """
+
+    def __init__(self, door_cache):
+        self.door_cache = door_cache
+        self._payloads = {}
+        self._lock = threading.Lock()
+
+    def get(self, door_number):
+        """Return the EncodedPayload for a door's current puzzle."""
+        entry = self.door_cache.get(door_number)
+        payload = self._payloads.get(door_number)
+        if payload is not None and payload.version == entry.version:
+            return payload
+
+        payload = EncodedPayload(entry.version, door_payload(door_number, entry))
+        with self._lock:
+            self._payloads[door_number] = payload
+        return payload
+
+
+def door_payload(door_number, door_data):
+    """Return the JSON-serializable payload for a door's DoorData."""
+    return {
+        'door': door_number,
+        'version': door_data.version,
+        'metadata': door_data.metadata,
+        'sudoku': door_data.sudoku,
+        'solution': door_data.solution,
+    }
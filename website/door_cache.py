@@ -0,0 +1,98 @@
+"""
+Process-level cache of parsed door data.
+
+Each door's puzzle, solution and metadata are parsed once and kept in memory.
+An entry is reloaded when one of the door's files has a new modification time,
+or immediately when invalidate() is called. File times are checked at most
+once per ``check_interval`` seconds, so a busy door page is served without
+touching the disk.
+"""
+import hashlib
+import os
+import threading
+import time
+
+DOOR_FILES = ('sudoku.txt', 'solution.txt', 'metadata.json')
+
+
+class DoorData:
+    """Parsed data for one door."""
+
+    __slots__ = ('metadata', 'sudoku', 'solution', 'version', 'mtimes', 'checked_at')
+
+    def __init__(self, metadata, sudoku, solution, mtimes):
+        self.metadata = metadata
+        self.sudoku = sudoku
+        self.solution = solution
+        self.mtimes = mtimes
+        # Changes whenever any of the door's files change; stable across processes
+        self.version = hashlib.sha1(repr(mtimes).encode()).hexdigest()[:16]
+        self.checked_at = time.monotonic()
+
+
+class DoorCache:
+    """
+    Cache of DoorData per door number.
+    """
+
+    def __init__(self, folder_fn, load_metadata, load_sudoku, load_solution, check_interval=2.0):
+        """
+        Args:
+            folder_fn: Function mapping a door number to its rule folder
+            load_metadata, load_sudoku, load_solution: Loader functions taking a door number
+            check_interval: Minimum seconds between modification time checks per door
+        """
+        self.folder_fn = folder_fn
+        self.load_metadata = load_metadata
+        self.load_sudoku = load_sudoku
+        self.load_solution = load_solution
+        self.check_interval = check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, door_number):
+        """
+        Return the DoorData for a door, loading it if missing or stale.
+        """
+        entry = self._entries.get(door_number)
+        if entry is not None:
+            if time.monotonic() - entry.checked_at < self.check_interval:
+                self.hits += 1
+                return entry
+            if self._mtimes(door_number) == entry.mtimes:
+                entry.checked_at = time.monotonic()
+                self.hits += 1
+                return entry
+
+        self.misses += 1
+        # Read the mtimes before parsing so a concurrent write triggers another reload
+        mtimes = self._mtimes(door_number)
+        entry = DoorData(
+            self.load_metadata(door_number),
+            self.load_sudoku(door_number),
+            self.load_solution(door_number),
+            mtimes,
+        )
+        with self._lock:
+            self._entries[door_number] = entry
+        return entry
+
+    def invalidate(self, door_number=None):
+        """Drop one door's entry (or all entries if door_number is None)."""
+        with self._lock:
+            if door_number is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(door_number, None)
+
+    def _mtimes(self, door_number):
+        folder = self.folder_fn(door_number)
+        mtimes = []
+        for name in DOOR_FILES:
+            try:
+                mtimes.append(os.stat(os.path.join(folder, name)).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
@@ -0,0 +1,203 @@
+"""
+Export the calendar and all door pages as a static site.
+
+Every page view otherwise goes through Flask. The exported site can be served
+by any static host (GitHub Pages, a CDN) with no Python in the request path;
+only "Generate New Puzzle" still needs the dynamic app.
+
+Output layout:
+
+    index.html                  redirects to the visitor's language
+    <locale>/index.html         calendar
+    <locale>/door/<n>/index.html
+    data/door-<n>.json          door data (metadata, puzzle, solution), fetched by door.js
+    assets/<name>.<hash><ext>   files from website/static, named by content hash
+
+All links are relative, so the site works from any base path. Hashed asset
+names never change for the same content and can be cached forever.
+
+Usage:
+    python website/export_static.py --out build/site
+    python website/export_static.py --out build/site --dynamic-base https://sudoku.example.com
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+
+# The export renders pages only; never start background generation
+os.environ.setdefault('PUZZLE_POOL_SIZE', '0')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import render_template
+
+from app import app, asset_manifest, door_cache, get_translated_rule_info, position_classes
+from door_api import door_payload
+
+DOORS = range(1, 25)
+
+
+def copy_assets(out_dir):
+    """
+    Copy static files into out_dir/assets under their content-hashed names,
+    the same names the app serves under /assets.
+
+    Returns:
+        dict: Original filename (relative to the static folder) -> path relative to out_dir
+    """
+    manifest = {}
+    for filename, hashed in asset_manifest.mapping().items():
+        target = 'assets/' + hashed
+        os.makedirs(os.path.join(out_dir, os.path.dirname(target)), exist_ok=True)
+        shutil.copy2(os.path.join(asset_manifest.static_dir, filename), os.path.join(out_dir, target))
+        manifest[filename] = target
+    return manifest
+
+
+def write_file(out_dir, relative_path, content):
+    path = os.path.join(out_dir, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+class PageUrls:
+    """URL helpers for a page at a given depth below the site root."""
+
+    def __init__(self, manifest, locale, depth):
+        self.manifest = manifest
+        self.locale = locale
+        self.root = '../' * depth
+
+    def asset_url(self, filename):
+        target = self.manifest.get(filename)
+        if target is None:
+            print(f"Warning: Static file '{filename}' not found; link left unhashed")
+            target = 'assets/' + filename
+        return self.root + target
+
+    def door_url(self, door_number, locale=None):
+        return f"{self.root}{locale or self.locale}/door/{door_number}/"
+
+    def calendar_url(self, locale=None):
+        return f"{self.root}{locale or self.locale}/"
+
+    def template_context(self, language_urls, dynamic_base):
+        return {
+            'asset_url': self.asset_url,
+            'door_url': self.door_url,
+            'calendar_url': self.calendar_url(),
+            'language_urls': language_urls,
+            'static_export': True,
+            'dynamic_base': dynamic_base,
+            'get_locale': lambda: self.locale,
+        }
+
+
+def render_calendar(manifest, locale, locales, dynamic_base):
+    urls = PageUrls(manifest, locale, depth=1)
+    language_urls = {other: urls.calendar_url(other) for other in locales}
+    with app.test_request_context(f'/{locale}/'):
+        return render_template(
+            'calendar.html',
+            door_positions=list(zip(DOORS, position_classes)),
+            **urls.template_context(language_urls, dynamic_base))
+
+
+def render_door(manifest, locale, locales, door_number, dynamic_base):
+    urls = PageUrls(manifest, locale, depth=3)
+    language_urls = {other: urls.door_url(door_number, other) for other in locales}
+    door_data = door_cache.get(door_number)
+    with app.test_request_context(f'/{locale}/door/{door_number}'):
+        rule_name, rule_description = get_translated_rule_info(door_number, door_data.metadata)
+        return render_template(
+            'door.html',
+            door=door_number,
+            metadata=door_data.metadata,
+            rule_name=rule_name,
+            rule_description=rule_description,
+            sudoku=door_data.sudoku,
+            solution=door_data.solution,
+            door_data_url=f"{urls.root}data/door-{door_number}.json",
+            **urls.template_context(language_urls, dynamic_base))
+
+
+def redirect_page(default_locale, locales):
+    """Root page that sends visitors to their preferred language."""
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <meta http-equiv="refresh" content="0; url={default_locale}/">
+    <script>
+        const locales = {json.dumps(list(locales))};
+        const preferred = (navigator.language || '').slice(0, 2).toLowerCase();
+        window.location.replace((locales.includes(preferred) ? preferred : {json.dumps(default_locale)}) + '/');
+    </script>
+</head>
+<body>
+    <a href="{default_locale}/">Advent Calendar</a>
+</body>
+</html>
+"""
+
+
+def export_site(out_dir, locales=None, dynamic_base=''):
+    """
+    Render the whole site into out_dir.
+
+    Args:
+        out_dir: Output directory (replaced if it exists)
+        locales: Locales to export (default: all supported locales)
+        dynamic_base: Base URL of the dynamic app for "Generate New Puzzle";
+                      the button is left out if empty
+
+    Returns:
+        int: Number of HTML pages written
+    """
+    locales = locales or app.config['BABEL_SUPPORTED_LOCALES']
+    dynamic_base = dynamic_base.rstrip('/')
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+
+    manifest = copy_assets(out_dir)
+    pages = 0
+
+    for door_number in DOORS:
+        # Same payload as /api/door/<n>; door.js fetches it
+        payload = door_payload(door_number, door_cache.get(door_number))
+        write_file(out_dir, f'data/door-{door_number}.json', json.dumps(payload, separators=(',', ':')))
+
+    for locale in locales:
+        write_file(out_dir, f'{locale}/index.html', render_calendar(manifest, locale, locales, dynamic_base))
+        pages += 1
+        for door_number in DOORS:
+            html = render_door(manifest, locale, locales, door_number, dynamic_base)
+            write_file(out_dir, f'{locale}/door/{door_number}/index.html', html)
+            pages += 1
+
+    default_locale = app.config['BABEL_DEFAULT_LOCALE']
+    if default_locale not in locales:
+        default_locale = locales[0]
+    write_file(out_dir, 'index.html', redirect_page(default_locale, locales))
+    write_file(out_dir, 'assets-manifest.json', json.dumps(manifest, indent=2, sort_keys=True))
+    # Serve files as-is on GitHub Pages
+    write_file(out_dir, '.nojekyll', '')
+    return pages + 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the calendar and door pages as a static site.")
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'build', 'site'),
+                        help="Output directory (default: build/site)")
+    parser.add_argument("--locale", action="append", dest="locales",
+                        help="Locale to export (repeatable; default: all supported)")
+    parser.add_argument("--dynamic-base", default="",
+                        help="Base URL of the Flask app that serves /generate")
+    args = parser.parse_args()
+
+    pages = export_site(args.out, args.locales, args.dynamic_base)
+    print(f"Exported {pages} page(s) to {os.path.abspath(args.out)}")
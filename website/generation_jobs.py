@@ -0,0 +1,443 @@
+"""
+Asynchronous puzzle generation jobs.
+
+/generate used to run the generator inside the request, blocking the web
+worker for the whole generation. Instead, a request now enqueues a job and
+returns its id right away; the job runs in a bounded pool of worker processes
+and the page polls its status. Requests for a door that already has a job in
+flight join that job instead of starting another one.
+
+While a job runs, the generator reports structured progress events (phase,
+backtracks, cells removed, attempts left) instead of printing. Worker
+processes put them on a shared queue; a dispatcher thread attaches them to the
+job, where the server-sent events endpoint picks them up.
+
+Admission is bounded twice: each process accepts at most ``max_pending``
+queued or running jobs, and every job must hold one of the machine-wide slots
+(see admission.py) shared by all gunicorn workers. Requests beyond either
+limit are rejected immediately with a retry hint instead of piling up.
+
+A job that runs longer than ``timeout`` is failed, its slot released, and the
+worker processes replaced to kill it. Other jobs running in the replaced
+processes notice the new pool generation and fail right away instead of
+waiting out their own timeouts.
+"""
+import math
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from multiprocessing import Pool, Queue, TimeoutError as JobTimeout
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Progress events kept per job; older ones are dropped
+MAX_JOB_EVENTS = 200
+
+# Seconds between checks whether a running job's process pool was replaced
+POOL_CHECK_INTERVAL = 1
+
+# Set in each worker process by _init_worker
+_worker_events = None
+
+
+class JobRejected(Exception):
+    """Raised by JobManager.submit when a job cannot be admitted."""
+
+    def __init__(self, reason, retry_after):
+        """
+        Args:
+            reason: 'queue_full' (this process) or 'capacity' (all processes)
+            retry_after: Suggested seconds to wait before retrying
+        """
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _init_worker(events):
+    global _worker_events
+    _worker_events = events
+
+
+def _run_job(generate_fn, job_id, target):
+    """Worker entry point: run generate_fn, forwarding its progress events."""
+    def progress(event):
+        _worker_events.put((job_id, event))
+    return generate_fn(target, progress=progress)
+
+
+class GenerationJob:
+    """State and timings of one generation job."""
+
+    def __init__(self, door_number, target):
+        self.id = uuid.uuid4().hex
+        self.door_number = door_number
+        self.target = target
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.owners = set()  # sessions waiting for this job's puzzle
+        self.progress = None
+        self._events = []
+        self._first_event = 0  # number of the oldest kept event
+        self._changed = threading.Condition()
+        self._slot = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def add_event(self, event):
+        """Record a progress event and wake up waiting streams."""
+        with self._changed:
+            self.progress = event
+            self._events.append(event)
+            if len(self._events) > MAX_JOB_EVENTS:
+                del self._events[0]
+                self._first_event += 1
+            self._changed.notify_all()
+
+    def wait_for_events(self, start, timeout=None):
+        """
+        Wait until there are events numbered start or later, or the job finishes.
+
+        Args:
+            start: Number of the first event wanted
+            timeout: Maximum seconds to wait
+
+        Returns:
+            list: (event number, event) pairs, possibly empty on timeout or finish
+        """
+        with self._changed:
+            self._changed.wait_for(
+                lambda: self.finished or self._first_event + len(self._events) > start,
+                timeout=timeout)
+            start = max(start, self._first_event)
+            events = self._events[start - self._first_event:]
+            return list(enumerate(events, start))
+
+    def notify(self):
+        """Wake up waiting streams (called when the status changes)."""
+        with self._changed:
+            self._changed.notify_all()
+
+    def to_dict(self):
+        """Return a JSON-serializable summary (without the puzzle itself)."""
+        now = time.time()
+        queued_for = (self.started_at or self.finished_at or now) - self.created_at
+        running_for = None
+        if self.started_at is not None:
+            running_for = (self.finished_at or now) - self.started_at
+        return {
+            'id': self.id,
+            'door': self.door_number,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'queued_seconds': round(queued_for, 3),
+            'running_seconds': round(running_for, 3) if running_for is not None else None,
+            'progress': self.progress,
+            'error': self.error,
+        }
+
+
+class JobManager:
+    """
+    Runs generation jobs on a bounded pool of worker processes.
+    """
+
+    def __init__(self, generate_fn, workers=1, on_done=None, retention=600,
+                 max_pending=None, slots=None, on_finish=None, timeout=None):
+        """
+        Args:
+            generate_fn: Top-level (picklable) function called as
+                         generate_fn(target, progress=callback); returns a puzzle
+                         record, or None on failure
+            workers: Number of jobs running at once
+            on_done: Optional callback(job) run in the manager's thread when a
+                     job finishes successfully, before its status becomes 'done'
+            retention: Seconds a finished job stays available for status polls
+            max_pending: Maximum queued plus running jobs in this process
+                         (default: twice the number of workers)
+            slots: Optional admission.SlotSemaphore limiting jobs across processes
+            on_finish: Optional callback(job) run once a job is done or failed,
+                       e.g. to record its timings
+            timeout: Optional seconds after which a running job is failed and
+                     the worker processes are replaced
+        """
+        self.generate_fn = generate_fn
+        self.workers = workers
+        self.on_done = on_done
+        self.retention = retention
+        self.max_pending = max_pending if max_pending is not None else 2 * workers
+        self.slots = slots
+        self.on_finish = on_finish
+        self.timeout = timeout
+
+        # Counters for monitoring
+        self.submitted = 0
+        self.coalesced = 0
+        self.timed_out = 0
+        self.rejected = {'queue_full': 0, 'capacity': 0}
+        self._durations = deque(maxlen=20)  # run times of recent jobs
+
+        self._jobs = {}
+        self._active = {}  # door number -> job in flight
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._process_pool = None
+        self._pool_generation = 0  # incremented whenever the process pool is replaced
+        self._events = None
+
+    def start(self):
+        """Start the worker processes and their dispatch threads (no-op if running)."""
+        with self._lock:
+            if self._threads:
+                return
+            self._start_process_pool()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"generation-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _start_process_pool(self):
+        # Caller holds self._lock. Each pool gets its own event queue: a worker
+        # process killed while putting an event could leave the old one locked.
+        self._events = Queue()
+        self._process_pool = Pool(processes=self.workers, initializer=_init_worker,
+                                  initargs=(self._events,))
+        thread = threading.Thread(target=self._event_loop, args=(self._events,),
+                                  name="generation-job-events", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def close(self):
+        """Terminate the worker processes; unfinished jobs are marked failed."""
+        with self._lock:
+            process_pool = self._process_pool
+            self._process_pool = None
+            self._pool_generation += 1
+            active = list(self._active.values())
+        if process_pool is not None:
+            process_pool.terminate()
+        for job in active:
+            self._finish(job, FAILED, error='Server shutting down')
+
+    def submit(self, door_number, target, owner=None):
+        """
+        Enqueue a job for a door, or return the door's job already in flight.
+
+        Args:
+            door_number: Door the puzzle is for
+            target: Argument passed to generate_fn
+            owner: Optional id (e.g. a session id) added to the job's owners
+
+        Returns:
+            tuple: (job, created) where created is False if an existing job was joined
+
+        Raises:
+            JobRejected: If this process or the whole machine is at its limit
+        """
+        self.start()
+        with self._lock:
+            self._prune()
+            job = self._active.get(door_number)
+            if job is not None:
+                self.coalesced += 1
+                if owner is not None:
+                    job.owners.add(owner)
+                return job, False
+            if len(self._active) >= self.max_pending:
+                self.rejected['queue_full'] += 1
+                raise JobRejected('queue_full', self.retry_after())
+
+            slot = None
+            if self.slots is not None:
+                slot = self.slots.try_acquire()
+                if slot is None:
+                    self.rejected['capacity'] += 1
+                    raise JobRejected('capacity', self.retry_after())
+
+            job = GenerationJob(door_number, target)
+            job._slot = slot
+            if owner is not None:
+                job.owners.add(owner)
+            self._jobs[job.id] = job
+            self._active[door_number] = job
+            self.submitted += 1
+        self._queue.put(job)
+        return job, True
+
+    def retry_after(self):
+        """
+        Estimate the seconds until a job slot frees up, from recent run times.
+        """
+        if not self._durations:
+            return 5
+        average = sum(self._durations) / len(self._durations)
+        waves = max(1, len(self._active)) / self.workers
+        return max(1, min(60, math.ceil(average * waves)))
+
+    def stats(self):
+        """Return queue depth, admission counters and slot usage."""
+        counts = self.counts()
+        return {
+            'queued': counts[QUEUED],
+            'running': counts[RUNNING],
+            'max_pending': self.max_pending,
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'rejected': dict(self.rejected),
+            'timed_out': self.timed_out,
+            'global_slots': self.slots.slots if self.slots is not None and self.slots.enabled else None,
+            'global_slots_in_use': self.slots.in_use() if self.slots is not None else None,
+        }
+
+    def get(self, job_id):
+        """Return a job by id, or None if unknown or expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_job(self, door_number):
+        """Return the door's job in flight, if any."""
+        with self._lock:
+            return self._active.get(door_number)
+
+    def counts(self):
+        """Return the number of jobs per status."""
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def _prune(self):
+        # Caller holds self._lock
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                process_pool = self._process_pool
+                generation = self._pool_generation
+            if process_pool is None or job.finished:
+                continue
+
+            job.started_at = time.time()
+            job.status = RUNNING
+            job.notify()
+            try:
+                result = self._wait(process_pool.apply_async(_run_job, (self.generate_fn, job.id, job.target)),
+                                    generation)
+            except JobTimeout:
+                print(f"Warning: Generation job {job.id} for door {job.door_number} "
+                      f"timed out after {self.timeout}s")
+                with self._lock:
+                    self.timed_out += 1
+                self._finish(job, FAILED, error=f'Generation timed out after {self.timeout:g} seconds')
+                self._replace_process_pool(process_pool)
+                continue
+            except Exception as e:
+                self._finish(job, FAILED, error=str(e)[:200])
+                continue
+
+            if result is None:
+                self._finish(job, FAILED, error='Could not generate a puzzle for this rule')
+                continue
+
+            job.result = result
+            try:
+                if self.on_done is not None:
+                    self.on_done(job)
+            except Exception as e:
+                self._finish(job, FAILED, error=str(e)[:200])
+                continue
+            self._finish(job, DONE)
+
+    def _wait(self, async_result, generation):
+        """
+        Wait for a job's result.
+
+        Args:
+            async_result: AsyncResult of the job
+            generation: Pool generation the job was started in
+
+        Raises:
+            JobTimeout: If the job ran longer than self.timeout
+            RuntimeError: If the process pool was replaced or closed meanwhile
+        """
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            wait = POOL_CHECK_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    raise JobTimeout()
+            try:
+                return async_result.get(wait)
+            except JobTimeout:
+                with self._lock:
+                    replaced = self._pool_generation != generation
+                if replaced:
+                    raise RuntimeError('Generation was interrupted; please try again')
+
+    def _replace_process_pool(self, process_pool):
+        # Kill the worker process stuck in a timed-out job; jobs still running
+        # in the old pool see the new generation and fail
+        with self._lock:
+            if self._process_pool is not process_pool:
+                return
+            self._pool_generation += 1
+            self._start_process_pool()
+        process_pool.terminate()
+
+    def _event_loop(self, events):
+        while True:
+            try:
+                job_id, event = events.get(timeout=POOL_CHECK_INTERVAL)
+            except queue.Empty:
+                with self._lock:
+                    if self._events is not events:
+                        return  # the pool feeding this queue was replaced
+                continue
+            except (EOFError, OSError):
+                return
+            job = self.get(job_id)
+            if job is not None:
+                job.add_event(event)
+
+    def _finish(self, job, status, error=None):
+        with self._lock:
+            if job.finished:
+                return
+            job.error = error
+            job.finished_at = time.time()
+            job.status = status
+            if self._active.get(job.door_number) is job:
+                del self._active[job.door_number]
+            if job.started_at is not None and status == DONE:
+                self._durations.append(job.finished_at - job.started_at)
+            if job._slot is not None:
+                job._slot.release()
+                job._slot = None
+        job.notify()
+        if self.on_finish is not None:
+            try:
+                self.on_finish(job)
+            except Exception as e:
+                print(f"Warning: Job callback for {job.id} failed: {e}")
@@ -0,0 +1,303 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Counters and histograms are updated in memory under one lock. Values that
+already live elsewhere (door cache hits, queued jobs) are read through
+callbacks when metrics are collected.
+
+Gunicorn runs several worker processes, each with its own registry. When a
+shared directory is configured, every process periodically writes a snapshot
+to ``<dir>/metrics-<pid>.json``, and /metrics adds up the snapshots of all
+processes started by the same gunicorn master (the parent pid). Counters of
+workers that have exited are kept so totals never go backwards; gauges only
+count live processes. Snapshots left behind by an earlier server instance are
+ignored and deleted.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+# Request latencies in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Puzzle generation takes from a fraction of a second to many minutes
+GENERATION_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, help_text, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    """Monotonic counter with optional labels."""
+
+    kind = 'counter'
+
+    def __init__(self, registry, name, help_text, labelnames=()):
+        super().__init__(registry, name, help_text, labelnames)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        self.registry.touch()
+
+    def samples(self):
+        return [[list(key), value] for key, value in self.values.items()]
+
+
+class Histogram(_Metric):
+    """Histogram of observed values with fixed bucket upper bounds."""
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # labels -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.registry.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+        self.registry.touch()
+
+    def samples(self):
+        return [[list(key), list(counts), total] for key, (counts, total) in self.values.items()]
+
+
+class CallbackMetric(_Metric):
+    """
+    Counter or gauge whose samples come from a function at collection time.
+
+    The function returns a number (no labels) or a dict mapping label value
+    tuples to numbers.
+    """
+
+    def __init__(self, registry, name, help_text, kind, fn, labelnames=()):
+        super().__init__(registry, name, help_text, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self):
+        try:
+            result = self.fn()
+        except Exception as e:
+            print(f"Warning: Metric {self.name} could not be collected: {e}")
+            return []
+        if not isinstance(result, dict):
+            return [[[], result]]
+        return [[[str(value) for value in key], number] for key, number in result.items()]
+
+
+class MetricsRegistry:
+    """
+    Named metrics of one process, optionally merged with other processes'.
+    """
+
+    def __init__(self, shared_dir=None, flush_interval=5.0):
+        """
+        Args:
+            shared_dir: Directory for per-process snapshots, or None for this process only
+            flush_interval: Seconds between snapshot writes
+        """
+        self.shared_dir = shared_dir
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self._flusher_pid = None
+        if shared_dir:
+            try:
+                os.makedirs(shared_dir, exist_ok=True)
+            except OSError as e:
+                print(f"Warning: Metrics directory {shared_dir} unavailable ({e}); "
+                      "reporting this process only")
+                self.shared_dir = None
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(self, name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, help_text, labelnames, buckets))
+
+    def gauge_callback(self, name, help_text, fn, labelnames=()):
+        return self._register(CallbackMetric(self, name, help_text, 'gauge', fn, labelnames))
+
+    def counter_callback(self, name, help_text, fn, labelnames=()):
+        return self._register(CallbackMetric(self, name, help_text, 'counter', fn, labelnames))
+
+    def touch(self):
+        """Make sure this process writes its snapshots (called on every update)."""
+        if self.shared_dir and self._flusher_pid != os.getpid():
+            # First update in this process (gunicorn forks after import)
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def snapshot(self):
+        """Return this process's metrics as a JSON-serializable dict."""
+        with self.lock:
+            metrics = {
+                name: {'kind': metric.kind, 'samples': metric.samples()}
+                for name, metric in self.metrics.items() if not isinstance(metric, CallbackMetric)
+            }
+        for name, metric in self.metrics.items():
+            if isinstance(metric, CallbackMetric):
+                metrics[name] = {'kind': metric.kind, 'samples': metric.samples()}
+        return {'pid': os.getpid(), 'ppid': os.getppid(), 'written_at': time.time(), 'metrics': metrics}
+
+    def flush(self):
+        """Write this process's snapshot to the shared directory."""
+        if not self.shared_dir:
+            return
+        path = os.path.join(self.shared_dir, f"metrics-{os.getpid()}.json")
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write metrics snapshot {path}: {e}")
+
+    def _flush_loop(self):
+        # Callback gauges change without touch(), so write every interval
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _snapshots(self):
+        """This process's snapshot plus those of its sibling processes."""
+        own = self.snapshot()
+        snapshots = [own]
+        if not self.shared_dir:
+            return snapshots
+        try:
+            names = os.listdir(self.shared_dir)
+        except OSError:
+            return snapshots
+        for name in names:
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            path = os.path.join(self.shared_dir, name)
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if data.get('pid') == own['pid']:
+                continue
+            if data.get('ppid') != own['ppid']:
+                # Left behind by an earlier server instance
+                if not _pid_alive(data.get('ppid', 0)):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                continue
+            data['alive'] = _pid_alive(data['pid'])
+            snapshots.append(data)
+        return snapshots
+
+    def collect(self):
+        """
+        Merge the snapshots of all processes.
+
+        Returns:
+            dict: {name: {labels tuple: value}} for counters and gauges,
+                  {name: {labels tuple: [bucket counts, sum]}} for histograms
+        """
+        merged = {name: {} for name in self.metrics}
+        for data in self._snapshots():
+            for name, entry in data['metrics'].items():
+                if name not in merged:
+                    continue
+                if entry['kind'] == 'gauge' and not data.get('alive', True):
+                    continue
+                values = merged[name]
+                for sample in entry['samples']:
+                    key = tuple(sample[0])
+                    if entry['kind'] == 'histogram':
+                        counts, total = sample[1], sample[2]
+                        current = values.get(key)
+                        if current is None:
+                            values[key] = [list(counts), total]
+                        else:
+                            current[0] = [a + b for a, b in zip(current[0], counts)]
+                            current[1] += total
+                    else:
+                        values[key] = values.get(key, 0) + sample[1]
+        return merged
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key in sorted(values):
+                if metric.kind == 'histogram':
+                    counts, total = values[key]
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float('inf'),), counts):
+                        cumulative += count
+                        labels = _format_labels(metric.labelnames, key, ('le', _format_value(bound)))
+                        lines.append(f"{name}_bucket{labels} {cumulative}")
+                    labels = _format_labels(metric.labelnames, key)
+                    lines.append(f"{name}_sum{labels} {_format_value(total)}")
+                    lines.append(f"{name}_count{labels} {cumulative}")
+                else:
+                    lines.append(f"{name}{_format_labels(metric.labelnames, key)} {_format_value(values[key])}")
+        return '\n'.join(lines) + '\n'
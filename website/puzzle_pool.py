@@ -0,0 +1,277 @@
+"""
+Pool of pre-generated puzzles per door.
+
+Generating a puzzle can take from a second to several minutes, which is far
+too slow for a request handler. The pool keeps a small stock of finished
+puzzles for every door so /generate can hand one out immediately, while a
+background refill thread tops the stock back up using the regular generators.
+
+With several gunicorn workers only one of them refills at a time: the refill
+threads first take a single-slot lock shared by all processes (an
+admission.SlotSemaphore), and the other workers' refill threads wait until
+its holder exits. Each refill also holds one of the machine-wide generation
+slots, so background refills never push the machine past the limit that
+applies to user jobs, and a refill that runs longer than ``timeout`` is
+abandoned and its worker processes replaced. Other refills running in the
+replaced processes notice the new pool generation and give up right away
+instead of waiting out their own timeouts.
+"""
+import threading
+import time
+from collections import deque
+from multiprocessing import Pool, TimeoutError as RefillTimeout
+
+# Seconds between attempts to become the refilling process or to get a slot
+REFILL_RETRY_DELAY = 5
+# Seconds between checks whether a running refill's process pool was replaced
+POOL_CHECK_INTERVAL = 1
+
+
+class PuzzlePool:
+    """
+    Bounded stock of pre-generated puzzles per key (door number).
+
+    take() pops a puzzle in O(1). Once a key's stock drops below ``low_water``
+    it is queued for refill and topped back up to ``capacity``, one puzzle at a
+    time. The puzzles themselves are generated in worker processes so the
+    refill never competes with request handling for the GIL.
+    """
+
+    def __init__(self, generate_fn, targets, capacity=3, low_water=1, workers=1, on_generated=None,
+                 slots=None, refill_lock=None, timeout=None):
+        """
+        Initialize the pool. Nothing is generated until start() is called.
+
+        Args:
+            generate_fn: Top-level (picklable) function called as generate_fn(target);
+                         returns a puzzle record, or None on failure
+            targets: Dictionary mapping each key to the argument for generate_fn
+            capacity: Maximum number of puzzles stocked per key
+            low_water: Refill a key once its stock drops below this number
+            workers: Number of puzzles generated concurrently
+            on_generated: Optional callback(key, seconds, ok) run after every
+                          refill generation, e.g. to record its duration
+            slots: Optional admission.SlotSemaphore; each refill holds a slot
+            refill_lock: Optional single-slot admission.SlotSemaphore shared by
+                         all processes; only the process holding it refills
+            timeout: Optional seconds after which a refill is abandoned
+        """
+        self.generate_fn = generate_fn
+        self.targets = dict(targets)
+        self.capacity = capacity
+        self.low_water = min(low_water, capacity)
+        self.workers = workers
+        self.on_generated = on_generated
+        self.slots = slots
+        self.refill_lock = refill_lock
+        self.timeout = timeout
+
+        self._stock = {key: deque() for key in self.targets}
+        # Keys waiting for refill, in priority order
+        self._refill_queue = deque(self.targets)
+        self._queued = set(self.targets)
+        self._in_flight = {key: 0 for key in self.targets}
+
+        self._cond = threading.Condition()
+        self._threads = []
+        self._process_pool = None
+        self._pool_generation = 0  # incremented whenever the process pool is replaced
+        self._closed = False
+        self._refill_slot = None
+
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failed = 0
+        self.timed_out = 0
+
+    def start(self):
+        """Start the refill workers (no-op if already running)."""
+        with self._cond:
+            if self._threads or self._closed:
+                return
+            self._process_pool = Pool(processes=self.workers)
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._refill_loop, name=f"puzzle-pool-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def close(self):
+        """Stop refilling and terminate the worker processes."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            process_pool = self._process_pool
+            self._process_pool = None
+            self._pool_generation += 1
+            if self._refill_slot is not None:
+                self._refill_slot.release()
+                self._refill_slot = None
+        if process_pool is not None:
+            process_pool.terminate()
+
+    def take(self, key):
+        """
+        Pop a pre-generated puzzle for a key.
+
+        Args:
+            key: Door number
+
+        Returns:
+            A puzzle record, or None if the stock for this key is empty
+        """
+        with self._cond:
+            stock = self._stock.get(key)
+            if stock is None:
+                return None
+
+            if stock:
+                puzzle = stock.popleft()
+                self.hits += 1
+            else:
+                puzzle = None
+                self.misses += 1
+
+            if len(stock) < self.low_water:
+                self._request_refill(key)
+            return puzzle
+
+    def warm(self, key):
+        """Move a key to the front of the refill queue if it is not fully stocked."""
+        with self._cond:
+            if key in self._stock and len(self._stock[key]) < self.capacity:
+                self._request_refill(key)
+
+    def available(self, key):
+        """Return the number of puzzles currently stocked for a key."""
+        with self._cond:
+            return len(self._stock.get(key, ()))
+
+    def stats(self):
+        """Return a snapshot of pool counters for monitoring."""
+        with self._cond:
+            return {
+                "stocked": {key: len(stock) for key, stock in self._stock.items()},
+                "queued": len(self._refill_queue),
+                "hits": self.hits,
+                "misses": self.misses,
+                "generated": self.generated,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+                "refilling": self.refill_lock is None or self._refill_slot is not None,
+            }
+
+    def _request_refill(self, key):
+        # Caller holds self._cond. Demand-driven refills jump the queue.
+        if key in self._queued:
+            self._refill_queue.remove(key)
+        self._refill_queue.appendleft(key)
+        self._queued.add(key)
+        self._cond.notify()
+
+    def _holds_refill_lock(self):
+        # Caller holds self._cond. Takes the refill lock if it is free; it is
+        # kept until close() or process exit.
+        if self.refill_lock is None or self._refill_slot is not None:
+            return True
+        self._refill_slot = self.refill_lock.try_acquire()
+        return self._refill_slot is not None
+
+    def _replace_process_pool(self, process_pool):
+        # Kill a worker process stuck in an abandoned refill
+        with self._cond:
+            if self._process_pool is not process_pool or self._closed:
+                return
+            self._process_pool = Pool(processes=self.workers)
+            self._pool_generation += 1
+        process_pool.terminate()
+
+    def _wait(self, async_result, generation):
+        # Wait for a refill, raising RefillTimeout after self.timeout seconds
+        # and RuntimeError as soon as the process pool has been replaced
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            wait = POOL_CHECK_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    raise RefillTimeout()
+            try:
+                return async_result.get(wait)
+            except RefillTimeout:
+                with self._cond:
+                    replaced = self._pool_generation != generation
+                if replaced:
+                    raise RuntimeError("worker processes were replaced")
+
+    def _refill_loop(self):
+        while True:
+            with self._cond:
+                while not self._closed and not (self._refill_queue and self._holds_refill_lock()):
+                    self._cond.wait(REFILL_RETRY_DELAY if self._refill_queue else None)
+                if self._closed:
+                    return
+
+            slot = None
+            if self.slots is not None:
+                slot = self.slots.try_acquire()
+                if slot is None:
+                    # User jobs have priority; try again later
+                    with self._cond:
+                        self._cond.wait(REFILL_RETRY_DELAY)
+                    continue
+
+            try:
+                self._refill_one()
+            finally:
+                if slot is not None:
+                    slot.release()
+            with self._cond:
+                if self._closed:
+                    return
+
+    def _refill_one(self):
+        with self._cond:
+            if self._closed or not self._refill_queue:
+                return
+            key = self._refill_queue.popleft()
+            self._queued.discard(key)
+            self._in_flight[key] += 1
+            process_pool = self._process_pool
+            generation = self._pool_generation
+
+        started = time.perf_counter()
+        try:
+            puzzle = self._wait(process_pool.apply_async(self.generate_fn, (self.targets[key],)), generation)
+        except RefillTimeout:
+            print(f"Warning: Pool refill for {key} timed out after {self.timeout}s")
+            self._replace_process_pool(process_pool)
+            with self._cond:
+                self.timed_out += 1
+            puzzle = None
+        except Exception as e:
+            print(f"Warning: Pool refill for {key} failed: {e}")
+            puzzle = None
+        if self.on_generated is not None:
+            try:
+                self.on_generated(key, time.perf_counter() - started, puzzle is not None)
+            except Exception as e:
+                print(f"Warning: Pool callback for {key} failed: {e}")
+
+        with self._cond:
+            self._in_flight[key] -= 1
+            if self._closed:
+                return
+            stock = self._stock[key]
+            if puzzle is None:
+                # Leave the key out of the queue; the next take() retries it
+                self.failed += 1
+                return
+
+            self.generated += 1
+            if len(stock) < self.capacity:
+                stock.append(puzzle)
+            # Round-robin: keep filling this key after the others in the queue
+            if len(stock) + self._in_flight[key] < self.capacity and key not in self._queued:
+                self._refill_queue.append(key)
+                self._queued.add(key)
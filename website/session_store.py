@@ -0,0 +1,177 @@
+"""
+Per-session store for generated puzzles.
+
+/generate used to write each new puzzle into the shared rule folder, so one
+visitor's click replaced the puzzle for everyone. Generated puzzles are now
+kept per (session, door) in a size-bounded LRU with a time-to-live, and the
+door view shows the session's own puzzle when it has one.
+
+Records can optionally be written through to a directory on disk. The
+directory is then the shared copy: every gunicorn worker pointed at it sees a
+puzzle generated on any other worker, memory only caches the files, and
+records evicted from memory are read back from disk on their next access.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionPuzzleStore:
+    """
+    LRU of puzzle records keyed by (session id, door number).
+    """
+
+    def __init__(self, capacity=1000, ttl=86400, spill_dir=None, spill_capacity=10000):
+        """
+        Args:
+            capacity: Maximum records kept in memory
+            ttl: Seconds after which a record expires
+            spill_dir: Optional directory every record is written through to,
+                       shared by all processes using the same directory
+            spill_capacity: Maximum records kept in spill_dir
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self.spill_capacity = spill_capacity
+        self._entries = OrderedDict()  # (sid, door) -> (expires_at, record, file mtime)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spilled = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def get(self, sid, door_number):
+        """
+        Return the session's record for a door, or None.
+        """
+        key = (sid, door_number)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now and self._is_current(key, entry[2]):
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+
+        record = self._unspill(key, now)
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return record
+
+    def put(self, sid, door_number, record):
+        """Store a record for a session's door, evicting the least recently used."""
+        key = (sid, door_number)
+        expires_at = time.time() + self.ttl
+        self._insert(key, expires_at, record, self._spill(key, expires_at, record))
+
+    def _insert(self, key, expires_at, record, mtime=None):
+        with self._lock:
+            self._entries[key] = (expires_at, record, mtime)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                # Written-through records stay on disk
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, sid, door_number):
+        """Forget a session's record for a door (memory and disk)."""
+        key = (sid, door_number)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.spill_dir:
+            try:
+                os.remove(self._spill_path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        """Return store counters for monitoring."""
+        return {
+            'entries': len(self._entries),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'spilled': self.spilled,
+        }
+
+    def _spill_path(self, key):
+        sid, door_number = key
+        digest = hashlib.sha1(str(sid).encode()).hexdigest()
+        return os.path.join(self.spill_dir, f"{digest}-{door_number}.json")
+
+    def _mtime(self, key):
+        try:
+            return os.stat(self._spill_path(key)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _is_current(self, key, mtime):
+        # Without a spill directory memory is the only copy; with one, the
+        # cached record is stale once another process replaced or removed it
+        return not self.spill_dir or self._mtime(key) == mtime
+
+    def _spill(self, key, expires_at, record):
+        """Write a record through to disk; returns the file's mtime, or None."""
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        # Unique per process and thread, so concurrent writers do not collide
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'expires_at': expires_at, 'record': record}, f)
+            os.replace(tmp_path, path)
+            self.spilled += 1
+            mtime = os.stat(path).st_mtime_ns
+        except OSError as e:
+            print(f"Warning: Could not write session puzzle to {path}: {e}")
+            return None
+        self._prune_spill()
+        return mtime
+
+    def _unspill(self, key, now):
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data['expires_at'] <= now:
+            return None
+        # Cache in memory with its original expiry
+        self._insert(key, data['expires_at'], data['record'], mtime)
+        return data['record']
+
+    def _prune_spill(self):
+        # Drop the oldest files beyond spill_capacity
+        try:
+            paths = [os.path.join(self.spill_dir, name)
+                     for name in os.listdir(self.spill_dir) if name.endswith('.json')]
+            if len(paths) <= self.spill_capacity:
+                return
+            paths.sort(key=os.path.getmtime)
+        except OSError:
+            return
+        for path in paths[:len(paths) - self.spill_capacity]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,954 @@
+/*
+ * Interactive Sudoku door page.
+ *
+ * Expects the page to define doorNumber, languageUrls and either doorData
+ * (inlined puzzle data) or doorDataUrl (where to fetch it) before this script
+ * runs (see templates/door.html).
+ */
+
+// Door data, set once loaded (see loadDoorData)
+let solution = null;
+let initialPuzzle = null;
+let metadata = null;
+
+function loadDoorData() {
+    if (doorData) {
+        return Promise.resolve(doorData);
+    }
+    return fetch(doorDataUrl).then(response => {
+        if (!response.ok) {
+            throw new Error('Could not load door data (' + response.status + ')');
+        }
+        return response.json();
+    });
+}
+
+const doorDataReady = loadDoorData().then(data => {
+    solution = data.solution;
+    initialPuzzle = data.sudoku;
+    metadata = data.metadata;
+    return data;
+});
+
+// Highlight settings (default enabled)
+let highlightRowColEnabled = true;
+let highlightSameNumberEnabled = true;
+
+// Notes mode (default disabled)
+let notesMode = false;
+const cellNotes = {}; // Store notes for each cell: {row,col: Set of numbers}
+
+// Undo system - track all user actions
+const undoHistory = [];
+const MAX_UNDO_STEPS = 100; // Limit history to prevent memory issues
+
+function recordAction(action) {
+    undoHistory.push(action);
+    // Limit history size
+    if (undoHistory.length > MAX_UNDO_STEPS) {
+        undoHistory.shift();
+    }
+}
+
+function undo() {
+    if (undoHistory.length === 0) {
+        const messageDiv = document.getElementById('message');
+        messageDiv.innerHTML = '<span style="color: #ff9800;">Nothing to undo</span>';
+        setTimeout(() => { messageDiv.innerHTML = ''; }, 2000);
+        return;
+    }
+
+    const action = undoHistory.pop();
+
+    if (action.type === 'number') {
+        // Undo number entry
+        const input = document.querySelector(`input[data-row="${action.row}"][data-col="${action.col}"]`);
+        if (input) {
+            input.value = action.oldValue;
+            const cell = input.parentElement;
+            cell.classList.remove('correct', 'incorrect');
+        }
+    } else if (action.type === 'note') {
+        // Undo note action
+        const key = `${action.row},${action.col}`;
+        if (action.operation === 'add') {
+            // Remove the note that was added
+            if (cellNotes[key]) {
+                cellNotes[key].delete(action.value);
+                if (cellNotes[key].size === 0) {
+                    delete cellNotes[key];
+                }
+            }
+        } else if (action.operation === 'clear') {
+            // Restore the notes that were cleared
+            cellNotes[key] = new Set(action.oldNotes);
+        }
+        updateNotesDisplay(action.row, action.col);
+    }
+}
+
+// Toggle notes mode function
+function toggleNotesMode() {
+    notesMode = !notesMode;
+    const btn = document.getElementById('notesToggle');
+    if (notesMode) {
+        btn.classList.add('active');
+        btn.innerHTML = '📝 Notes Mode <span class="hotkey">(Space)</span> - ON';
+    } else {
+        btn.classList.remove('active');
+        btn.innerHTML = '📝 Notes Mode <span class="hotkey">(Space)</span>';
+    }
+}
+
+// Add global spacebar listener
+document.addEventListener('keydown', function(e) {
+    if (e.code === 'Space' && e.target.tagName !== 'INPUT') {
+        e.preventDefault();
+        toggleNotesMode();
+    }
+});
+
+// Add event listeners for checkboxes
+document.addEventListener('DOMContentLoaded', function() {
+    const rowColCheckbox = document.getElementById('toggleRowCol');
+    const sameNumberCheckbox = document.getElementById('toggleSameNumber');
+
+    rowColCheckbox.addEventListener('change', function() {
+        highlightRowColEnabled = this.checked;
+        // Refresh highlights if a cell is currently selected
+        const selectedInput = document.querySelector('.sudoku input:focus');
+        const selectedPrefilled = document.querySelector('.sudoku td.prefilled:focus');
+        if (selectedInput) {
+            highlightSameNumbersAndRowCol(selectedInput, selectedInput.value);
+        } else if (selectedPrefilled) {
+            highlightSameNumbersAndRowCol(selectedPrefilled, selectedPrefilled.textContent.trim());
+        }
+    });
+
+    sameNumberCheckbox.addEventListener('change', function() {
+        highlightSameNumberEnabled = this.checked;
+        // Refresh highlights if a cell is currently selected
+        const selectedInput = document.querySelector('.sudoku input:focus');
+        const selectedPrefilled = document.querySelector('.sudoku td.prefilled:focus');
+        if (selectedInput) {
+            highlightSameNumbersAndRowCol(selectedInput, selectedInput.value);
+        } else if (selectedPrefilled) {
+            highlightSameNumbersAndRowCol(selectedPrefilled, selectedPrefilled.textContent.trim());
+        }
+    });
+
+    // Rule overlays need the metadata
+    doorDataReady
+        .then(() => {
+            applySpecialCellHighlighting();
+            drawArgyleDiagonals();
+        })
+        .catch(error => {
+            console.error('Door data error:', error);
+            document.getElementById('message').innerHTML = '<span class="error">✗ ' + error.message + '</span>';
+        });
+});
+
+function applySpecialCellHighlighting() {
+    const rule = metadata.rule;
+
+    // Diagonal cells (Diagonal Rule)
+    if (rule.diagonal_cells) {
+        rule.diagonal_cells.forEach(([row, col]) => {
+            const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+            if (cell) cell.classList.add('diagonal-cell');
+        });
+    } else if (rule.name && rule.name.includes('Diagonal')) {
+        // Fallback for old metadata without diagonal_cells
+        for (let i = 0; i < 9; i++) {
+            // Main diagonal
+            const cell1 = document.querySelector(`td[data-row="${i}"][data-col="${i}"]`);
+            if (cell1) cell1.classList.add('diagonal-cell');
+
+            // Anti-diagonal
+            const cell2 = document.querySelector(`td[data-row="${i}"][data-col="${8-i}"]`);
+            if (cell2) cell2.classList.add('diagonal-cell');
+        }
+    }
+
+    // Windoku regions
+    if (rule.windoku_regions) {
+        rule.windoku_regions.forEach(region => {
+            region.forEach(([row, col]) => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) cell.classList.add('windoku-cell');
+            });
+        });
+    }
+
+    // Asterisk cells
+    if (rule.asterisk_cells) {
+        rule.asterisk_cells.forEach(([row, col]) => {
+            const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+            if (cell) cell.classList.add('asterisk-cell');
+        });
+    }
+
+    // Even cells
+    if (rule.even_cells) {
+        rule.even_cells.forEach(([row, col]) => {
+            const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+            if (cell) cell.classList.add('even-cell');
+        });
+    }
+
+    // Odd cells
+    if (rule.odd_cells) {
+        rule.odd_cells.forEach(([row, col]) => {
+            const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+            if (cell) cell.classList.add('odd-cell');
+        });
+    }
+
+    // Magic Square cells
+    if (rule.magic_box_location) {
+        const loc = rule.magic_box_location;
+        loc.rows.forEach(row => {
+            loc.cols.forEach(col => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) cell.classList.add('magic-square-cell');
+            });
+        });
+    }
+
+    // Center Dot cells (center of each 3x3 box)
+    if (rule.center_dot_cells) {
+        rule.center_dot_cells.forEach(([row, col]) => {
+            const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+            if (cell) cell.classList.add('center-dot-cell');
+        });
+    } else if (rule.name && rule.name.includes('Center Dot')) {
+        // Fallback for old metadata without center_dot_cells
+        for (let boxRow = 0; boxRow < 3; boxRow++) {
+            for (let boxCol = 0; boxCol < 3; boxCol++) {
+                const centerRow = boxRow * 3 + 1;
+                const centerCol = boxCol * 3 + 1;
+                const cell = document.querySelector(`td[data-row="${centerRow}"][data-col="${centerCol}"]`);
+                if (cell) cell.classList.add('center-dot-cell');
+            }
+        }
+    }
+
+    // Killer Sudoku cages
+    if (rule.cages) {
+        rule.cages.forEach((cage, index) => {
+            cage.cells.forEach(([row, col], cellIndex) => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) {
+                    cell.classList.add('killer-cage');
+                    // Add sum label to first cell in cage
+                    if (cellIndex === 0) {
+                        const sumLabel = document.createElement('div');
+                        sumLabel.className = 'cage-sum';
+                        sumLabel.textContent = cage.sum;
+                        cell.insertBefore(sumLabel, cell.firstChild);
+                    }
+                }
+            });
+        });
+    }
+
+    // Thermometer cells
+    if (rule.thermometers) {
+        rule.thermometers.forEach(thermo => {
+            thermo.forEach(([row, col]) => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) cell.classList.add('thermo-cell');
+            });
+        });
+    }
+
+    // Arrow Sudoku
+    if (rule.arrows) {
+        rule.arrows.forEach(arrow => {
+            // Circle cell
+            const [circleRow, circleCol] = arrow.circle;
+            const circleCell = document.querySelector(`td[data-row="${circleRow}"][data-col="${circleCol}"]`);
+            if (circleCell) circleCell.classList.add('arrow-circle');
+
+            // Arrow cells
+            arrow.arrow_cells.forEach(([row, col]) => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) cell.classList.add('arrow-cell');
+            });
+        });
+    }
+
+    // Renban lines
+    if (rule.renban_lines) {
+        rule.renban_lines.forEach(line => {
+            line.forEach(([row, col]) => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) cell.classList.add('renban-cell');
+            });
+        });
+    }
+
+    // Jigsaw regions
+    if (rule.jigsaw_regions) {
+        rule.jigsaw_regions.forEach((region, regionIndex) => {
+            region.forEach(([row, col]) => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) cell.classList.add(`jigsaw-region-${regionIndex}`);
+            });
+        });
+    }
+
+    // Whisper lines
+    if (rule.whisper_lines) {
+        rule.whisper_lines.forEach(line => {
+            line.forEach(([row, col]) => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) cell.classList.add('whisper-cell');
+            });
+        });
+    }
+
+    // Chain Sudoku corner cells
+    if (rule.corner_cells) {
+        rule.corner_cells.forEach(([row, col]) => {
+            const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+            if (cell) cell.classList.add('chain-corner-cell');
+        });
+    }
+
+    // Consecutive lines
+    if (rule.consecutive_lines) {
+        rule.consecutive_lines.forEach((line, lineIndex) => {
+            line.forEach(([row, col]) => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) cell.classList.add(`consecutive-line-${lineIndex % 8}`);
+            });
+        });
+    }
+
+    // Argyle cells (diagonals within boxes)
+    if (rule.argyle_cells) {
+        rule.argyle_cells.forEach(([row, col]) => {
+            const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+            if (cell) cell.classList.add('argyle-cell');
+        });
+    }
+
+    // Star pattern cells
+    if (rule.star_cells) {
+        rule.star_cells.forEach(([row, col]) => {
+            const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+            if (cell) cell.classList.add('star-cell');
+        });
+    }
+
+    // XV pairs - mark cells involved in X or V constraints
+    if (rule.x_pairs) {
+        rule.x_pairs.forEach(pair => {
+            pair.forEach(([row, col]) => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) {
+                    // Add a visual indicator for XV constraints
+                    cell.style.borderColor = '#ff6b6b';
+                    cell.style.borderWidth = '2px';
+                }
+            });
+        });
+    }
+
+    if (rule.v_pairs) {
+        rule.v_pairs.forEach(pair => {
+            pair.forEach(([row, col]) => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) {
+                    // Add a visual indicator for XV constraints
+                    cell.style.borderColor = '#4ecdc4';
+                    cell.style.borderWidth = '2px';
+                }
+            });
+        });
+    }
+
+    // Futoshiki inequalities - draw inequality symbols
+    if (rule.inequalities) {
+        rule.inequalities.forEach(inequality => {
+            const [r1, c1] = inequality.cell1;
+            const [r2, c2] = inequality.cell2;
+            const operator = inequality.operator;
+
+            // Add visual styling to cells involved in inequalities
+            const cell1 = document.querySelector(`td[data-row="${r1}"][data-col="${c1}"]`);
+            const cell2 = document.querySelector(`td[data-row="${r2}"][data-col="${c2}"]`);
+            if (cell1) cell1.style.borderColor = '#9c27b0';
+            if (cell2) cell2.style.borderColor = '#9c27b0';
+
+            // TODO: Draw inequality symbols between cells
+        });
+    }
+
+    // Kropki dots - mark cells with white or black dots
+    if (rule.white_dots) {
+        rule.white_dots.forEach(pair => {
+            pair.forEach(([row, col]) => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) {
+                    cell.style.borderColor = '#ffffff';
+                    cell.style.borderWidth = '2px';
+                }
+            });
+        });
+    }
+
+    if (rule.black_dots) {
+        rule.black_dots.forEach(pair => {
+            pair.forEach(([row, col]) => {
+                const cell = document.querySelector(`td[data-row="${row}"][data-col="${col}"]`);
+                if (cell) {
+                    cell.style.borderColor = '#000000';
+                    cell.style.borderWidth = '3px';
+                }
+            });
+        });
+    }
+}
+
+// Draw argyle diagonal lines
+function drawArgyleDiagonals() {
+    const rule = metadata.rule;
+    if (!rule.argyle_diagonals) return;
+
+    const svg = document.getElementById('diagonalOverlay');
+    const table = document.getElementById('sudokuGrid');
+
+    // Get table dimensions
+    const tableRect = table.getBoundingClientRect();
+    const containerRect = table.parentElement.getBoundingClientRect();
+
+    // Set SVG dimensions to match table
+    svg.setAttribute('width', tableRect.width);
+    svg.setAttribute('height', tableRect.height);
+    svg.style.width = tableRect.width + 'px';
+    svg.style.height = tableRect.height + 'px';
+    svg.style.left = (tableRect.left - containerRect.left) + 'px';
+    svg.style.top = (tableRect.top - containerRect.top) + 'px';
+
+    const cellSize = 50; // Cell size from CSS
+    const borderWidth = 3; // Table border width
+
+    // Helper function to get cell center coordinates
+    function getCellCenter(row, col) {
+        // Account for different border widths
+        let x = borderWidth + col * cellSize;
+        let y = borderWidth + row * cellSize;
+
+        // Add thicker borders after columns 3 and 6
+        if (col >= 3) x += 1;
+        if (col >= 6) x += 1;
+
+        // Add thicker borders after rows 3 and 6
+        if (row >= 3) y += 1;
+        if (row >= 6) y += 1;
+
+        // Add half cell size to get center
+        x += cellSize / 2;
+        y += cellSize / 2;
+
+        return { x, y };
+    }
+
+    // Color palette for different diagonals
+    const colors = ['#FF4F4F7C', '#FF4F4F7C', '#FF4F4F7C', '#FF4F4F7C'];
+
+    // Draw each diagonal
+    rule.argyle_diagonals.forEach((diagonal, index) => {
+        const color = colors[index % colors.length];
+
+        // Create a path for this diagonal
+        const path = document.createElementNS('http://www.w3.org/2000/svg', 'path');
+
+        // Build path data
+        let pathData = '';
+        diagonal.forEach((cell, cellIndex) => {
+            const [row, col] = cell;
+            const center = getCellCenter(row, col);
+
+            if (cellIndex === 0) {
+                pathData += `M ${center.x} ${center.y}`;
+            } else {
+                pathData += ` L ${center.x} ${center.y}`;
+            }
+        });
+
+        path.setAttribute('d', pathData);
+        path.setAttribute('stroke', color);
+        path.setAttribute('stroke-width', '3');
+        path.setAttribute('stroke-opacity', '0.6');
+        path.setAttribute('fill', 'none');
+        path.setAttribute('stroke-linecap', 'round');
+        path.setAttribute('stroke-linejoin', 'round');
+
+        svg.appendChild(path);
+    });
+}
+
+// Only allow numbers 1-9
+document.querySelectorAll('.sudoku input').forEach(input => {
+    input.addEventListener('input', function(e) {
+        const value = e.target.value;
+        const row = parseInt(e.target.dataset.row);
+        const col = parseInt(e.target.dataset.col);
+        const key = `${row},${col}`;
+
+        if (notesMode) {
+            // Notes mode: add number to notes
+            if (value && /^[1-9]$/.test(value)) {
+                if (!cellNotes[key]) {
+                    cellNotes[key] = new Set();
+                }
+                // Record action before adding note
+                recordAction({
+                    type: 'note',
+                    operation: 'add',
+                    row: row,
+                    col: col,
+                    value: value
+                });
+                cellNotes[key].add(value);
+                updateNotesDisplay(row, col);
+                e.target.value = ''; // Clear input after adding note
+            } else {
+                e.target.value = '';
+            }
+        } else {
+            // Normal mode: single number entry
+            if (value && (!/^[1-9]$/.test(value))) {
+                e.target.value = '';
+            } else if (value) {
+                // Record the old value before changing
+                const oldValue = e.target.getAttribute('data-old-value') || '';
+                recordAction({
+                    type: 'number',
+                    row: row,
+                    col: col,
+                    oldValue: oldValue,
+                    newValue: value
+                });
+                // Store current value for next change
+                e.target.setAttribute('data-old-value', value);
+
+                // Clear notes when entering a number in normal mode
+                if (cellNotes[key]) {
+                    delete cellNotes[key];
+                    updateNotesDisplay(row, col);
+                }
+                highlightSameNumbersAndRowCol(e.target, value);
+            } else {
+                // Clearing the cell (backspace/delete)
+                const oldValue = e.target.getAttribute('data-old-value') || '';
+                if (oldValue) {
+                    recordAction({
+                        type: 'number',
+                        row: row,
+                        col: col,
+                        oldValue: oldValue,
+                        newValue: ''
+                    });
+                    e.target.setAttribute('data-old-value', '');
+                }
+                highlightSameNumbersAndRowCol(e.target, value);
+            }
+        }
+    });
+
+    input.addEventListener('focus', function(e) {
+        const value = e.target.value;
+        highlightSameNumbersAndRowCol(e.target, value);
+    });
+
+    input.addEventListener('blur', function(e) {
+        clearHighlights();
+    });
+
+    // Add keyboard navigation
+    input.addEventListener('keydown', function(e) {
+        // Allow spacebar to toggle notes mode even in input fields
+        if (e.code === 'Space') {
+            e.preventDefault();
+            toggleNotesMode();
+            return;
+        }
+
+        // Handle Delete/Backspace in notes mode
+        if (notesMode && (e.key === 'Delete' || e.key === 'Backspace')) {
+            e.preventDefault();
+            const row = parseInt(e.target.dataset.row);
+            const col = parseInt(e.target.dataset.col);
+            const key = `${row},${col}`;
+            // Clear all notes for this cell
+            if (cellNotes[key]) {
+                // Record action before clearing
+                recordAction({
+                    type: 'note',
+                    operation: 'clear',
+                    row: row,
+                    col: col,
+                    oldNotes: Array.from(cellNotes[key])
+                });
+                delete cellNotes[key];
+                updateNotesDisplay(row, col);
+            }
+            return;
+        }
+
+        handleKeyboardNavigation(e, e.target);
+    });
+});
+
+// Add click, focus, blur and keyboard navigation listeners to prefilled cells
+document.querySelectorAll('.sudoku td.prefilled').forEach(cell => {
+    cell.addEventListener('click', function(e) {
+        cell.focus();
+        const value = e.target.textContent.trim();
+        highlightSameNumbersAndRowCol(cell, value);
+    });
+
+    cell.addEventListener('focus', function(e) {
+        const value = e.target.textContent.trim();
+        highlightSameNumbersAndRowCol(cell, value);
+    });
+
+    cell.addEventListener('blur', function(e) {
+        clearHighlights();
+    });
+
+    cell.addEventListener('keydown', function(e) {
+        handleKeyboardNavigation(e, cell);
+    });
+});
+
+// Unified keyboard navigation handler
+function handleKeyboardNavigation(e, element) {
+    let row, col;
+    if (element.tagName === 'INPUT') {
+        row = parseInt(element.dataset.row);
+        col = parseInt(element.dataset.col);
+    } else {
+        row = parseInt(element.getAttribute('data-row'));
+        col = parseInt(element.getAttribute('data-col'));
+    }
+
+    let newRow = row;
+    let newCol = col;
+
+    switch(e.key) {
+        case 'ArrowUp':
+            e.preventDefault();
+            newRow = row > 0 ? row - 1 : row;
+            break;
+        case 'ArrowDown':
+        case 'Enter':
+            e.preventDefault();
+            newRow = row < 8 ? row + 1 : row;
+            break;
+        case 'ArrowLeft':
+            e.preventDefault();
+            newCol = col > 0 ? col - 1 : col;
+            break;
+        case 'ArrowRight':
+            e.preventDefault();
+            newCol = col < 8 ? col + 1 : col;
+            break;
+        default:
+            return; // Don't navigate for other keys
+    }
+
+    if (newRow !== row || newCol !== col) {
+        // Try to find input first, then prefilled cell
+        let nextCell = document.querySelector(`input[data-row="${newRow}"][data-col="${newCol}"]`);
+        if (nextCell) {
+            nextCell.focus();
+            nextCell.select();
+        } else {
+            nextCell = document.querySelector(`td[data-row="${newRow}"][data-col="${newCol}"].prefilled`);
+            if (nextCell) {
+                nextCell.focus();
+            }
+        }
+    }
+}
+
+// Clear highlights when clicking outside the sudoku grid
+document.addEventListener('click', function(e) {
+    if (!e.target.closest('.sudoku')) {
+        clearHighlights();
+    }
+});
+
+function checkSolution() {
+    if (!solution) {
+        document.getElementById('message').innerHTML = '<span class="error">The puzzle is still loading, please try again.</span>';
+        return;
+    }
+
+    let allCorrect = true;
+    let allFilled = true;
+    const inputs = document.querySelectorAll('.sudoku input');
+
+    inputs.forEach(input => {
+        const row = parseInt(input.dataset.row);
+        const col = parseInt(input.dataset.col);
+        const value = input.value;
+        const cell = input.parentElement;
+
+        // Remove previous styling
+        cell.classList.remove('correct', 'incorrect');
+
+        if (!value) {
+            allFilled = false;
+            return;
+        }
+
+        if (parseInt(value) === solution[row][col]) {
+            cell.classList.add('correct');
+        } else {
+            cell.classList.add('incorrect');
+            allCorrect = false;
+        }
+    });
+
+    const messageDiv = document.getElementById('message');
+    if (!allFilled) {
+        messageDiv.innerHTML = '<span class="error">Please fill in all cells first!</span>';
+    } else if (allCorrect) {
+        messageDiv.innerHTML = '<span class="success">🎉 Congratulations! You solved the Sudoku correctly! 🎉</span>';
+    } else {
+        messageDiv.innerHTML = '<span class="error">Some cells are incorrect. Keep trying!</span>';
+    }
+}
+
+function clearAll() {
+    document.querySelectorAll('.sudoku input').forEach(input => {
+        input.value = '';
+        input.removeAttribute('data-old-value');
+        input.parentElement.classList.remove('correct', 'incorrect');
+        const row = parseInt(input.dataset.row);
+        const col = parseInt(input.dataset.col);
+        const key = `${row},${col}`;
+        if (cellNotes[key]) {
+            delete cellNotes[key];
+            updateNotesDisplay(row, col);
+        }
+    });
+    document.getElementById('message').innerHTML = '';
+}
+
+function resetBoard() {
+    clearAll();
+    // Clear undo history on reset
+    undoHistory.length = 0;
+}
+
+// Function to update the notes display for a cell
+function updateNotesDisplay(row, col) {
+    const key = `${row},${col}`;
+    const notesDiv = document.querySelector(`.notes[data-row="${row}"][data-col="${col}"]`);
+    if (notesDiv) {
+        if (cellNotes[key] && cellNotes[key].size > 0) {
+            // Sort and display notes
+            const sortedNotes = Array.from(cellNotes[key]).sort().join(' ');
+            notesDiv.textContent = sortedNotes;
+        } else {
+            notesDiv.textContent = '';
+        }
+    }
+}
+
+const GENERATION_POLL_INTERVAL = 1000; // ms between job status checks
+
+function readJson(response) {
+    // Check if response is JSON
+    const contentType = response.headers.get('content-type');
+    if (!contentType || !contentType.includes('application/json')) {
+        throw new Error('Server returned non-JSON response. This may be a permissions issue on the server.');
+    }
+    return response.json();
+}
+
+function generateNewPuzzle() {
+    const messageDiv = document.getElementById('generation-message');
+
+    // Disable button and show loading message
+    const button = event.target;
+    button.disabled = true;
+    button.textContent = 'Generating...';
+    messageDiv.innerHTML = '<span style="color: #2196F3;">Generating new puzzle... This may take a moment.</span>';
+
+    function succeed(message) {
+        messageDiv.innerHTML = '<span style="color: #4CAF50;">✓ ' + message + ' Reloading...</span>';
+        // Reload the page after a short delay to show the new puzzle
+        setTimeout(() => {
+            window.location.reload();
+        }, 1000);
+    }
+
+    function fail(message) {
+        messageDiv.innerHTML = '<span style="color: #f44336;">✗ ' + message + '</span>';
+        button.disabled = false;
+        button.textContent = 'Generate New Puzzle';
+    }
+
+    // Poll a queued generation job until it is done or failed
+    function poll(statusUrl) {
+        fetch(statusUrl)
+            .then(readJson)
+            .then(data => {
+                const job = data.job;
+                if (!job) {
+                    fail(data.message);
+                } else if (job.status === 'done') {
+                    succeed(data.message);
+                } else if (job.status === 'failed') {
+                    fail(data.message);
+                } else if (job.progress) {
+                    showProgress(job.progress);
+                    setTimeout(() => poll(statusUrl), GENERATION_POLL_INTERVAL);
+                } else {
+                    const seconds = Math.round(job.status === 'running' ? job.running_seconds : job.queued_seconds);
+                    const state = job.status === 'running' ? 'Generating new puzzle' : 'Waiting for a free generator';
+                    messageDiv.innerHTML = '<span style="color: #2196F3;">' + state + '... (' + seconds + 's)</span>';
+                    setTimeout(() => poll(statusUrl), GENERATION_POLL_INTERVAL);
+                }
+            })
+            .catch(error => {
+                console.error('Generation error:', error);
+                fail('Error: ' + error.message);
+            });
+    }
+
+    function showProgress(event) {
+        let text = event.message;
+        if (event.phase === 'removal' && event.attempts_left !== undefined) {
+            text = 'Creating puzzle: ' + event.cells_removed + ' cells removed, ' + event.attempts_left + ' attempts left';
+        } else if (event.backtracks) {
+            text += ' (' + event.backtracks + ' backtracks)';
+        }
+        messageDiv.innerHTML = '<span style="color: #2196F3;">' + text + '</span>';
+    }
+
+    // Follow a queued job's progress stream, falling back to polling
+    function follow(data) {
+        if (!window.EventSource || !data.events_url) {
+            poll(data.status_url);
+            return;
+        }
+        const source = new EventSource(data.events_url);
+        let finished = false;
+        source.addEventListener('progress', e => showProgress(JSON.parse(e.data)));
+        source.addEventListener('done', () => {
+            finished = true;
+            source.close();
+            succeed('New puzzle generated successfully!');
+        });
+        source.addEventListener('failed', e => {
+            finished = true;
+            source.close();
+            fail('Error: ' + JSON.parse(e.data).error);
+        });
+        source.onerror = () => {
+            if (finished) return;
+            source.close();
+            poll(data.status_url);
+        };
+    }
+
+    // Call the Flask route to generate a new puzzle
+    fetch(`/generate/${doorNumber}`)
+        .then(readJson)
+        .then(data => {
+            if (!data.success && data.retry_after) {
+                fail(data.message + ' (' + data.retry_after + 's)');
+            } else if (!data.success) {
+                fail(data.message);
+            } else if (data.status_url) {
+                follow(data);
+            } else {
+                succeed(data.message);
+            }
+        })
+        .catch(error => {
+            console.error('Generation error:', error);
+            fail('Error: ' + error.message);
+        });
+}
+
+function highlightSameNumbersAndRowCol(selectedCell, number) {
+    clearHighlights();
+    if (!selectedCell) return;
+
+    // Get row and col
+    let row = null, col = null;
+    if (selectedCell.tagName === 'INPUT') {
+        row = parseInt(selectedCell.dataset.row);
+        col = parseInt(selectedCell.dataset.col);
+    } else {
+        row = parseInt(selectedCell.getAttribute('data-row'));
+        col = parseInt(selectedCell.getAttribute('data-col'));
+    }
+
+    // Highlight row and column (only if enabled)
+    if (highlightRowColEnabled) {
+        document.querySelectorAll('.sudoku td').forEach(cell => {
+            const cellRow = parseInt(cell.getAttribute('data-row'));
+            const cellCol = parseInt(cell.getAttribute('data-col'));
+            if (cellRow === row || cellCol === col) {
+                cell.classList.add('rowcol-highlight');
+            }
+        });
+    }
+
+    // Highlight selected cell
+    if (selectedCell.tagName === 'INPUT') {
+        selectedCell.parentElement.classList.add('selected-cell');
+    } else {
+        selectedCell.classList.add('selected-cell');
+    }
+
+    // Highlight all cells with the same number (only if enabled)
+    if (highlightSameNumberEnabled && number) {
+        document.querySelectorAll('.sudoku td').forEach(cell => {
+            const text = cell.textContent.trim();
+            const input = cell.querySelector('input');
+            if (text === number && cell.classList.contains('prefilled')) {
+                cell.classList.add('highlighted-prefilled');
+            } else if (input && input.value === number && input.value !== '' && !cell.classList.contains('prefilled')) {
+                cell.classList.add('highlighted-user');
+            }
+        });
+    }
+}
+
+function clearHighlights() {
+    document.querySelectorAll('.sudoku td').forEach(cell => {
+        cell.classList.remove('highlighted', 'highlighted-prefilled', 'highlighted-user', 'rowcol-highlight', 'selected-cell');
+    });
+}
+
+function toggleLanguageMenu() {
+    const dropdown = document.getElementById('languageDropdown');
+    dropdown.classList.toggle('active');
+}
+
+function changeLanguage(lang) {
+    // Remember the choice for unprefixed URLs, then open this page in that language
+    document.cookie = 'language=' + lang + '; path=/; max-age=31536000; SameSite=Lax';
+    window.location.href = languageUrls[lang];
+}
+
+// Close dropdown when clicking outside
+document.addEventListener('click', function(event) {
+    const dropdown = document.getElementById('languageDropdown');
+    if (!dropdown.contains(event.target)) {
+        dropdown.classList.remove('active');
+    }
+});